@@ -0,0 +1,380 @@
+# api_server.py
+# Встроенный HTTP/JSON-сервер: планшеты и телефоны работают с одним «прогретым»
+# процессом (общий пул соединений, кэш чтения, сессии) вместо отдельного
+# консольного экземпляра на каждое устройство.
+#
+#   POST /api/login                {"login": "102", "password": "..."} -> токен сессии
+#   POST /api/logout               Authorization: Bearer <токен>
+#   GET  /api/actions              действия, доступные роли
+#   POST /api/actions/<ДЕЙСТВИЕ>   параметры действия в JSON-объекте тела
+#   GET  /api/actions/<ДЕЙСТВИЕ>   только чтение (SHOW_*, REPORT), параметры в строке запроса;
+#                                  SHOW_* отдают страницу {"rows": [...], "next": N}: следующая — ?After=N
+#   GET  /api/health               состояние сервера (без авторизации)
+#   GET  /api/stats/queries?top=N  самые затратные выражения SQL (только Admin)
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import main as app
+from auth import AuthServiceBusy, Session
+from cli import (CLI_ACTIONS, DEFAULT_PAGE_LIMIT, EXPORT_ACTIONS, SELF_TRANSACTED_ACTIONS, SHOW_ACTIONS,
+                 CliError, prepare)
+from db_config import (close_all_pools, create_tables, get_pool, is_busy_error, is_database_empty,
+                       set_connection_profile, CONNECTION_PROFILES)
+
+# Действия без изменения данных: доступны через GET и выполняются вне транзакции
+READ_ACTIONS = frozenset({"SHOW_U", "SHOW_C", "SHOW_B", "REPORT"})
+
+# Ограничение размера тела запроса (байты)
+MAX_BODY = 1024 * 1024
+
+# Число рабочих потоков не больше размера пула соединений (по умолчанию 8),
+# иначе потоки ждали бы свободное соединение вместо очереди сервера
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE = 32
+
+# Сколько секунд держать простаивающее keep-alive соединение
+KEEPALIVE_TIMEOUT = 5.0
+
+
+class ApiError(Exception):
+    """Ошибка запроса с HTTP-статусом."""
+
+    def __init__(self, status: HTTPStatus, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+# 1. СЕРВЕР С ОГРАНИЧЕННЫМ ПУЛОМ ПОТОКОВ
+
+class ApiServer(HTTPServer):
+    """
+    HTTP-сервер, обслуживающий соединения в пуле из workers потоков.
+
+    Одновременно принимается не больше workers + queue_size соединений:
+    остальные сразу получают 503 с Retry-After, а не копятся в памяти.
+    Пока в очереди есть ожидающие соединения, keep-alive не продлевается,
+    чтобы простаивающие клиенты не занимали рабочие потоки.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], workers: int = DEFAULT_WORKERS,
+                 queue_size: int = DEFAULT_QUEUE, keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+                 quiet: bool = False):
+        super().__init__(address, ApiRequestHandler)
+        self.workers = workers
+        self.keepalive_timeout = keepalive_timeout
+        self.quiet = quiet
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._counters = {'connections': 0, 'requests': 0, 'errors': 0, 'rejected': 0, 'time_ms': 0.0}
+
+    # Прием соединений
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        with self._lock:
+            self._queued += 1
+            self._counters['connections'] += 1
+        self._executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def _reject(self, request):
+        """Отвечает 503 без передачи соединения в пул (вызывается в потоке приема)."""
+        body = json.dumps({'error': "Сервер перегружен, повторите запрос позже"},
+                          ensure_ascii=False).encode('utf-8')
+        head = ("HTTP/1.1 503 Service Unavailable\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Retry-After: 1\r\n"
+                "Connection: close\r\n\r\n").encode('ascii')
+        with self._lock:
+            self._counters['rejected'] += 1
+        try:
+            request.settimeout(1.0)
+            request.sendall(head + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    # Состояние
+
+    def is_backlogged(self) -> bool:
+        """Есть ли соединения, ожидающие свободный рабочий поток."""
+        with self._lock:
+            return self._queued > 0
+
+    def record(self, elapsed_ms: float, failed: bool):
+        with self._lock:
+            self._counters['requests'] += 1
+            self._counters['errors'] += failed
+            self._counters['time_ms'] += elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            active, queued = self._active, self._queued
+        requests = counters.pop('requests')
+        total_ms = counters.pop('time_ms')
+        return {
+            'workers': self.workers, 'active': active, 'queued': queued, 'requests': requests,
+            'avg_ms': round(total_ms / requests, 2) if requests else 0.0, **counters,
+        }
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+# 2. ОБРАБОТКА ЗАПРОСОВ
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1: соединение остается открытым между запросами (keep-alive)
+    protocol_version = "HTTP/1.1"
+    server_version = "CoachingAPI/1.0"
+
+    def setup(self):
+        self.timeout = self.server.keepalive_timeout
+        super().setup()
+
+    def parse_request(self) -> bool:
+        self._started = time.perf_counter()
+        return super().parse_request()
+
+    def log_request(self, code='-', size='-'):
+        # Запрос журналируется после отправки ответа вместе со временем обработки
+        pass
+
+    def log_message(self, format: str, *args):
+        if not self.server.quiet:
+            sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+    # Ответ
+
+    def _send_json(self, status: HTTPStatus, payload: Any, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.server.is_backlogged():
+            self.close_connection = True
+        self.send_header("Connection", "close" if self.close_connection else "keep-alive")
+        elapsed_ms = (time.perf_counter() - self._started) * 1000
+        self.send_header("X-Response-Time", f"{elapsed_ms:.2f}ms")
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record(elapsed_ms, status >= 400)
+        self.log_message('"%s" %d %.2fms', self.requestline, status, elapsed_ms)
+
+    def _read_json(self) -> Dict[str, Any]:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Некорректный Content-Length")
+        if length > MAX_BODY:
+            # Тело не читаем, поэтому соединение дальше использовать нельзя
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Тело запроса больше {MAX_BODY} байт")
+        if not length:
+            return {}
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Некорректный JSON: {e}")
+        if not isinstance(payload, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Ожидался JSON-объект")
+        return payload
+
+    # Маршрутизация
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        try:
+            # Тело POST читается всегда, чтобы следующий запрос keep-alive начинался с начала
+            body = self._read_json() if method == "POST" else {}
+            status, payload = self._route(method, url.path.rstrip('/'), url.query, body)
+        except ApiError as e:
+            status, payload = e.status, {'error': str(e)}
+            self._send_json(status, payload, e.headers)
+            return
+        except Exception as e:
+            if is_busy_error(e):
+                self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {'error': "База данных занята"},
+                                {"Retry-After": "1"})
+            else:
+                self.log_error("Ошибка обработки %s: %r", self.path, e)
+                self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)})
+            return
+        self._send_json(status, payload)
+
+    def _route(self, method: str, path: str, query: str, body: Dict[str, Any]) -> Tuple[HTTPStatus, Any]:
+        if path == "/api/health" and method == "GET":
+            return HTTPStatus.OK, {'status': 'ok', 'server': self.server.stats(),
+                                   'sessions': app.AUTH.active_sessions()}
+        if path == "/api/login" and method == "POST":
+            return self._login(body)
+        if path == "/api/logout" and method == "POST":
+            app.AUTH.logout(self._token())
+            return HTTPStatus.OK, {'ok': True}
+        if path == "/api/actions" and method == "GET":
+            session = self._session()
+            return HTTPStatus.OK, [
+                {'action': action, 'description': app.ACTION_MAP[action][0], 'read_only': action in READ_ACTIONS}
+                for action in app.ROLE_POLICY.get(session.role, []) if action in CLI_ACTIONS
+            ]
+        if path == "/api/stats/queries" and method == "GET":
+            session = self._session()
+            if session.role != 'Admin':
+                raise ApiError(HTTPStatus.FORBIDDEN, "Статистика запросов доступна только администратору")
+            top = dict(parse_qsl(query)).get('top', '20')
+            if not top.isdigit():
+                raise ApiError(HTTPStatus.BAD_REQUEST, "top: ожидалось целое число")
+            return HTTPStatus.OK, app.REPOSITORIES['User'].query_stats(int(top) or None)
+        if path.startswith("/api/actions/"):
+            action = path[len("/api/actions/"):].upper()
+            if method == "GET":
+                if action not in READ_ACTIONS:
+                    raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"Действие {action} выполняется через POST",
+                                   {"Allow": "POST"})
+                body = dict(parse_qsl(query))
+            return self._action(action, body)
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Неизвестный адрес: {path}")
+
+    # Авторизация
+
+    def _token(self) -> str:
+        header = self.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() != "bearer" or not token.strip():
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Требуется заголовок Authorization: Bearer <токен>",
+                           {"WWW-Authenticate": "Bearer"})
+        return token.strip()
+
+    def _session(self) -> Session:
+        # Каждый запрос продлевает сессию
+        session = app.AUTH.refresh(self._token())
+        if session is None:
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Сессия не найдена или истекла",
+                           {"WWW-Authenticate": 'Bearer error="invalid_token"'})
+        return session
+
+    def _login(self, body: Dict[str, Any]) -> Tuple[HTTPStatus, Any]:
+        login, password = body.get('login'), body.get('password')
+        if login is None or not isinstance(password, str):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Укажите login и password")
+        try:
+            session = app.AUTH.login(str(login), password)
+        except AuthServiceBusy as e:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, str(e), {"Retry-After": "1"})
+        if session is None:
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Неверный логин или пароль")
+        return HTTPStatus.OK, {'token': session.token, 'role': session.role,
+                               'expires_in': int(app.AUTH.session_ttl)}
+
+    def _action(self, action: str, params: Dict[str, Any]) -> Tuple[HTTPStatus, Any]:
+        session = self._session()
+        if action not in CLI_ACTIONS:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Неизвестное действие: {action}")
+        if action not in app.ROLE_POLICY.get(session.role, []):
+            raise ApiError(HTTPStatus.FORBIDDEN, f"Действие {action} недоступно для роли {session.role}")
+        if action in SHOW_ACTIONS and params.get('Limit') in (None, ""):
+            params = {**params, 'Limit': DEFAULT_PAGE_LIMIT}
+        try:
+            # Проверка параметров и хэширование паролей — до транзакции записи
+            run_action = prepare(action, session.role, params)
+            if action in READ_ACTIONS or action in EXPORT_ACTIONS or action in SELF_TRANSACTED_ACTIONS:
+                return HTTPStatus.OK, run_action()
+            # Проверки и запись одного действия — в одной транзакции
+            with app.REPOSITORIES['User'].transaction():
+                return HTTPStatus.OK, run_action()
+        except (CliError, KeyError, TypeError, ValueError) as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+
+
+# 3. ЗАПУСК
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="api_server.py", description="HTTP/JSON API системы управления коучингом")
+    parser.add_argument("--db", default="coaching.db", help="файл БД")
+    parser.add_argument("--host", default="127.0.0.1", help="адрес прослушивания")
+    parser.add_argument("--port", type=int, default=8080, help="порт")
+    parser.add_argument("--profile", choices=sorted(CONNECTION_PROFILES), help="профиль соединений")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="рабочих потоков (не больше 8)")
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE, help="соединений в очереди до отказа 503")
+    parser.add_argument("--keepalive", type=float, default=KEEPALIVE_TIMEOUT, help="таймаут простоя keep-alive, с")
+    parser.add_argument("--quiet", action="store_true", help="не журналировать запросы")
+    return parser
+
+
+def create_server(db_name: str = "coaching.db", host: str = "127.0.0.1", port: int = 8080,
+                  workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE,
+                  keepalive_timeout: float = KEEPALIVE_TIMEOUT, quiet: bool = False) -> ApiServer:
+    """Инициализирует БД и репозитории один раз на процесс и создает сервер (port=0 — свободный порт)."""
+    with redirect_stdout(sys.stderr):
+        if create_tables(db_name) or is_database_empty(db_name):
+            app.insert_sample_data(db_name)
+        app.initialize_repositories(db_name)
+    # Соединение потока инициализации больше не нужно: все места пула — рабочим потокам
+    get_pool(db_name).release_current()
+    return ApiServer((host, port), workers, queue_size, keepalive_timeout, quiet)
+
+
+def run(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        set_connection_profile(args.profile)
+    if not 1 <= args.workers <= DEFAULT_WORKERS:
+        print(f"❌ --workers должно быть от 1 до {DEFAULT_WORKERS} (размер пула соединений).", file=sys.stderr)
+        return 2
+    server = create_server(args.db, args.host, args.port, args.workers, args.queue, args.keepalive, args.quiet)
+    host, port = server.server_address[:2]
+    print(f"✅ API слушает http://{host}:{port} (потоков: {args.workers}, очередь: {args.queue})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nОстановка сервера.", file=sys.stderr)
+    finally:
+        server.server_close()
+        close_all_pools()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,133 @@
+# auth.py
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+from passwords import hash_password, needs_rehash, verify_password_async
+from repositories.user_repo import UserRepository
+
+# Время жизни сессии по умолчанию (секунды)
+SESSION_TTL = 15 * 60
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """
+    Хэш для проверки при неизвестном логине: время ответа не выдает, существует ли
+    учетная запись. Вычисляется при первой такой проверке, а не при импорте модуля
+    (PBKDF2 занимал бы большую часть времени запуска).
+    """
+    return hash_password(secrets.token_urlsafe(16))
+
+
+class AuthServiceBusy(RuntimeError):
+    """Очередь проверок паролей переполнена, попытку входа нужно повторить позже."""
+
+
+@dataclass
+class Session:
+    token: str
+    role: str
+    kind: str          # 'Coach' или 'User'
+    subject_id: int    # Coach_ID или User_ID
+    expires_at: float
+
+
+class AuthService:
+    """
+    Аутентификация тренеров и пользователей.
+
+    Учетные данные находятся одним запросом по обеим таблицам, хэши проверяются
+    в ограниченном пуле потоков, а успешный вход выдает токен сессии, который
+    хранится в памяти процесса до истечения TTL.
+    """
+
+    def __init__(self, db_name: str = "coaching.db", session_ttl: float = SESSION_TTL,
+                 max_pending: int = 64, wait_timeout: float = 10.0):
+        self._users = UserRepository(db_name)
+        self.session_ttl = session_ttl
+        self.wait_timeout = wait_timeout
+        # Не больше max_pending проверок в очереди пула; остальные получают отказ
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    # 1. ВХОД
+
+    def _verify_candidates(self, candidates, password: str):
+        """Проверяет кандидатов по порядку (тренер раньше пользователя) и возвращает первого подошедшего."""
+        for candidate in candidates or [{'Password': _dummy_hash()}]:
+            if not self._pending.acquire(timeout=self.wait_timeout):
+                raise AuthServiceBusy("Слишком много одновременных попыток входа")
+            try:
+                ok = verify_password_async(password, candidate['Password']).result()
+            finally:
+                self._pending.release()
+            if ok and 'Kind' in candidate:
+                return candidate
+        return None
+
+    def login(self, login: str, password: str) -> Optional[Session]:
+        """Проверяет учетные данные и открывает сессию. Возвращает None при неверных данных."""
+        candidate = self._verify_candidates(self._users.find_credentials(login), password)
+        if candidate is None:
+            return None
+
+        kind, subject_id = candidate['Kind'], candidate['ID']
+        if needs_rehash(candidate['Password']):
+            # Пароль старого формата: сохраняем хэш после успешной проверки
+            self._users.set_password_hash(kind, subject_id, hash_password(password))
+
+        role = 'User' if kind == 'User' else ('Admin' if subject_id == 1 else 'Coach')
+        session = Session(secrets.token_urlsafe(32), role, kind, subject_id,
+                          time.monotonic() + self.session_ttl)
+        with self._lock:
+            self._purge_expired()
+            self._sessions[session.token] = session
+        return session
+
+    # 2. СЕССИИ
+
+    def _purge_expired(self, force: bool = False):
+        """Удаляет истекшие сессии не чаще раза в минуту (вызывать под блокировкой)."""
+        now = time.monotonic()
+        if not force and now < self._next_purge:
+            return
+        self._next_purge = now + 60
+        for token in [t for t, s in self._sessions.items() if s.expires_at <= now]:
+            del self._sessions[token]
+
+    def get_session(self, token: str) -> Optional[Session]:
+        """Возвращает действующую сессию по токену или None."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if session.expires_at <= time.monotonic():
+                del self._sessions[token]
+                return None
+            return session
+
+    def refresh(self, token: str) -> Optional[Session]:
+        """Продлевает действующую сессию на session_ttl."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None or session.expires_at <= time.monotonic():
+                self._sessions.pop(token, None)
+                return None
+            session.expires_at = time.monotonic() + self.session_ttl
+            return session
+
+    def logout(self, token: str):
+        """Закрывает сессию."""
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def active_sessions(self) -> int:
+        """Количество действующих сессий."""
+        with self._lock:
+            self._purge_expired(force=True)
+            return len(self._sessions)
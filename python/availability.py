@@ -0,0 +1,36 @@
+# availability.py
+# Sweep-line по интервалам бронирований: сколько единиц инвентаря
+# используется одновременно. Интервалы полуоткрытые: [начало, конец).
+from typing import Any, Iterable, Optional, Tuple
+
+Interval = Tuple[Any, Any]
+
+
+def peak_concurrency(intervals: Iterable[Interval], window_start: Optional[Any] = None,
+                     window_end: Optional[Any] = None) -> Tuple[int, Optional[Any]]:
+    """
+    Возвращает максимальное число одновременно пересекающихся интервалов
+    (в пределах окна, если оно задано) и момент, когда этот максимум достигается.
+    """
+    events = []
+    for start, end in intervals:
+        if window_start is not None and start < window_start:
+            start = window_start
+        if window_end is not None and end > window_end:
+            end = window_end
+        if start < end:
+            # При равном времени окончание (0) обрабатывается раньше начала (1)
+            events.append((start, 1))
+            events.append((end, 0))
+    events.sort()
+
+    current = peak = 0
+    peak_at = None
+    for moment, is_start in events:
+        if is_start:
+            current += 1
+            if current > peak:
+                peak, peak_at = current, moment
+        else:
+            current -= 1
+    return peak, peak_at
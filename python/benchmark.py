@@ -0,0 +1,314 @@
+# benchmark.py
+# Нагрузочные замеры горячих путей: для каждого масштаба строится отдельная БД,
+# каждый метод репозитория и каждый формат экспорта выполняется несколько раз,
+# а результаты (перцентили задержки, пропускная способность, пик памяти)
+# пишутся в JSON для сравнения с предыдущим прогоном.
+#
+#   python benchmark.py --scales 1,5 --output bench.json
+#   python benchmark.py --scales 1,5 --baseline bench.json   # код 1 при регрессии
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from db_config import close_all_pools
+from exporters import EXPORT_FORMATS, is_supported_format, supported_formats, supports_nested
+from query_cache import clear_query_caches
+from repositories.booking_repo import BookingRepository
+from repositories.inventory_repo import InventoryRepository
+from repositories.stats_repo import StatsRepository
+from repositories.user_repo import UserRepository
+from seed import FIRST_GENERATED_COACH, seed_database
+
+# Объем данных при масштабе 1 (остальные масштабы — кратные)
+BASE_SIZES = {'Coach': 20, 'User': 500, 'Booking': 5000}
+INVENTORY_ITEMS = 30
+BENCH_PASSWORD = 'bench_pass'
+
+# Допустимый рост медианы относительно базового прогона; изменения меньше
+# DEFAULT_MIN_DELTA_MS не считаются регрессией (шум на быстрых запросах)
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_MIN_DELTA_MS = 1.0
+
+EXPORT_TABLES = ['User', 'Coach', 'Inventory', 'Booking', 'Booking_inventory']
+
+
+# 1. ПОСТРОЕНИЕ БД
+
+def build_database(db_name: str, scale: int, seed: int = 42) -> Dict[str, int]:
+    """
+    Создает БД заданного масштаба генератором seed.py (данные одинаковы при
+    одном seed). Сгенерированным учетным записям ставится один хэш BENCH_PASSWORD.
+    Возвращает количество строк по таблицам.
+    """
+    with redirect_stdout(sys.stderr):
+        counts = seed_database(db_name, coaches=BASE_SIZES['Coach'] * scale, users=BASE_SIZES['User'] * scale,
+                               items=INVENTORY_ITEMS, bookings=BASE_SIZES['Booking'] * scale, seed=seed,
+                               password=BENCH_PASSWORD)
+    if counts is None:
+        raise RuntimeError(f"БД {db_name} уже содержит данные")
+    return {table: counts[table] for table in EXPORT_TABLES}
+
+
+# 2. ЗАМЕРЫ
+
+def _percentile(values: List[float], q: float) -> float:
+    """Перцентиль с линейной интерполяцией (values отсортированы)."""
+    if len(values) == 1:
+        return values[0]
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _count(result: Any) -> Optional[int]:
+    if isinstance(result, bool):
+        return None
+    if isinstance(result, int):
+        return result
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return None
+
+
+def measure(func: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """
+    Выполняет func warmup + repeat раз (кэш чтения сбрасывается перед каждым вызовом)
+    и еще раз под tracemalloc — трассировка замедляет код, поэтому в задержки не входит.
+    """
+    for _ in range(warmup):
+        clear_query_caches()
+        func()
+    timings, rows = [], None
+    for _ in range(repeat):
+        clear_query_caches()
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+        rows = _count(result)
+
+    clear_query_caches()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    total = sum(timings)
+    stats = {
+        'runs': repeat,
+        'min_ms': timings[0] * 1000,
+        'p50_ms': _percentile(timings, 0.50) * 1000,
+        'p95_ms': _percentile(timings, 0.95) * 1000,
+        'p99_ms': _percentile(timings, 0.99) * 1000,
+        'max_ms': timings[-1] * 1000,
+        'mean_ms': total / repeat * 1000,
+        'ops_per_s': repeat / total if total else None,
+        'rows': rows,
+        'rows_per_s': rows * repeat / total if rows and total else None,
+        'peak_kb': peak / 1024,
+    }
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()}
+
+
+def _cases(db_name: str, counts: Dict[str, int], output_dir: str,
+           formats: List[str]) -> List[Tuple[str, Callable[[], Any], bool]]:
+    """Список замеров: (название, функция, экспорт ли это)."""
+    users = UserRepository(db_name)
+    bookings = BookingRepository(db_name)
+    inventory = InventoryRepository(db_name)
+    stats = StatsRepository(db_name)
+    next_slot = iter(range(10 ** 9))
+
+    def add_booking():
+        # Каждый вызов — новое время в будущем, чтобы не было конфликтов расписания
+        slot = next(next_slot)
+        start = datetime(2031, 1, 1) + timedelta(hours=2 * slot)
+        data = {'Coach_ID': 1 + slot % counts['Coach'], 'User_ID': 1 + slot % counts['User'],
+                'Time_start': start.strftime("%Y-%m-%d %H:%M:%S"),
+                'Time_end': (start + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S"),
+                'Number_booking': 10 ** 8 + slot}
+        if not bookings.add_booking(data, [1 + slot % INVENTORY_ITEMS]):
+            raise RuntimeError("add_booking не выполнен")
+        return 1
+
+    def bookings_page():
+        rows, _ = bookings.get_bookings_details_page(counts['Booking'] // 2, 20)
+        return rows
+
+    cases: List[Tuple[str, Callable[[], Any], bool]] = [
+        ("display_all_bookings_details", bookings.display_all_bookings_details, False),
+        ("get_bookings_details_page", bookings_page, False),
+        ("get_bookings_between (месяц)", lambda: bookings.get_bookings_between(
+            "2025-03-01 00:00:00", "2025-04-01 00:00:00"), False),
+        ("find_shortages", lambda: inventory.find_shortages(
+            list(range(1, INVENTORY_ITEMS + 1)), "2025-03-01 10:00:00", "2025-03-01 12:00:00"), False),
+        ("get_usage_report (30 дней)", lambda: stats.get_usage_report(30, "2025-06-30"), False),
+        ("authenticate", lambda: users.authenticate(str(FIRST_GENERATED_COACH), BENCH_PASSWORD), False),
+        ("add_booking", add_booking, False),
+    ]
+    for table in EXPORT_TABLES:
+        for file_format in formats:
+            cases.append((f"export_table_to_file {table}.{file_format}",
+                          lambda t=table, f=file_format: _export(
+                              bookings.export_table_to_file(t, f, output_dir), counts[t]), True))
+    for file_format in [f for f in formats if supports_nested(f)]:
+        cases.append((f"export_nested_booking_to_file {file_format}",
+                      lambda f=file_format: _export(
+                          bookings.export_nested_booking_to_file(f, output_dir), counts['Booking']), True))
+    return cases
+
+
+def _export(path: Optional[str], rows: int) -> int:
+    if path is None:
+        raise RuntimeError("Экспорт не выполнен")
+    return rows
+
+
+def run_benchmarks(scales: List[int], repeat: int = 5, export_repeat: int = 3,
+                   formats: Optional[List[str]] = None, only: Optional[str] = None,
+                   seed: int = 42, keep_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Строит БД для каждого масштаба и выполняет все замеры. Возвращает результаты для JSON."""
+    formats = formats or list(EXPORT_FORMATS)
+    work_dir = keep_dir or tempfile.mkdtemp(prefix="coaching-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    try:
+        for scale in scales:
+            db_name = os.path.join(work_dir, f"bench_x{scale}.db")
+            for path in (db_name, db_name + "-wal", db_name + "-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+            started = time.perf_counter()
+            counts = build_database(db_name, scale, seed)
+            print(f"ℹ️ Масштаб {scale}: БД построена за {time.perf_counter() - started:.1f} с {counts}",
+                  file=sys.stderr)
+
+            output_dir = os.path.join(work_dir, f"out_x{scale}")
+            for name, func, is_export in _cases(db_name, counts, output_dir, formats):
+                if only and only.lower() not in name.lower():
+                    continue
+                # Сообщения репозиториев не должны попадать в замеры и в stdout
+                with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                    stats = measure(func, export_repeat if is_export else repeat)
+                results.append({'scale': scale, 'case': name, **stats})
+                print(f"   {name:<45} p50 {stats['p50_ms']:>10.2f} мс   p95 {stats['p95_ms']:>10.2f} мс   "
+                      f"пик {stats['peak_kb']:>9.0f} КБ", file=sys.stderr)
+            close_all_pools()
+    finally:
+        close_all_pools()
+        if keep_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': seed,
+            'repeat': repeat,
+            'export_repeat': export_repeat,
+            'base_sizes': BASE_SIZES,
+        },
+        'results': results,
+    }
+
+
+# 3. СРАВНЕНИЕ С БАЗОВЫМ ПРОГОНОМ
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD, metric: str = 'p50_ms',
+            min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> List[Dict[str, Any]]:
+    """
+    Сопоставляет замеры по (масштаб, название). Регрессия — рост metric больше
+    чем на threshold и не меньше чем на min_delta_ms.
+    """
+    previous = {(r['scale'], r['case']): r for r in baseline.get('results', [])}
+    report = []
+    for result in current['results']:
+        before = previous.get((result['scale'], result['case']))
+        if before is None or not before.get(metric):
+            continue
+        change = result[metric] / before[metric] - 1
+        report.append({'scale': result['scale'], 'case': result['case'], 'before': before[metric],
+                       'after': result[metric], 'change': round(change, 4),
+                       'regression': change > threshold and result[metric] - before[metric] >= min_delta_ms})
+    return report
+
+
+def print_comparison(report: List[Dict[str, Any]], metric: str = 'p50_ms'):
+    for entry in report:
+        mark = "❌" if entry['regression'] else "✅"
+        print(f"{mark} x{entry['scale']} {entry['case']:<45} {metric} {entry['before']:.2f} -> "
+              f"{entry['after']:.2f} ({entry['change']:+.1%})", file=sys.stderr)
+
+
+# 4. ЗАПУСК
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="Замеры производительности репозиториев")
+    parser.add_argument("--scales", default="1", help="масштабы через запятую (1 = "
+                        + ", ".join(f"{k}: {v}" for k, v in BASE_SIZES.items()) + ")")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов на замер")
+    parser.add_argument("--export-repeat", type=int, default=3, help="повторов на замер экспорта")
+    parser.add_argument("--formats", default=",".join(EXPORT_FORMATS),
+                        help="форматы экспорта через запятую (доступны: " + ", ".join(supported_formats()) + ")")
+    parser.add_argument("--only", help="выполнить только замеры, в названии которых есть подстрока")
+    parser.add_argument("--seed", type=int, default=42, help="seed генератора данных")
+    parser.add_argument("--output", help="файл результатов JSON (по умолчанию — stdout)")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="допустимый рост p50 (доля)")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="минимальный рост p50 в мс, считающийся регрессией")
+    parser.add_argument("--keep-dir", help="каталог для БД и выгрузок (не удаляется после прогона)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    except ValueError:
+        print("❌ --scales: ожидались целые числа через запятую.", file=sys.stderr)
+        return 2
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if not is_supported_format(f)]
+    if unknown or not scales or min(scales) < 1 or args.repeat < 1 or args.export_repeat < 1:
+        print(f"❌ Некорректные параметры (форматы: {', '.join(supported_formats())}).", file=sys.stderr)
+        return 2
+
+    results = run_benchmarks(scales, args.repeat, args.export_repeat, formats, args.only, args.seed, args.keep_dir)
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"✅ Результаты записаны в: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report = compare(results, json.load(f), args.threshold, min_delta_ms=args.min_delta_ms)
+        print_comparison(report)
+        if any(entry['regression'] for entry in report):
+            print(f"❌ Обнаружены регрессии (порог {args.threshold:.0%}).", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,551 @@
+# cli.py
+# Неинтерактивный режим: подкоманды соответствуют действиям ACTION_MAP,
+# доступ проверяется по ROLE_POLICY, а команда batch выполняет JSON Lines
+# из stdin пачками в общих транзакциях на одном соединении (импорт и выгрузки — вне их).
+import argparse
+import json
+import os
+import sys
+from contextlib import nullcontext, redirect_stdout
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import main as app
+from db_config import close_all_pools, create_tables, is_database_empty, set_connection_profile, CONNECTION_PROFILES
+from passwords import hash_password
+from utils import FIELD_LIMITS, capture_output, check_length, parse_datetime
+
+
+class CliError(ValueError):
+    """Операция не выполнена (текст ошибки попадает в результат)."""
+
+
+# 1. ПАРАМЕТРЫ ДЕЙСТВИЙ
+
+# (имя, тип, обязательный) — типы: int, str, ints (список целых через запятую)
+Param = Tuple[str, str, bool]
+
+
+def _text(params: Dict[str, Any], name: str, limits_key: Optional[str] = None) -> Optional[str]:
+    value = params.get(name)
+    if value is None:
+        return None
+    value = str(value).strip()
+    if limits_key:
+        error = check_length(value, *FIELD_LIMITS[limits_key])
+        if error:
+            raise CliError(f"{name}: {error}")
+    return value
+
+
+def _require(ok: bool, message: str) -> Dict[str, Any]:
+    if not ok:
+        raise CliError(message)
+    return {'ok': True}
+
+
+# Размер страницы SHOW_* при выводе всех записей и наибольший Limit одной страницы
+SHOW_PAGE = 500
+MAX_SHOW_LIMIT = 1000
+
+# fetch_page(after, limit) -> (записи, After следующей страницы или None)
+PageFetcher = Callable[[Optional[int], int], Tuple[List[Any], Optional[int]]]
+
+
+def _keyset(get_page: Callable[..., Tuple[List[Any], Optional[tuple]]]) -> PageFetcher:
+    """Адаптер страниц с курсором (ID,) к целочисленному After."""
+    def fetch(after: Optional[int], limit: int):
+        rows, cursor = get_page(None if after is None else (after,), limit)
+        return rows, None if cursor is None else cursor[0]
+    return fetch
+
+
+def _iter_pages(fetch_page: PageFetcher, after: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Все записи keyset-пагинации: следующая страница читается, когда выведена предыдущая."""
+    while True:
+        with capture_output():
+            rows, after = fetch_page(after, SHOW_PAGE)
+        for row in rows:
+            yield dict(row)
+        if after is None:
+            return
+
+
+def _show(fetch_page: PageFetcher) -> Callable[[Dict[str, Any]], Any]:
+    """
+    SHOW_*: с Limit — одна страница {'rows': [...], 'next': After следующей страницы
+    или None}; без Limit — генератор всех записей начиная с After.
+    """
+    def handler(p):
+        limit = p.get('Limit')
+        if limit is None:
+            return _iter_pages(fetch_page, p.get('After'))
+        if not 1 <= limit <= MAX_SHOW_LIMIT:
+            raise CliError(f"Limit: ожидалось от 1 до {MAX_SHOW_LIMIT}")
+        rows, cursor = fetch_page(p.get('After'), limit)
+        return {'rows': [dict(row) for row in rows], 'next': cursor}
+    return handler
+
+
+def _hash_password_param(p: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверяет и хэширует Password до транзакции записи: PBKDF2 занимает ~0.1 с."""
+    if p.get('Password') is None:
+        return p
+    return {**p, 'Password': hash_password(_text(p, 'Password', 'Password'))}
+
+
+def _add_user(p):
+    data = {'Surname': _text(p, 'Surname', 'Surname'), 'Name': _text(p, 'Name', 'Name'),
+            'Password': p['Password']}
+    return _require(app.REPOSITORIES['User'].add_user(data), "Не удалось добавить пользователя")
+
+
+def _add_coach(p):
+    data = {'Internal_number': p['Internal_number'], 'Surname': _text(p, 'Surname', 'Surname'),
+            'Name': _text(p, 'Name', 'Name'), 'Experience': p.get('Experience') or 0,
+            'Password': p['Password']}
+    return _require(app.REPOSITORIES['Coach'].add_coach(data), "Не удалось добавить тренера")
+
+
+def _add_booking(p):
+    time_start, time_end = _text(p, 'Time_start'), _text(p, 'Time_end')
+    start_ts, end_ts = parse_datetime(time_start), parse_datetime(time_end)
+    if start_ts is None or end_ts is None:
+        raise CliError("Некорректное время. Используйте формат YYYY-MM-DD HH:MM:SS.")
+    if end_ts <= start_ts:
+        raise CliError("Время окончания должно быть позже времени начала.")
+    inventory_ids = p.get('Inventory') or []
+    data = {'Coach_ID': p['Coach_ID'], 'User_ID': p['User_ID'], 'Time_start': time_start,
+            'Time_end': time_end, 'Number_booking': p['Number_booking']}
+    # Занятость тренера и клиента и остаток инвентаря проверяются в транзакции вставки
+    result = app.REPOSITORIES['Booking'].add_bookings([(data, inventory_ids)])[0]
+    if not result['ok']:
+        raise CliError(result['error'])
+    return {'ok': True, 'Booking_ID': result['Booking_ID']}
+
+
+def _add_inventory(p):
+    data = {'Name': _text(p, 'Name', 'Inventory.Name'), 'Count': p['Count'],
+            'Comment': _text(p, 'Comment', 'Inventory.Comment') or None}
+    return _require(app.REPOSITORIES['Inventory'].add_inventory(data), "Не удалось добавить инвентарь")
+
+
+def _need(p: Dict[str, Any], *names: str):
+    missing = [name for name in names if p.get(name) is None]
+    if missing:
+        raise CliError(f"Не заданы параметры: {', '.join(missing)}")
+
+
+def _modify(p):
+    table, item_id = p['Table'].capitalize(), p['ID']
+    if table == 'User':
+        _need(p, 'Surname', 'Name', 'Password')
+        data = {'Surname': _text(p, 'Surname', 'Surname'), 'Name': _text(p, 'Name', 'Name'),
+                'Password': p['Password']}
+        ok = app.REPOSITORIES['User'].update_user(item_id, data)
+    elif table == 'Coach':
+        _need(p, 'Internal_number', 'Surname', 'Name', 'Password')
+        data = {'Internal_number': p['Internal_number'], 'Surname': _text(p, 'Surname', 'Surname'),
+                'Name': _text(p, 'Name', 'Name'), 'Experience': p.get('Experience') or 0,
+                'Password': p['Password']}
+        ok = app.REPOSITORIES['Coach'].update_coach(item_id, data)
+    elif table == 'Inventory':
+        _need(p, 'Name', 'Count')
+        data = {'Name': _text(p, 'Name', 'Inventory.Name'), 'Count': p['Count'],
+                'Comment': _text(p, 'Comment', 'Inventory.Comment') or None}
+        ok = app.REPOSITORIES['Inventory'].update_inventory(item_id, data)
+    else:
+        raise CliError("Table: ожидалось User, Coach или Inventory")
+    return _require(ok, "Ошибка обновления")
+
+
+def _delete(p):
+    table, item_id = p['Table'].capitalize(), p['ID']
+    handlers = {
+        'User': app.REPOSITORIES['User'].delete_user,
+        'Coach': app.REPOSITORIES['Coach'].delete_coach,
+        'Inventory': app.REPOSITORIES['Inventory'].delete_inventory,
+        'Booking': app.REPOSITORIES['Booking'].delete_booking,
+    }
+    if table not in handlers:
+        raise CliError("Table: ожидалось User, Coach, Inventory или Booking")
+    return _require(handlers[table](item_id), "Ошибка удаления")
+
+
+def _export_flat(p):
+    table, file_format = p['Table'], p['Format'].lower()
+    if table not in ['User', 'Coach', 'Inventory', 'Booking', 'Booking_inventory', 'Status']:
+        raise CliError("Неверное имя таблицы.")
+    path = app.REPOSITORIES['Booking'].export_table_to_file(table, file_format, p.get('Output_dir') or "out")
+    if path is None:
+        raise CliError("Экспорт не выполнен")
+    return {'ok': True, 'path': path}
+
+
+def _export_nested(p):
+    path = app.REPOSITORIES['Booking'].export_nested_booking_to_file(p['Format'].lower(),
+                                                                    p.get('Output_dir') or "out")
+    if path is None:
+        raise CliError("Экспорт не выполнен")
+    return {'ok': True, 'path': path}
+
+
+def _export_delta(p):
+    from exporters import is_supported_format, supported_formats
+    file_format = p['Format'].lower()
+    if not is_supported_format(file_format):
+        raise CliError(f"Format: ожидалось одно из {', '.join(supported_formats())}")
+    result = app.REPOSITORIES['Change'].export_changes_to_file(p['Table'], file_format,
+                                                               p.get('Consumer') or "default",
+                                                               p.get('Output_dir') or "out")
+    if result is None:
+        raise CliError("Экспорт изменений не выполнен")
+    return {'ok': True, **result}
+
+
+def _export_all(p):
+    from export_job import ExportCancelled, ExportJob
+    formats = [f.strip().lower() for f in (p.get('Formats') or '').split(',') if f.strip()] or None
+    try:
+        job = ExportJob(app.DB_NAME, p.get('Output_dir') or "out", formats=formats)
+        return {'ok': True, 'path': job.run()}
+    except (ExportCancelled, RuntimeError, ValueError) as e:
+        raise CliError(str(e))
+
+
+def _import_flat(p):
+    table = p['Table'].capitalize()
+    if table not in ['User', 'Coach', 'Inventory']:
+        raise CliError("Неверное имя таблицы.")
+    if not os.path.isfile(p['Path']):
+        raise CliError("Файл не найден.")
+    return {'ok': True, **app.REPOSITORIES['Import'].import_file(table, p['Path'])}
+
+
+def _status(p):
+    if p['Status_ID'] not in (1, 2, 3, 4):
+        raise CliError("Неверный статус.")
+    return _require(app.REPOSITORIES['Booking'].update_inventory_status(
+        p['Booking_ID'], p['Inventory_ID'], p['Status_ID']), "Не удалось сменить статус")
+
+
+def _report(p):
+    if p['Days'] < 1:
+        raise CliError("Число дней должно быть положительным.")
+    return app.REPOSITORIES['Stats'].get_usage_report(p['Days'], p.get('End_day'))
+
+
+# Действие ACTION_MAP -> (параметры, обработчик). EXIT в командном режиме не нужен.
+CLI_ACTIONS: Dict[str, Tuple[List[Param], Callable[[Dict[str, Any]], Any]]] = {
+    "ADD_U": ([('Surname', 'str', True), ('Name', 'str', True), ('Password', 'str', True)], _add_user),
+    "ADD_C": ([('Internal_number', 'int', True), ('Surname', 'str', True), ('Name', 'str', True),
+               ('Experience', 'int', False), ('Password', 'str', True)], _add_coach),
+    "ADD_B": ([('Coach_ID', 'int', True), ('User_ID', 'int', True), ('Time_start', 'str', True),
+               ('Time_end', 'str', True), ('Number_booking', 'int', True), ('Inventory', 'ints', False)],
+              _add_booking),
+    "ADD_I": ([('Name', 'str', True), ('Count', 'int', True), ('Comment', 'str', False)], _add_inventory),
+    "MODIFY": ([('Table', 'str', True), ('ID', 'int', True), ('Internal_number', 'int', False),
+                ('Surname', 'str', False), ('Name', 'str', False), ('Experience', 'int', False),
+                ('Password', 'str', False), ('Count', 'int', False), ('Comment', 'str', False)], _modify),
+    "DELETE": ([('Table', 'str', True), ('ID', 'int', True)], _delete),
+    "SHOW_U": ([('After', 'int', False), ('Limit', 'int', False)],
+               _show(_keyset(lambda after, limit: app.REPOSITORIES['User'].get_users_page(after, limit)))),
+    "SHOW_C": ([('After', 'int', False), ('Limit', 'int', False)],
+               _show(_keyset(lambda after, limit: app.REPOSITORIES['Coach'].get_coaches_page(after, limit)))),
+    "SHOW_B": ([('After', 'int', False), ('Limit', 'int', False)],
+               _show(lambda after, limit: app.REPOSITORIES['Booking'].get_bookings_details_page(after, limit))),
+    "EXP_FLAT": ([('Table', 'str', True), ('Format', 'str', True), ('Output_dir', 'str', False)], _export_flat),
+    "EXP_NESTED": ([('Format', 'str', True), ('Output_dir', 'str', False)], _export_nested),
+    "EXP_ALL": ([('Formats', 'str', False), ('Output_dir', 'str', False)], _export_all),
+    "EXP_DELTA": ([('Table', 'str', True), ('Format', 'str', True), ('Consumer', 'str', False),
+                   ('Output_dir', 'str', False)], _export_delta),
+    "IMP_FLAT": ([('Table', 'str', True), ('Path', 'str', True)], _import_flat),
+    "STATUS": ([('Booking_ID', 'int', True), ('Inventory_ID', 'int', True), ('Status_ID', 'int', True)], _status),
+    "REPORT": ([('Days', 'int', True), ('End_day', 'str', False)], _report),
+}
+
+# Подготовка параметров, которая не обращается к БД и выполняется до транзакции записи
+CLI_PREPARE: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "ADD_U": _hash_password_param,
+    "ADD_C": _hash_password_param,
+    "MODIFY": _hash_password_param,
+}
+
+# Действия, которые сами открывают транзакции (импорт фиксирует каждые commit_every строк):
+# во внешней транзакции они держали бы блокировку записи весь запрос
+SELF_TRANSACTED_ACTIONS = frozenset({"IMP_FLAT"})
+# Выгрузки только читают БД и пишут файлы: транзакция записи им не нужна.
+# EXP_DELTA сдвигает водяной знак собственной короткой транзакцией после записи файла
+EXPORT_ACTIONS = frozenset({"EXP_FLAT", "EXP_NESTED", "EXP_ALL", "EXP_DELTA"})
+# Списки в API и пакетном режиме отдаются постранично: без Limit — страница этого размера
+SHOW_ACTIONS = frozenset({"SHOW_U", "SHOW_C", "SHOW_B"})
+DEFAULT_PAGE_LIMIT = 100
+
+
+def _coerce(params: Dict[str, Any], spec: List[Param]) -> Dict[str, Any]:
+    """Проверяет обязательные параметры и приводит типы (значения из JSON или командной строки)."""
+    known = {name for name, _, _ in spec}
+    unknown = [name for name in params if name not in known]
+    if unknown:
+        raise CliError(f"Неизвестные параметры: {', '.join(unknown)}")
+    result: Dict[str, Any] = {}
+    for name, kind, required in spec:
+        value = params.get(name)
+        if value is None or value == "":
+            if required:
+                raise CliError(f"{name}: обязательный параметр")
+            continue
+        try:
+            if kind == 'int':
+                value = int(value)
+            elif kind == 'ints':
+                items = value.split(',') if isinstance(value, str) else value
+                value = [int(item) for item in items if str(item).strip()]
+            else:
+                value = str(value)
+        except (TypeError, ValueError):
+            raise CliError(f"{name}: ожидалось {'целое число' if kind == 'int' else 'список целых чисел'}")
+        result[name] = value
+    return result
+
+
+def prepare(action: str, role: str, params: Dict[str, Any]) -> Callable[[], Any]:
+    """
+    Проверяет ROLE_POLICY и параметры и выполняет подготовку без БД (CLI_PREPARE:
+    хэширование паролей). Возвращает функцию, выполняющую действие, — ее вызывают
+    внутри транзакции, чтобы блокировка записи не ждала PBKDF2.
+    """
+    action = action.upper()
+    if action not in CLI_ACTIONS:
+        raise CliError(f"Неизвестное действие: {action}")
+    if action not in app.ROLE_POLICY.get(role, []):
+        raise CliError(f"Действие {action} недоступно для роли {role}")
+    spec, handler = CLI_ACTIONS[action]
+    prepared = _coerce(params, spec)
+    if action in CLI_PREPARE:
+        prepared = CLI_PREPARE[action](prepared)
+
+    def run_action() -> Any:
+        # Сообщения репозиториев не попадают в stdout
+        with capture_output() as messages:
+            try:
+                return handler(prepared)
+            except CliError as e:
+                # Репозитории сообщают причину отказа через print
+                details = messages.getvalue().strip()
+                raise CliError(f"{e}. {details}" if details else str(e)) from None
+    return run_action
+
+
+def execute(action: str, role: str, params: Dict[str, Any]) -> Any:
+    """Выполняет действие с проверкой ROLE_POLICY (SHOW_* без Limit возвращают генератор записей)."""
+    return prepare(action, role, params)()
+
+
+# 2. ПАКЕТНЫЙ РЕЖИМ
+
+def _read_operations(stream) -> Iterator[Tuple[int, Optional[str], Dict[str, Any], Optional[str]]]:
+    """Читает JSON Lines: {"action": "ADD_U", "params": {...}} или {"action": "ADD_U", ...поля}."""
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, {}, f"Некорректный JSON: {e}"
+            continue
+        if not isinstance(record, dict) or not record.get('action'):
+            yield line_no, None, {}, "Ожидался объект с полем action"
+            continue
+        action = str(record.pop('action'))
+        params = record.pop('params', None)
+        yield line_no, action, params if isinstance(params, dict) else record, None
+
+
+# Подготовленная операция пакета: (строка, действие, функция выполнения или None, ошибка)
+PreparedOperation = Tuple[int, Optional[str], Optional[Callable[[], Any]], Optional[str]]
+
+
+def _runs_alone(action: Optional[str], run_action: Optional[Callable[[], Any]]) -> bool:
+    """Выполняется ли операция вне общей транзакции пачки (импорт и выгрузки)."""
+    return run_action is not None and action.upper() in SELF_TRANSACTED_ACTIONS | EXPORT_ACTIONS
+
+
+def _run_operations(repository, operations: List[PreparedOperation], shared: bool,
+                    stop_on_error: bool) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Выполняет подготовленные операции. При shared — в одной транзакции, каждая операция
+    в своей точке сохранения, поэтому ошибочная откатывается одна; иначе без транзакции
+    (действие само управляет транзакциями). Возвращает результаты и признак остановки.
+    """
+    transaction = repository.transaction if shared else nullcontext
+    results: List[Dict[str, Any]] = []
+    stopped = False
+    try:
+        with transaction():
+            for line_no, action, run_action, error in operations:
+                result: Dict[str, Any] = {'line': line_no, 'action': action}
+                if error is None:
+                    try:
+                        with transaction():
+                            result.update(ok=True, result=run_action())
+                    except Exception as e:
+                        # Откатывается только точка сохранения этой операции
+                        error = str(e)
+                if error is not None:
+                    result.update(ok=False, error=error)
+                results.append(result)
+                if error is not None and stop_on_error:
+                    stopped = True
+                    break
+    except Exception as e:
+        # Транзакция не зафиксирована: ни одна ее операция не сохранена
+        for result in results:
+            if result['ok']:
+                result.update(ok=False, error=f"Пачка отменена: {e}")
+                result.pop('result', None)
+    return results, stopped
+
+
+def run_batch(role: str, stream, out, batch_size: int = 500, stop_on_error: bool = False) -> int:
+    """
+    Выполняет операции из stream пачками по batch_size. Пачка сначала читается и
+    проверяется, пароли хэшируются — все это без блокировки БД; затем подряд идущие
+    операции выполняются в одной транзакции, каждая — в своей точке сохранения,
+    поэтому ошибочная откатывается одна. Импорт и выгрузки выполняются по порядку
+    вне общей транзакции, SHOW_* без Limit отдают первую страницу (DEFAULT_PAGE_LIMIT).
+    Результаты (JSON Lines) пишутся в out после выполнения пачки. Возвращает число ошибок.
+    """
+    repository = app.REPOSITORIES['User']
+    failures = 0
+    operations = _read_operations(stream)
+    exhausted = False
+    while not exhausted:
+        # 1. Чтение и подготовка пачки
+        prepared: List[PreparedOperation] = []
+        while len(prepared) < batch_size:
+            item = next(operations, None)
+            if item is None:
+                exhausted = True
+                break
+            line_no, action, params, error = item
+            run_action = None
+            if error is None:
+                if action.upper() in SHOW_ACTIONS and params.get('Limit') in (None, ""):
+                    params = {**params, 'Limit': DEFAULT_PAGE_LIMIT}
+                try:
+                    run_action = prepare(action, role, params)
+                except Exception as e:
+                    error = str(e)
+            prepared.append((line_no, action, run_action, error))
+            if error is not None and stop_on_error:
+                exhausted = True
+                break
+
+        # 2. Выполнение: отрезки подряд идущих операций — в общей транзакции,
+        # импорт и выгрузки — отдельно, чтобы не держать блокировку записи все время их работы
+        segments: List[Tuple[bool, List[PreparedOperation]]] = []
+        for item in prepared:
+            shared = not _runs_alone(item[1], item[2])
+            if shared and segments and segments[-1][0]:
+                segments[-1][1].append(item)
+            else:
+                segments.append((shared, [item]))
+        results: List[Dict[str, Any]] = []
+        for shared, segment in segments:
+            segment_results, stopped = _run_operations(repository, segment, shared, stop_on_error)
+            results.extend(segment_results)
+            if stopped:
+                exhausted = True
+                break
+        for result in results:
+            failures += not result['ok']
+            out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        out.flush()
+    return failures
+
+
+def _write_json_rows(rows: Iterator[Dict[str, Any]], out):
+    """Пишет записи JSON-массивом по мере чтения страниц (без сбора всех записей в память)."""
+    out.write("[")
+    separator = "\n  "
+    for row in rows:
+        out.write(separator + json.dumps(row, ensure_ascii=False, default=str))
+        separator = ",\n  "
+    out.write("\n]\n" if separator != "\n  " else "]\n")
+
+
+# 3. РАЗБОР КОМАНДНОЙ СТРОКИ
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="Командный режим системы управления коучингом")
+    parser.add_argument("--db", default="coaching.db", help="файл БД")
+    parser.add_argument("--profile", choices=sorted(CONNECTION_PROFILES), help="профиль соединений")
+    parser.add_argument("--login", default=os.environ.get("COACHING_LOGIN"),
+                        help="логин (или переменная COACHING_LOGIN)")
+    parser.add_argument("--password", default=os.environ.get("COACHING_PASSWORD"),
+                        help="пароль (или переменная COACHING_PASSWORD)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for action, (spec, _) in CLI_ACTIONS.items():
+        description = app.ACTION_MAP[action][0]
+        sub = commands.add_parser(action.lower(), help=description, description=description)
+        for name, kind, required in spec:
+            sub.add_argument(f"--{name.lower().replace('_', '-')}", dest=name, required=required,
+                             help="список ID через запятую" if kind == 'ints' else None)
+
+    batch = commands.add_parser("batch", help="Выполнить операции JSON Lines из stdin",
+                                description="Каждая строка: {\"action\": \"ADD_U\", \"params\": {...}}")
+    batch.add_argument("--batch-size", type=int, default=500, help="операций в одной транзакции")
+    batch.add_argument("--stop-on-error", action="store_true", help="остановиться на первой ошибке")
+    return parser
+
+
+def run(argv: List[str]) -> int:
+    """Точка входа командного режима. Возвращает код завершения."""
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        set_connection_profile(args.profile)
+    if not args.login or args.password is None:
+        print("❌ Укажите --login и --password (или COACHING_LOGIN / COACHING_PASSWORD).", file=sys.stderr)
+        return 2
+
+    with redirect_stdout(sys.stderr):
+        if create_tables(args.db):
+            app.mark_startup("миграции схемы")
+            app.insert_sample_data(args.db)
+            app.mark_startup("тестовые данные")
+        else:
+            app.mark_startup("проверка версии схемы")
+            if is_database_empty(args.db):
+                app.insert_sample_data(args.db)
+                app.mark_startup("тестовые данные")
+        app.initialize_repositories(args.db)
+        app.mark_startup("репозитории")
+        session = app.AUTH.login(args.login, args.password)
+        app.mark_startup("вход")
+    if app.startup_report_enabled():
+        app.print_startup_report()
+    if session is None:
+        print("❌ Ошибка аутентификации. Неверный логин или пароль.", file=sys.stderr)
+        return 3
+
+    try:
+        if args.command == "batch":
+            failures = run_batch(session.role, sys.stdin, sys.stdout, args.batch_size, args.stop_on_error)
+            return 1 if failures else 0
+
+        action = args.command.upper()
+        params = {name: getattr(args, name) for name, _, _ in CLI_ACTIONS[action][0]}
+        try:
+            result = execute(action, session.role, {k: v for k, v in params.items() if v is not None})
+        except (CliError, KeyError, TypeError, ValueError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        if isinstance(result, Iterator):
+            _write_json_rows(result, sys.stdout)
+        else:
+            print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+        return 0
+    finally:
+        close_all_pools()
@@ -1,157 +1,366 @@
 import sqlite3
+import threading
+import time
+import atexit
+import os
+from contextlib import contextmanager
 from sqlite3 import Connection
-from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional
 
 DB_NAME = "coaching.db"
 
 # 1. УПРАВЛЕНИЕ БД: СОЕДИНЕНИЕ И СТРУКТУРА
 
-def get_connection(db_name: str = "coaching.db") -> Connection:
+# Профили производительности SQLite. Профиль выбирается переменной окружения
+# COACHING_DB_PROFILE или функцией set_connection_profile().
+# query_cache_* — размер (0 — кэш выключен) и время жизни записей кэша чтения репозиториев.
+# query_stats — сбор статистики выражений репозиториев; slow_query_ms — порог журнала
+# медленных запросов (0 — выключен); trace_sql — трассировка всех выражений SQLite.
+CONNECTION_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Поведение SQLite по умолчанию: журнал отката, без ожидания блокировок
+    'legacy': {
+        'journal_mode': 'DELETE', 'synchronous': 'FULL', 'cache_size': -2000,
+        'mmap_size': 0, 'temp_store': 'DEFAULT', 'busy_timeout': 0,
+        'busy_retries': 0, 'retry_backoff': 0.0,
+        'query_cache_size': 0, 'query_cache_ttl': 0.0,
+        'query_stats': False, 'slow_query_ms': 0.0, 'trace_sql': False,
+    },
+    # Несколько терминалов на одной БД: читатели не блокируются писателем
+    'terminal': {
+        'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024, 'temp_store': 'MEMORY', 'busy_timeout': 5000,
+        'busy_retries': 5, 'retry_backoff': 0.05,
+        'query_cache_size': 256, 'query_cache_ttl': 30.0,
+        'query_stats': True, 'slow_query_ms': 250.0, 'trace_sql': False,
+    },
+    # Отчеты и выгрузки: большой кэш и отображение файла в память
+    'reporting': {
+        'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -65536,
+        'mmap_size': 256 * 1024 * 1024, 'temp_store': 'MEMORY', 'busy_timeout': 15000,
+        'busy_retries': 8, 'retry_backoff': 0.1,
+        'query_cache_size': 1024, 'query_cache_ttl': 300.0,
+        'query_stats': True, 'slow_query_ms': 5000.0, 'trace_sql': False,
+    },
+}
+
+DEFAULT_PROFILE = 'terminal'
+_active_profile = os.environ.get('COACHING_DB_PROFILE', DEFAULT_PROFILE)
+
+
+def set_connection_profile(name: str):
+    """Выбирает профиль соединений для новых подключений."""
+    global _active_profile
+    if name not in CONNECTION_PROFILES:
+        raise ValueError(f"Неизвестный профиль соединения: {name}")
+    _active_profile = name
+
+
+def get_connection_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """Возвращает настройки профиля (по умолчанию — активного)."""
+    return CONNECTION_PROFILES.get(name or _active_profile, CONNECTION_PROFILES[DEFAULT_PROFILE])
+
+
+def get_connection(db_name: str = "coaching.db", profile: Optional[str] = None,
+                   check_same_thread: bool = True) -> Connection:
     """Создает соединение с базой данных SQLite с поддержкой внешних ключей."""
-    conn = sqlite3.connect(db_name)
+    settings = get_connection_profile(profile)
+    conn = sqlite3.connect(db_name, timeout=settings['busy_timeout'] / 1000,
+                           check_same_thread=check_same_thread, cached_statements=256)
     conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+    conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
     return conn
 
 
-def create_tables(db_name: str = "coaching.db"):
-    """Создает все необходимые таблицы в БД."""
-    conn = get_connection(db_name)
-    cursor = conn.cursor()
-
-    # 1. Coach (Тренер)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Coach (
-            Coach_ID INTEGER PRIMARY KEY,
-            Internal_number INTEGER UNIQUE NOT NULL,
-            Surname TEXT NOT NULL,
-            Name TEXT NOT NULL,
-            Experience INTEGER DEFAULT 0,
-            Password TEXT NOT NULL -- В реальном приложении это должен быть ХЭШ!
-        )
-    ''')
-
-    # 2. User (Пользователь)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS User (
-            User_ID INTEGER PRIMARY KEY,
-            Surname TEXT NOT NULL,
-            Name TEXT NOT NULL,
-            Password TEXT NOT NULL -- В реальном приложении это должен быть ХЭШ!
-        )
-    ''')
-    
-    # 3. Inventory (Инвентарь)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Inventory (
-            Inventory_ID INTEGER PRIMARY KEY,
-            Name TEXT UNIQUE NOT NULL,
-            Count INTEGER NOT NULL
-        )
-    ''')
-
-    # 4. Status (Статус инвентаря)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Status (
-            Status_ID INTEGER PRIMARY KEY,
-            Name TEXT UNIQUE NOT NULL
-        )
-    ''')
-    
-    # 5. Booking (Бронирование)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Booking (
-            Booking_ID INTEGER PRIMARY KEY,
-            Coach_ID INTEGER NOT NULL,
-            User_ID INTEGER NOT NULL,
-            Time_start TEXT NOT NULL,
-            Time_end TEXT NOT NULL,
-            Number_booking INTEGER NOT NULL,
-            FOREIGN KEY (Coach_ID) REFERENCES Coach(Coach_ID),
-            FOREIGN KEY (User_ID) REFERENCES User(User_ID)
-        )
-    ''')
-
-    # 6. Booking_inventory (Связка бронирования и инвентаря)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Booking_inventory (
-            Booking_ID INTEGER NOT NULL,
-            Inventory_ID INTEGER NOT NULL,
-            Status_ID INTEGER NOT NULL,
-            PRIMARY KEY (Booking_ID, Inventory_ID),
-            FOREIGN KEY (Booking_ID) REFERENCES Booking(Booking_ID) ON DELETE CASCADE,
-            FOREIGN KEY (Inventory_ID) REFERENCES Inventory(Inventory_ID),
-            FOREIGN KEY (Status_ID) REFERENCES Status(Status_ID)
-        )
-    ''')
-
-    conn.commit()
-    conn.close()
+def is_busy_error(error: Exception) -> bool:
+    """Проверяет, что ошибка вызвана блокировкой БД (SQLITE_BUSY / SQLITE_LOCKED)."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+# Callback трассировки SQL для каждой БД (переживает пересоздание пула)
+_TRACE_CALLBACKS: Dict[str, Callable[[str], None]] = {}
+
+
+class ConnectionPool:
+    """
+    Пул долгоживущих соединений: одно соединение на поток, не более max_size одновременно.
+    Соединение переиспользуется между запросами, поэтому кэш подготовленных
+    выражений SQLite сохраняется.
+    """
+
+    def __init__(self, db_name: str = "coaching.db", max_size: int = 8,
+                 acquire_timeout: float = 30.0, health_check_interval: float = 60.0):
+        self._db_name = db_name
+        self._max_size = max_size
+        self._acquire_timeout = acquire_timeout
+        self._health_check_interval = health_check_interval
+        self._lock = threading.Condition()
+        self._connections: Dict[int, tuple] = {}  # ident потока -> (поток, соединение)
+        self._local = threading.local()
+        self._closed = False
+
+    @property
+    def db_name(self) -> str:
+        return self._db_name
+
+    def size(self) -> int:
+        """Количество открытых соединений."""
+        with self._lock:
+            return len(self._connections)
+
+    def _open(self) -> Connection:
+        conn = get_connection(self._db_name, check_same_thread=False)
+        callback = _TRACE_CALLBACKS.get(self._db_name)
+        if callback is not None:
+            conn.set_trace_callback(callback)
+        return conn
+
+    def set_trace_callback(self, callback: Optional[Callable[[str], None]]):
+        """Устанавливает (None — снимает) callback трассировки SQL на все соединения БД."""
+        with self._lock:
+            if callback is None:
+                _TRACE_CALLBACKS.pop(self._db_name, None)
+            else:
+                _TRACE_CALLBACKS[self._db_name] = callback
+            connections = [conn for _, conn in self._connections.values()]
+        for conn in connections:
+            conn.set_trace_callback(callback)
+
+    def in_transaction(self) -> bool:
+        """Открыта ли транзакция пула в текущем потоке."""
+        return getattr(self._local, 'tx_depth', 0) > 0
+
+    def after_commit(self, callback: Callable[[], None]):
+        """
+        Выполняет callback после завершения внешней транзакции текущего потока
+        (или сразу, если транзакция не открыта).
+        """
+        if not self.in_transaction():
+            callback()
+            return
+        if getattr(self._local, 'after_commit', None) is None:
+            self._local.after_commit = []
+        self._local.after_commit.append(callback)
+
+    def _run_after_commit(self):
+        callbacks = getattr(self._local, 'after_commit', None)
+        self._local.after_commit = None
+        for callback in callbacks or ():
+            callback()
+
+    def _reap_dead_threads(self):
+        """Закрывает соединения потоков, которые уже завершились (вызывать под блокировкой)."""
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._connections[ident]
+
+    def _is_healthy(self, conn: Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> Connection:
+        """Возвращает соединение текущего потока, создавая его при необходимости."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and not self._closed:
+            now = time.monotonic()
+            if now - self._local.checked_at < self._health_check_interval:
+                return conn
+            if self._is_healthy(conn):
+                self._local.checked_at = now
+                return conn
+            self.release_current()
+
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Пул соединений закрыт")
+            deadline = time.monotonic() + self._acquire_timeout
+            while len(self._connections) >= self._max_size:
+                self._reap_dead_threads()
+                if len(self._connections) < self._max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"Нет свободных соединений в пуле (max_size={self._max_size})")
+                self._lock.wait(min(remaining, 0.5))
+            conn = self._open()
+            thread = threading.current_thread()
+            self._connections[thread.ident] = (thread, conn)
+
+        self._local.conn = conn
+        self._local.checked_at = time.monotonic()
+        self._local.tx_depth = 0
+        return conn
+
+    def release_current(self):
+        """Закрывает соединение текущего потока и освобождает место в пуле."""
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        self._local.tx_depth = 0
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+            self._lock.notify()
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Контекст для чтения: выдает соединение потока без управления транзакцией."""
+        yield self.acquire()
+
+    @contextmanager
+    def transaction(self) -> Iterator[Connection]:
+        """
+        Контекст записи: фиксирует изменения при успехе и откатывает при ошибке.
+        Вложенные вызовы в том же потоке используют SAVEPOINT.
+        """
+        conn = self.acquire()
+        depth = self._local.tx_depth
+        savepoint = f"sp_{depth}"
+        if depth:
+            conn.execute(f"SAVEPOINT {savepoint}")
+        elif not conn.in_transaction:
+            # IMMEDIATE сразу берет блокировку записи, чтобы не получить
+            # SQLITE_BUSY при повышении блокировки посреди транзакции
+            conn.execute("BEGIN IMMEDIATE")
+        self._local.tx_depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if depth:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            else:
+                conn.rollback()
+            raise
+        else:
+            if depth:
+                conn.execute(f"RELEASE {savepoint}")
+            else:
+                conn.commit()
+        finally:
+            self._local.tx_depth = depth
+            if not depth:
+                self._run_after_commit()
+
+    @contextmanager
+    def read_transaction(self) -> Iterator[Connection]:
+        """
+        Контекст согласованного чтения: все запросы потока внутри видят один
+        снимок БД. BEGIN без IMMEDIATE не берет блокировку записи; снимок
+        фиксируется первым чтением. Внутри уже открытой транзакции ничего не меняет.
+        Только для чтения: кэш запросов внутри не используется.
+        """
+        conn = self.acquire()
+        depth = self._local.tx_depth
+        if depth or conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        self._local.tx_depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.tx_depth = 0
+            self._run_after_commit()
+
+    def close_all(self):
+        """Закрывает все соединения пула (при завершении программы)."""
+        with self._lock:
+            self._closed = True
+            connections = [conn for _, conn in self._connections.values()]
+            self._connections.clear()
+            self._lock.notify_all()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(db_name: str = "coaching.db") -> ConnectionPool:
+    """Возвращает общий пул соединений для указанной БД."""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(db_name)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(db_name)
+            _POOLS[db_name] = pool
+        return pool
+
+
+def close_pool(db_name: str):
+    """Закрывает пул соединений БД и удаляет его из реестра (например, для временного снимка)."""
+    with _POOLS_LOCK:
+        pool = _POOLS.pop(db_name, None)
+        _TRACE_CALLBACKS.pop(db_name, None)
+    if pool is not None:
+        pool.close_all()
+
+
+def close_all_pools():
+    """Закрывает все пулы соединений."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+atexit.register(close_all_pools)
+
+
+def create_tables(db_name: str = "coaching.db") -> int:
+    """
+    Создает или обновляет таблицы БД через миграции схемы.
+    Возвращает число примененных миграций (0, если схема уже актуальна).
+    """
+    from migrations import migrate
+    return migrate(db_name)
+
 
 # 2. ТЕСТОВЫЕ ДАННЫЕ
 
+def is_database_empty(db_name: str = "coaching.db") -> bool:
+    """
+    Быстрая проверка при запуске: нет ни одного пользователя — БД пуста
+    (например, после неудачного заполнения) и ей нужны тестовые данные.
+    """
+    with get_pool(db_name).connection() as conn:
+        return conn.execute("SELECT 1 FROM User LIMIT 1").fetchone() is None
+
+
 def insert_sample_data(db_name: str = "coaching.db"):
-    """Вставляет тестовые данные для проверки работы системы."""
-    conn = get_connection(db_name)
-    cursor = conn.cursor()
-    
-    # Проверяем, есть ли уже данные
-    if cursor.execute("SELECT COUNT(*) FROM Coach").fetchone()[0] > 0:
-        conn.close()
-        return 
-
-    # 1. Coach (Тренер)
-    coaches_data = [
-        # Администратор системы, который числится как Coach
-        (1, 'Adminov', 'Admin', 5, 'admin_pass'), 
-        (101, 'Sidorova', 'Elena', 5, 'pass101'),
-        (102, 'Ivanov', 'Petr', 3, 'pass102')
-    ]
-    cursor.executemany("INSERT INTO Coach (Internal_number, Surname, Name, Experience, Password) VALUES (?, ?, ?, ?, ?)", coaches_data)
-    
-    # 2. User (Пользователь)
-    users_data = [
-        ('Klimov', 'Alexey', 'userpass1'),
-        ('Smirnova', 'Maria', 'userpass2'),
-        ('Vorobyov', 'Ilya', 'userpass3')
-    ]
-    cursor.executemany("INSERT INTO User (Surname, Name, Password) VALUES (?, ?, ?)", users_data)
-    
-    # 3. Inventory (Инвентарь)
-    inventory_data = [
-        ('Штанга 20кг', 5, "Смотри чтоб не придавило"),
-        ('Гантели 5кг', 10, "Кто их приклеил?"),
-        ('Коврик для йоги', 20, "Для любимых поз")
-    ]
-    cursor.executemany("INSERT INTO Inventory (Name, Count, Comment) VALUES (?, ?, ?)", inventory_data)
-
-    # 4. Status (Статус)
-    status_data = [
-        ('Забронировано',),
-        ('В использовании',),
-        ('Доступно',),
-        ('Возвращено',)
-    ]
-    cursor.executemany("INSERT INTO Status (Name) VALUES (?)", status_data)
-
-    # 5. Booking (Бронирование)
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    future = datetime(2025, 12, 31, 15, 0).strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Coach_ID 2 (Sidorova), User_ID 1 (Klimov)
-    bookings_data = [
-        (2, 1, now, future, 1001), 
-        (3, 2, now, future, 1002) # Coach_ID 3 (Ivanov), User_ID 2 (Smirnova)
-    ]
-    cursor.executemany("INSERT INTO Booking (Coach_ID, User_ID, Time_start, Time_end, Number_booking) VALUES (?, ?, ?, ?, ?)", bookings_data)
-
-    # 6. Booking_inventory (Инвентарь для бронирования)
-    # Booking 1001 (ID=1): Штанга 20кг (ID=1), Статус "В использовании" (ID=2)
-    # Booking 1002 (ID=2): Коврик для йоги (ID=3), Статус "Забронировано" (ID=1)
-    booking_inventory_data = [
-        (1, 1, 2),
-        (2, 3, 1)
-    ]
-    cursor.executemany("INSERT INTO Booking_inventory (Booking_ID, Inventory_ID, Status_ID) VALUES (?, ?, ?)", booking_inventory_data)
-
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    """
+    Вставляет тестовые данные для проверки работы системы: демо-учетные записи,
+    три предмета инвентаря и два бронирования (пресет 'demo' генератора seed.py).
+    Если в БД уже есть данные, ничего не делает.
+    """
+    from seed import PRESETS, seed_database
+    seed_database(db_name, demo_bookings=True, **PRESETS['demo'])
\ No newline at end of file
@@ -0,0 +1,270 @@
+# export_job.py
+# Полный экспорт «все таблицы × все форматы» в один архив.
+# Данные читаются из снимка БД (sqlite3 backup), поэтому все файлы архива
+# согласованы между собой, даже если во время экспорта добавляются бронирования.
+# Задачи выполняются параллельно в пуле процессов или потоков, прогресс
+# сообщается через callback, а задание можно отменить.
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from db_config import close_pool, get_connection
+from exporters import EXPORT_FORMATS, is_supported_format, supported_formats, supports_nested
+from migrations import get_schema_version
+from query_cache import discard_query_cache
+from query_stats import discard_query_stats
+from utils import capture_output, ensure_output_directory
+
+# Таблицы полного экспорта и псевдотаблица вложенного экспорта бронирований
+EXPORT_JOB_TABLES = ['User', 'Coach', 'Inventory', 'Status', 'Booking', 'Booking_inventory']
+NESTED_BOOKINGS = 'Bookings_nested'
+
+# (таблица, формат)
+ExportTask = Tuple[str, str]
+# progress(выполнено, всего, задача, ошибка или None)
+ProgressCallback = Callable[[int, int, ExportTask, Optional[str]], None]
+
+
+class ExportCancelled(RuntimeError):
+    """Задание экспорта отменено."""
+
+
+# 1. СНИМОК БД
+
+def create_snapshot(db_name: str, snapshot_path: str) -> Dict[str, Any]:
+    """
+    Копирует БД в snapshot_path через sqlite3 backup за один шаг: копия соответствует
+    одному моменту времени. Снимок переводится в WAL, чтобы задачи могли читать его
+    параллельно. Возвращает число строк по таблицам и версию схемы.
+    """
+    source = get_connection(db_name)
+    target = sqlite3.connect(snapshot_path)
+    try:
+        source.backup(target)
+        target.execute("PRAGMA journal_mode = WAL")
+        tables = {table: target.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in EXPORT_JOB_TABLES}
+        return {'tables': tables, 'schema_version': get_schema_version(target)}
+    finally:
+        target.close()
+        source.close()
+
+
+# 2. ЗАДАЧИ
+
+def run_export_task(snapshot_path: str, table: str, file_format: str, output_dir: str) -> str:
+    """
+    Выгружает одну таблицу снимка в одном формате (выполняется в рабочем процессе
+    или потоке). Возвращает путь к файлу; при ошибке — исключение с сообщением репозитория.
+    """
+    from repositories.booking_repo import BookingRepository
+    repository = BookingRepository(snapshot_path)
+    with capture_output() as messages:
+        if table == NESTED_BOOKINGS:
+            path = repository.export_nested_booking_to_file(file_format, output_dir)
+        else:
+            path = repository.export_table_to_file(table, file_format, output_dir)
+    if path is None:
+        raise RuntimeError(messages.getvalue().strip() or f"Экспорт {table}.{file_format} не выполнен")
+    return path
+
+
+def release_snapshot(snapshot_path: str):
+    """
+    Закрывает соединения задач со снимком и удаляет его пул, статистику и кэш
+    запросов из реестров: иначе каждое задание в потоках оставляло бы их навсегда.
+    """
+    close_pool(snapshot_path)
+    discard_query_stats(snapshot_path)
+    discard_query_cache(snapshot_path)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# 3. ЗАДАНИЕ
+
+class ExportJob:
+    """
+    Полный экспорт в zip-архив с manifest.json.
+
+    Порядок работы: снимок БД -> задачи (таблица × формат) в пуле ->
+    архив. Пустые таблицы не выгружаются и отмечаются в манифесте.
+    По cancel() ожидающие задачи снимаются, выполняющиеся дорабатывают,
+    а архив не создается. Процессы запускаются методом spawn: fork
+    из процесса с потоками (пул хэширования, HTTP-сервер) небезопасен.
+    """
+
+    def __init__(self, db_name: str = "coaching.db", output_dir: str = "out",
+                 formats: Optional[List[str]] = None, tables: Optional[List[str]] = None,
+                 workers: Optional[int] = None, use_processes: Optional[bool] = None,
+                 progress: Optional[ProgressCallback] = None):
+        self.db_name = db_name
+        self.output_dir = output_dir
+        self.formats = formats or list(EXPORT_FORMATS)
+        self.tables = tables or EXPORT_JOB_TABLES + [NESTED_BOOKINGS]
+        cpus = os.cpu_count() or 1
+        self.workers = workers or min(cpus, 8)
+        # На одном ядре процессы не ускоряют экспорт, а только тратят время на запуск
+        self.use_processes = cpus > 1 if use_processes is None else use_processes
+        self.progress = progress
+        self._cancel = threading.Event()
+
+        unknown = [f for f in self.formats if not is_supported_format(f)]
+        if unknown:
+            raise ValueError(f"Неподдерживаемые форматы: {', '.join(unknown)} "
+                             f"(доступны: {', '.join(supported_formats())})")
+        unknown = [t for t in self.tables if t not in EXPORT_JOB_TABLES and t != NESTED_BOOKINGS]
+        if unknown:
+            raise ValueError(f"Неизвестные таблицы: {', '.join(unknown)}")
+
+    def cancel(self):
+        """Отменяет задание (можно вызывать из другого потока или обработчика Ctrl+C)."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _tasks(self, counts: Dict[str, int]) -> List[ExportTask]:
+        tasks = []
+        for table in self.tables:
+            rows = counts['Booking'] if table == NESTED_BOOKINGS else counts[table]
+            if not rows:
+                continue
+            formats = [f for f in self.formats if supports_nested(f)] if table == NESTED_BOOKINGS else self.formats
+            tasks.extend((table, file_format) for file_format in formats)
+        # Большие таблицы — первыми, чтобы они не оказались в хвосте очереди
+        tasks.sort(key=lambda task: -(counts['Booking'] if task[0] == NESTED_BOOKINGS else counts[task[0]]))
+        return tasks
+
+    def _executor(self) -> Executor:
+        if self.use_processes:
+            # multiprocessing загружается, только если задание действительно использует процессы
+            from concurrent.futures import ProcessPoolExecutor
+            from multiprocessing import get_context
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export")
+
+    def run(self) -> str:
+        """
+        Выполняет задание и возвращает путь к архиву.
+        ExportCancelled — задание отменено; RuntimeError — ошибки задач (архив не создается).
+        """
+        started = time.perf_counter()
+        ensure_output_directory(self.output_dir)
+        workspace = tempfile.mkdtemp(prefix=".export-", dir=self.output_dir)
+        snapshot_path = os.path.join(workspace, "snapshot.db")
+        try:
+            taken_at = datetime.now()
+            snapshot = create_snapshot(self.db_name, snapshot_path)
+            files_dir = os.path.join(workspace, "files")
+            tasks = self._tasks(snapshot['tables'])
+
+            results = self._run_tasks(snapshot_path, files_dir, tasks)
+            manifest = {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'source': os.path.basename(self.db_name),
+                'schema_version': snapshot['schema_version'],
+                'snapshot': {'method': 'sqlite3 backup', 'taken_at': taken_at.isoformat(timespec='seconds')},
+                'formats': self.formats,
+                'tables': {
+                    table: {'rows': snapshot['tables'][table if table != NESTED_BOOKINGS else 'Booking']}
+                    for table in self.tables
+                },
+                'files': [
+                    {'path': os.path.basename(path), 'table': table, 'format': file_format,
+                     'bytes': os.path.getsize(path), 'sha256': _sha256(path)}
+                    for (table, file_format), path in results
+                ],
+                'duration_s': round(time.perf_counter() - started, 3),
+            }
+            return self._write_archive(manifest, [path for _, path in results], taken_at)
+        finally:
+            release_snapshot(snapshot_path)
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    def _run_tasks(self, snapshot_path: str, files_dir: str,
+                   tasks: List[ExportTask]) -> List[Tuple[ExportTask, str]]:
+        results: List[Tuple[ExportTask, str]] = []
+        errors: List[str] = []
+        executor = self._executor()
+        try:
+            pending: Dict[Future, ExportTask] = {
+                executor.submit(run_export_task, snapshot_path, table, file_format, files_dir): (table, file_format)
+                for table, file_format in tasks
+            }
+            done_count = 0
+            while pending:
+                if self._cancel.is_set():
+                    for future in pending:
+                        future.cancel()
+                    raise ExportCancelled("Экспорт отменен")
+                done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = pending.pop(future)
+                    done_count += 1
+                    try:
+                        results.append((task, future.result()))
+                        error = None
+                    except Exception as e:
+                        error = str(e)
+                        errors.append(f"{task[0]}.{task[1]}: {error}")
+                    if self.progress:
+                        self.progress(done_count, len(tasks), task, error)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if errors:
+            raise RuntimeError("Ошибки экспорта: " + "; ".join(errors))
+        results.sort(key=lambda item: os.path.basename(item[1]))
+        return results
+
+    def _write_archive(self, manifest: Dict[str, Any], paths: List[str], taken_at: datetime) -> str:
+        """
+        Пишет архив во временный файл и публикует его жесткой ссылкой: незавершенный
+        архив не виден, а ссылка не перезаписывает архив задания, начатого в ту же
+        секунду, — такому архиву достается суффикс _2, _3 и т.д.
+        """
+        import zipfile
+        base_name = f"coaching_export_{taken_at:%Y%m%d_%H%M%S}"
+        fd, partial_path = tempfile.mkstemp(prefix=base_name, suffix=".zip.part", dir=self.output_dir)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(partial_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+                archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+                for path in paths:
+                    if self._cancel.is_set():
+                        raise ExportCancelled("Экспорт отменен")
+                    archive.write(path, os.path.basename(path))
+            attempt = 1
+            while True:
+                suffix = f"_{attempt}" if attempt > 1 else ""
+                archive_path = os.path.join(self.output_dir, f"{base_name}{suffix}.zip")
+                try:
+                    os.link(partial_path, archive_path)
+                    return archive_path
+                except FileExistsError:
+                    attempt += 1
+        finally:
+            os.remove(partial_path)
+
+
+def print_progress(done: int, total: int, task: ExportTask, error: Optional[str]):
+    """Консольный индикатор прогресса для ExportJob."""
+    table, file_format = task
+    mark = "❌" if error else "✅"
+    suffix = f": {error}" if error else ""
+    print(f"{mark} [{done}/{total}] {table}.{file_format}{suffix}")
@@ -0,0 +1,491 @@
+# exporters.py
+# Потоковые writer'ы для экспорта: записи пишутся в файл по одной,
+# поэтому память не зависит от размера таблицы. Запись — словарь или
+# объект модели (models.Model) с доступом по именам столбцов.
+#
+# Формат может иметь суффикс сжатия: json.gz, csv.xz и т. п. — writer пишет
+# в поток сжатия, не зная о нем. npz — колоночный формат для аналитики.
+import csv
+import gzip
+import io
+import json
+import lzma
+import math
+import os
+import struct
+import tempfile
+import zipfile
+from array import array
+from functools import lru_cache
+from json.encoder import encode_basestring
+from typing import Any, Dict, IO, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+from models import Model
+
+# Запись для writer'а: словарь или модель
+Record = Union[Mapping[str, Any], Model]
+
+# Форматы плоского экспорта
+EXPORT_FORMATS = ['json', 'csv', 'yaml', 'xml']
+# Компактные форматы для аналитики: JSON Lines и колоночный NumPy .npz
+ANALYTICS_FORMATS = ['jsonl', 'npz']
+
+# Суффикс сжатия -> функция открытия потока (уровни — компромисс скорости и размера)
+COMPRESSIONS = {
+    'gz': lambda path: gzip.open(path, 'wb', compresslevel=6),
+    'xz': lambda path: lzma.open(path, 'wb', preset=6),
+}
+
+
+class StreamWriter:
+    """Базовый потоковый writer: begin() -> write(record)... -> end()."""
+
+    # Режим открытия файла: текстовый или бинарный
+    binary = False
+
+    def __init__(self, stream: IO, root_tag: str, item_tag: str, fieldnames: List[str],
+                 list_tags: Optional[Dict[str, Tuple[str, str]]] = None):
+        self._stream = stream
+        self._root_tag = root_tag
+        self._item_tag = item_tag
+        self._fieldnames = fieldnames
+        # Для XML: поле-список -> (тег контейнера, тег элемента)
+        self._list_tags = list_tags or {}
+        self.count = 0
+
+    def begin(self):
+        pass
+
+    def write(self, record: Record):
+        raise NotImplementedError
+
+    def end(self):
+        pass
+
+
+class JsonStreamWriter(StreamWriter):
+    """JSON-массив, совпадающий по виду с json.dump(..., indent=2)."""
+
+    def begin(self):
+        self._stream.write("[")
+        # json.dumps с indent работает на медленном Python-кодировщике,
+        # поэтому скалярные значения кодируем быстрым C-кодировщиком сами
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        self._encode = lambda value: (encode_basestring(value) if type(value) is str
+                                      else str(value) if type(value) is int else encode(value))
+        self._key_prefixes: Dict[str, str] = {}
+
+    def _format(self, record: Record) -> str:
+        parts = []
+        for key, value in record.items():
+            prefix = self._key_prefixes.get(key)
+            if prefix is None:
+                prefix = self._key_prefixes[key] = "\n    " + self._encode(key) + ": "
+            if isinstance(value, list) and not any(isinstance(item, (dict, list)) for item in value):
+                text = ("[\n      " + ",\n      ".join(map(self._encode, value)) + "\n    ]"
+                        if value else "[]")
+            elif isinstance(value, (dict, list)):
+                text = json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n    ")
+            else:
+                text = self._encode(value)
+            parts.append(prefix + text)
+        return "{" + ",".join(parts) + "\n  }" if parts else "{}"
+
+    def write(self, record: Record):
+        self._stream.write(("," if self.count else "") + "\n  " + self._format(record))
+        self.count += 1
+
+    def end(self):
+        self._stream.write("\n]" if self.count else "]")
+
+
+class JsonLinesStreamWriter(StreamWriter):
+    """JSON Lines: по компактному объекту на строку, без отступов."""
+
+    def begin(self):
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    def write(self, record: Record):
+        self._stream.write(self._encode(dict(record.items())) + "\n")
+        self.count += 1
+
+
+class CsvStreamWriter(StreamWriter):
+    """CSV с заголовком из имен столбцов."""
+
+    def begin(self):
+        self._writer = csv.writer(self._stream)
+        self._writer.writerow(self._fieldnames)
+
+    def write(self, record: Record):
+        # Как csv.DictWriter: отсутствующие поля и None пишутся пустой строкой
+        self._writer.writerow([record.get(name, '') for name in self._fieldnames])
+        self.count += 1
+
+
+@lru_cache(maxsize=None)
+def _yaml_dumper():
+    """
+    Модуль yaml и safe-дампер, который пишет модели как словари.
+    PyYAML загружается при первом экспорте в YAML, а не при старте программы.
+    """
+    import yaml
+
+    class _YamlDumper(getattr(yaml, 'CSafeDumper', yaml.SafeDumper)):
+        pass
+
+    _YamlDumper.add_multi_representer(Model, lambda dumper, model: dumper.represent_dict(model))
+    return yaml, _YamlDumper
+
+
+class YamlStreamWriter(StreamWriter):
+    """
+    YAML-список, который дописывается пачками: фрагменты вида "- key: value"
+    складываются в один корректный список верхнего уровня.
+    """
+
+    chunk_size = 500
+
+    def begin(self):
+        self._buffer: List[Record] = []
+        self._yaml, self._dumper = _yaml_dumper()
+
+    def _flush(self):
+        if self._buffer:
+            self._yaml.dump(self._buffer, self._stream, Dumper=self._dumper,
+                      allow_unicode=True, default_flow_style=False)
+            self._buffer = []
+
+    def write(self, record: Record):
+        self._buffer.append(record)
+        self.count += 1
+        if len(self._buffer) >= self.chunk_size:
+            self._flush()
+
+    def end(self):
+        self._flush()
+        if not self.count:
+            self._stream.write("[]\n")
+
+
+class XmlStreamWriter(StreamWriter):
+    """XML через SAX-генератор с отступами как у utils.indent."""
+
+    binary = True
+
+    def begin(self):
+        from xml.sax.saxutils import XMLGenerator
+        self._xml = XMLGenerator(self._stream, encoding='utf-8', short_empty_elements=True)
+        self._xml.startDocument()
+        self._xml.startElement(self._root_tag, {})
+
+    def _element(self, tag: str, value: Any, level: int):
+        self._xml.ignorableWhitespace("\n" + "  " * level)
+        self._xml.startElement(tag, {})
+        if value is not None:
+            self._xml.characters(str(value))
+        self._xml.endElement(tag)
+
+    def write(self, record: Record):
+        self._xml.ignorableWhitespace("\n  ")
+        self._xml.startElement(self._item_tag, {})
+        for key, value in record.items():
+            if isinstance(value, list):
+                container_tag, item_tag = self._list_tags.get(key, (str(key), "Item"))
+                self._xml.ignorableWhitespace("\n    ")
+                self._xml.startElement(container_tag, {})
+                for item in value:
+                    self._element(item_tag, item, 3)
+                if value:
+                    self._xml.ignorableWhitespace("\n    ")
+                self._xml.endElement(container_tag)
+            else:
+                self._element(str(key), value, 2)
+        self._xml.ignorableWhitespace("\n  ")
+        self._xml.endElement(self._item_tag)
+        self.count += 1
+
+    def end(self):
+        self._xml.ignorableWhitespace("\n")
+        self._xml.endElement(self._root_tag)
+        self._xml.endDocument()
+        self._stream.write(b"\n")
+
+
+class _SpillColumn:
+    """
+    Столбец NpzColumnWriter: значения и флаги NULL копятся в компактных array
+    и по SPILL_ROWS сбрасываются во временные файлы, поэтому в памяти остается
+    не больше пачки значений на столбец плюс словарь уникальных строк.
+    """
+
+    SPILL_ROWS = 65536
+    # Тип столбца -> код array: целые и пока неизвестный — int64, дробные — float64, коды строк — int32
+    TYPECODES = {None: 'q', 'int': 'q', 'float': 'd', 'str': 'i'}
+
+    def __init__(self):
+        self.kind: Optional[str] = None
+        self.codes: Dict[str, int] = {}
+        self.has_nulls = False
+        self.count = 0
+        self._values = array('q')
+        self._nulls = array('b')
+        self._values_file = tempfile.TemporaryFile()
+        self._nulls_file = tempfile.TemporaryFile()
+
+    def _code(self, text: str) -> int:
+        code = self.codes.get(text)
+        if code is None:
+            code = self.codes[text] = len(self.codes)
+        return code
+
+    def _flush(self):
+        if self._values:
+            self._values.tofile(self._values_file)
+            self._nulls.tofile(self._nulls_file)
+            self._values = array(self.TYPECODES[self.kind])
+            self._nulls = array('b')
+
+    def chunks(self) -> Iterator[Tuple[array, array]]:
+        """Все значения столбца пачками: (значения, флаги NULL)."""
+        self._flush()
+        self._values_file.seek(0)
+        self._nulls_file.seek(0)
+        itemsize = self._values.itemsize
+        while True:
+            nulls = array('b', self._nulls_file.read(self.SPILL_ROWS))
+            if not nulls:
+                break
+            values = array(self.TYPECODES[self.kind], self._values_file.read(len(nulls) * itemsize))
+            yield values, nulls
+        self._values_file.seek(0, os.SEEK_END)
+        self._nulls_file.seek(0, os.SEEK_END)
+
+    def _convert(self, kind: str):
+        """Переводит уже накопленные значения в новый тип (int -> float, любой -> коды строк)."""
+        converted = tempfile.TemporaryFile()
+        for values, nulls in self.chunks():
+            if kind == 'float':
+                values = array('d', values)
+            else:
+                values = array('i', (-1 if is_null else self._code(str(value))
+                                     for value, is_null in zip(values, nulls)))
+            values.tofile(converted)
+        self._values_file.close()
+        self._values_file = converted
+        self.kind = kind
+        self._values = array(self.TYPECODES[kind])
+
+    def append(self, value: Any):
+        kind = self.kind
+        self.count += 1
+        if value is None:
+            self.has_nulls = True
+            self._nulls.append(1)
+            self._values.append(-1 if kind == 'str' else 0)
+        else:
+            self._nulls.append(0)
+            value_kind = ('int' if isinstance(value, int) and not isinstance(value, bool) else
+                          'float' if isinstance(value, float) else 'str')
+            if kind is None:
+                if value_kind != 'int':
+                    self._convert(value_kind)
+                else:
+                    self.kind = 'int'
+            elif kind != value_kind and kind != 'str' and not (kind == 'float' and value_kind == 'int'):
+                # Строковый столбец не перекодируется: новое значение попадает в его словарь
+                self._convert('float' if kind == 'int' and value_kind == 'float' else 'str')
+            if self.kind == 'str':
+                self._values.append(self._code(value if isinstance(value, str)
+                                               else json.dumps(value, ensure_ascii=False)))
+            else:
+                self._values.append(value)
+        if len(self._values) >= self.SPILL_ROWS:
+            self._flush()
+
+    def close(self):
+        self._values_file.close()
+        self._nulls_file.close()
+
+
+class NpzColumnWriter(StreamWriter):
+    """
+    Колоночный формат NumPy .npz: по члену <имя>.npy на массив, загружается
+    через numpy.load без разбора текста. Члены не сжаты, поэтому
+    load_npz_columns отображает их в память прямо из архива (np.load для .npz
+    mmap_mode не поддерживает). Массивы:
+      <столбец>        — int64 / float64 (NULL в целых — маска <столбец>__null,
+                         в дробных — NaN) или int32-коды строк (NULL = -1);
+      <столбец>__dict  — словарь строк для кодов (строки и списки как JSON);
+      __columns__, __kinds__ — порядок столбцов и их типы (int / float / str).
+    Столбцы копятся во временных файлах (_SpillColumn) и в end() переписываются
+    в архив пачками, поэтому память не зависит от числа строк (кроме уникальных строк).
+    """
+
+    binary = True
+
+    def begin(self):
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("Для формата npz нужен пакет NumPy (pip install numpy)") from None
+        self._numpy = numpy
+        self._columns: Dict[str, _SpillColumn] = {name: _SpillColumn() for name in self._fieldnames}
+
+    def write(self, record: Record):
+        for name, value in record.items():
+            column = self._columns.get(name)
+            if column is None:
+                # Новый столбец: предыдущие записи получают NULL
+                column = self._columns[name] = _SpillColumn()
+                for _ in range(self.count):
+                    column.append(None)
+            column.append(value)
+        for column in self._columns.values():
+            # Столбцы, отсутствующие в записи, — NULL
+            if column.count == self.count:
+                column.append(None)
+        self.count += 1
+
+    def _write_member(self, archive: zipfile.ZipFile, name: str, dtype: Any, length: int, chunks: Iterable):
+        """Пишет член архива <name>.npy: заголовок формата .npy и данные пачками."""
+        np = self._numpy
+        dtype = np.dtype(dtype)
+        header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (length,)}
+        with archive.open(f"{name}.npy", 'w', force_zip64=True) as member:
+            np.lib.format.write_array_header_1_0(member, header)
+            for chunk in chunks:
+                member.write(np.ascontiguousarray(chunk, dtype=dtype).tobytes())
+
+    def _column_values(self, column: _SpillColumn, kind: str) -> Iterator[Any]:
+        np = self._numpy
+        for values, nulls in column.chunks():
+            if kind == 'float':
+                data = np.frombuffer(values, dtype=np.float64).copy()
+                data[np.frombuffer(nulls, dtype=np.int8).astype(bool)] = np.nan
+                yield data
+            else:
+                yield np.frombuffer(values, dtype=np.int32 if kind == 'str' else np.int64)
+
+    def _column_nulls(self, column: _SpillColumn) -> Iterator[Any]:
+        np = self._numpy
+        for _, nulls in column.chunks():
+            yield np.frombuffer(nulls, dtype=np.int8).astype(bool)
+
+    def end(self):
+        np = self._numpy
+        kinds = []
+        try:
+            with zipfile.ZipFile(self._stream, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+                for name, column in self._columns.items():
+                    kind = column.kind or 'int'
+                    kinds.append(kind)
+                    dtype = {'int': np.int64, 'float': np.float64, 'str': np.int32}[kind]
+                    self._write_member(archive, name, dtype, column.count, self._column_values(column, kind))
+                    if kind == 'str':
+                        words = np.array(list(column.codes), dtype=str)
+                        self._write_member(archive, f"{name}__dict", words.dtype, len(words), [words])
+                    elif kind == 'int' and column.has_nulls:
+                        self._write_member(archive, f"{name}__null", bool, column.count,
+                                           self._column_nulls(column))
+                for name, items in (('__columns__', list(self._columns)), ('__kinds__', kinds)):
+                    values = np.array(items, dtype=str)
+                    self._write_member(archive, name, values.dtype, len(values), [values])
+        finally:
+            for column in self._columns.values():
+                column.close()
+
+
+def load_npz_columns(file_path: str, mmap_mode: Optional[str] = 'r') -> Dict[str, Any]:
+    """
+    Открывает архив NpzColumnWriter: имя массива -> массив. Несжатые члены
+    отображаются в память (np.memmap по смещению данных внутри архива);
+    при mmap_mode=None или сжатом члене массив читается целиком.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError("Для формата npz нужен пакет NumPy (pip install numpy)") from None
+    arrays: Dict[str, Any] = {}
+    with zipfile.ZipFile(file_path) as archive, open(file_path, 'rb') as raw:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if mmap_mode is None or info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            # Данные члена начинаются после локального заголовка zip (30 байт + имя + extra)
+            raw.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', raw.read(4))
+            raw.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(raw)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(raw)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(raw)
+            if not math.prod(shape):
+                # Пустой массив отобразить в память нельзя
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(file_path, dtype=dtype, mode=mmap_mode, offset=raw.tell(),
+                                         shape=shape, order='F' if fortran_order else 'C')
+    return arrays
+
+
+WRITERS = {
+    'json': JsonStreamWriter,
+    'jsonl': JsonLinesStreamWriter,
+    'csv': CsvStreamWriter,
+    'yaml': YamlStreamWriter,
+    'xml': XmlStreamWriter,
+    'npz': NpzColumnWriter,
+}
+
+
+def split_format(file_format: str) -> Tuple[str, Optional[str]]:
+    """Разбирает формат на базовый и сжатие: 'csv.gz' -> ('csv', 'gz')."""
+    base, _, compression = file_format.lower().partition('.')
+    if base not in WRITERS or (compression and (compression not in COMPRESSIONS or base == 'npz')):
+        raise ValueError(f"Неподдерживаемый формат: {file_format}")
+    return base, compression or None
+
+
+def is_supported_format(file_format: str) -> bool:
+    """Поддерживается ли формат экспорта (с учетом суффикса сжатия)."""
+    try:
+        split_format(file_format)
+    except ValueError:
+        return False
+    return True
+
+
+def supports_nested(file_format: str) -> bool:
+    """Подходит ли формат для вложенного экспорта (списки внутри записей): CSV — нет."""
+    return split_format(file_format)[0] != 'csv'
+
+
+def supported_formats() -> List[str]:
+    """Все форматы экспорта: базовые, их сжатые варианты и npz."""
+    text_formats = [f for f in WRITERS if f != 'npz']
+    return text_formats + [f"{f}.{c}" for f in text_formats for c in COMPRESSIONS] + ['npz']
+
+
+def open_output(file_path: str, file_format: str) -> IO:
+    """Открывает файл (или поток сжатия) в режиме, нужном writer'у формата."""
+    base, compression = split_format(file_format)
+    newline = '' if base == 'csv' else None
+    if compression is None:
+        if WRITERS[base].binary:
+            return open(file_path, 'wb')
+        return open(file_path, 'w', newline=newline, encoding='utf-8')
+    stream = COMPRESSIONS[compression](file_path)
+    if WRITERS[base].binary:
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8', newline=newline)
+
+
+def create_writer(file_format: str, stream: IO, root_tag: str, item_tag: str,
+                  fieldnames: Optional[List[str]] = None,
+                  list_tags: Optional[Dict[str, Tuple[str, str]]] = None) -> StreamWriter:
+    """Создает writer для формата (суффикс сжатия учитывается в open_output)."""
+    base, _ = split_format(file_format)
+    return WRITERS[base](stream, root_tag, item_tag, fieldnames or [], list_tags)
@@ -0,0 +1,257 @@
+# importers.py
+# Потоковое чтение файлов в форматах экспорта (JSON / JSON Lines / CSV / YAML / XML)
+# и проверка записей перед массовой загрузкой.
+import csv
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+from utils import FIELD_LIMITS, check_length
+from passwords import is_password_hash
+
+IMPORT_FORMATS = ['json', 'jsonl', 'csv', 'yaml', 'xml']
+
+# Описание импортируемых таблиц: первичный ключ и поля
+# (столбец, тип, ключ ограничений длины в FIELD_LIMITS, обязательное ли поле).
+# Тип 'password' — текст, который перед загрузкой хэшируется, если это еще не хэш.
+IMPORT_TABLES: Dict[str, Dict[str, Any]] = {
+    'User': {
+        'id': 'User_ID',
+        'fields': [
+            ('Surname', 'text', 'Surname', True),
+            ('Name', 'text', 'Name', True),
+            ('Password', 'password', 'Password', True),
+        ],
+    },
+    'Coach': {
+        'id': 'Coach_ID',
+        'fields': [
+            ('Internal_number', 'int', None, True),
+            ('Surname', 'text', 'Surname', True),
+            ('Name', 'text', 'Name', True),
+            ('Experience', 'int', None, False),
+            ('Password', 'password', 'Password', True),
+        ],
+        'defaults': {'Experience': 0},
+    },
+    'Inventory': {
+        'id': 'Inventory_ID',
+        'fields': [
+            ('Name', 'text', 'Inventory.Name', True),
+            ('Count', 'int', None, True),
+            ('Comment', 'text', 'Inventory.Comment', False),
+        ],
+    },
+}
+
+
+# 1. ЧТЕНИЕ ФАЙЛОВ
+
+@dataclass
+class BadRecord:
+    """Запись, которую не удалось разобрать: iter_records отдает ее на месте записи."""
+    error: str
+
+
+def detect_format(file_path: str) -> str:
+    """Определяет формат файла по расширению."""
+    extension = os.path.splitext(file_path)[1].lower().lstrip('.')
+    return 'yaml' if extension == 'yml' else extension
+
+
+def _iter_json_array(stream: IO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Читает элементы JSON-массива по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def skip(chars: str) -> bool:
+        """Пропускает символы из chars, подчитывая файл. False — достигнут конец файла."""
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer):
+                return True
+            if eof:
+                return False
+            data = stream.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + data, 0, not data
+
+    if not skip(" \t\r\n") or buffer[pos] != '[':
+        raise ValueError("Ожидался JSON-массив")
+    pos += 1
+    while skip(" \t\r\n,"):
+        if buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            data = stream.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + data, 0, not data
+            continue
+        yield item
+        pos = end
+    raise ValueError("JSON-массив не закрыт")
+
+
+def _iter_yaml_list(stream: IO) -> Iterator[Any]:
+    """
+    Читает YAML-список верхнего уровня по одному элементу (формат, который пишет экспорт).
+    Файлы другой структуры читаются целиком.
+    """
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+    def parse(text: str) -> List[Any]:
+        try:
+            data = yaml.load(text, Loader=loader)
+        except yaml.YAMLError as e:
+            # В тексте ошибки только описание: фрагмент строки может содержать пароль
+            return [BadRecord(f"Некорректный YAML: {getattr(e, 'problem', None) or type(e).__name__}")]
+        return data if isinstance(data, list) else [data]
+
+    block: List[str] = []
+    for line in stream:
+        if not block and (not line.strip() or line.startswith('#')):
+            continue
+        if not block and not (line.startswith('- ') or line.rstrip('\r\n') == '-'):
+            yield from parse(line + stream.read())
+            return
+        if block and (line.startswith('- ') or line.rstrip('\r\n') == '-'):
+            yield from parse("".join(block))
+            block = []
+        block.append(line)
+    if block:
+        yield from parse("".join(block))
+
+
+def _iter_xml_records(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Читает записи XML (дочерние элементы корня) через iterparse, очищая прочитанное."""
+    import xml.etree.ElementTree as ET
+    depth = 0
+    root = None
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if root is None:
+                root = elem
+            continue
+        depth -= 1
+        if depth == 1:
+            yield {child.tag: child.text or "" for child in elem}
+            root.clear()
+
+
+def _iter_json_lines(stream: IO) -> Iterator[Any]:
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield BadRecord(f"Некорректный JSON: {e}")
+
+
+def _iter_csv(stream: IO) -> Iterator[Any]:
+    reader = csv.DictReader(stream)
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield BadRecord(f"Некорректная строка CSV: {e}")
+            continue
+        yield record
+
+
+def _until_error(records: Iterator[Any], errors: tuple) -> Iterator[Any]:
+    """Отдает записи до ошибки разбора; ошибка становится последней записью BadRecord."""
+    try:
+        yield from records
+    except errors as e:
+        yield BadRecord(f"Ошибка разбора файла: {e}; остаток файла не прочитан")
+
+
+def iter_records(file_path: str, file_format: Optional[str] = None) -> Iterator[Any]:
+    """
+    Потоково читает записи из файла в одном из форматов IMPORT_FORMATS.
+    Запись, которую не удалось разобрать, отдается как BadRecord: в JSON Lines, CSV
+    и YAML чтение продолжается со следующей записи, а в JSON и XML после ошибки
+    граница записей неизвестна, и остаток файла не читается.
+    """
+    file_format = file_format or detect_format(file_path)
+    if file_format == 'xml':
+        import xml.etree.ElementTree as ET
+        yield from _until_error(_iter_xml_records(file_path), (ET.ParseError, ValueError))
+        return
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат: {file_format}")
+
+    with open(file_path, 'r', newline='' if file_format == 'csv' else None, encoding='utf-8') as f:
+        if file_format == 'csv':
+            records = _iter_csv(f)
+        elif file_format == 'jsonl':
+            records = _iter_json_lines(f)
+        elif file_format == 'json':
+            records = _iter_json_array(f)
+        else:
+            records = _iter_yaml_list(f)
+        # ValueError — в том числе JSONDecodeError и UnicodeDecodeError
+        yield from _until_error(records, (ValueError,))
+
+
+# 2. ПРОВЕРКА ЗАПИСЕЙ
+
+def _to_int(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, int):
+        return value
+    return int(str(value).strip())
+
+
+def validate_record(table_name: str, record: Any) -> Tuple[Optional[tuple], Optional[str]]:
+    """
+    Проверяет запись по правилам консольного ввода.
+    Возвращает (параметры для вставки: id + поля, None) или (None, текст ошибки).
+    """
+    if not isinstance(record, dict):
+        return None, "Запись должна быть объектом"
+    spec = IMPORT_TABLES[table_name]
+
+    raw_id = record.get(spec['id'])
+    try:
+        row_id = None if raw_id in (None, "") else _to_int(raw_id)
+    except (TypeError, ValueError):
+        return None, f"{spec['id']}: ожидалось целое число"
+
+    values: List[Any] = [row_id]
+    for column, kind, limits_key, required in spec['fields']:
+        value = record.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ""):
+            if required:
+                return None, f"{column}: обязательное поле"
+            values.append(spec.get('defaults', {}).get(column))
+            continue
+        if kind == 'int':
+            try:
+                value = _to_int(value)
+            except (TypeError, ValueError):
+                return None, f"{column}: ожидалось целое число"
+        else:
+            value = str(value)
+            if kind == 'password' and is_password_hash(value):
+                pass  # хэш из ранее выгруженных данных, длина исходного пароля неизвестна
+            elif limits_key:
+                error = check_length(value, *FIELD_LIMITS[limits_key])
+                if error:
+                    return None, f"{column}: {error}"
+        values.append(value)
+    return tuple(values), None
@@ -1,39 +1,105 @@
+import time
+_STARTED = time.perf_counter()
+
 import sys
 import os
-from typing import Dict, Tuple, Callable, Any, List
-from db_config import create_tables, insert_sample_data
-from utils import get_validated_input, get_int_input
-from repositories.user_repo import UserRepository
-from repositories.coach_repo import CoachRepository
-from repositories.inventory_repo import InventoryRepository
-from repositories.booking_repo import BookingRepository
+import importlib
+import threading
+from typing import Dict, Tuple, Callable, Any, List, Optional
+from db_config import create_tables, insert_sample_data, is_database_empty, close_all_pools
+from utils import get_validated_input, get_int_input, paginate, parse_datetime
+from auth import AuthService
+from passwords import PASSWORD_MASK
+from models import Inventory
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # 1. ИНИЦИАЛИЗАЦИЯ РЕПОЗИТОРИЕВ
 
+# Репозиторий -> (модуль, класс). Модуль загружается при первом обращении к репозиторию:
+# экспорт, импорт и журнал изменений не замедляют запуск, пока ими не пользуются
+REPOSITORY_CLASSES: Dict[str, Tuple[str, str]] = {
+    'User': ('repositories.user_repo', 'UserRepository'),
+    'Coach': ('repositories.coach_repo', 'CoachRepository'),
+    'Inventory': ('repositories.inventory_repo', 'InventoryRepository'),
+    'Booking': ('repositories.booking_repo', 'BookingRepository'),
+    'Import': ('repositories.import_repo', 'ImportRepository'),
+    'Stats': ('repositories.stats_repo', 'StatsRepository'),
+    'Change': ('repositories.change_repo', 'ChangeRepository'),
+}
+
+
+class LazyRepositories(dict):
+    """Словарь репозиториев, который создает репозиторий при первом обращении по имени."""
+
+    def __init__(self, db_name: str):
+        super().__init__()
+        self.db_name = db_name
+
+    def __missing__(self, name: str):
+        module_name, class_name = REPOSITORY_CLASSES[name]
+        repository = getattr(importlib.import_module(module_name), class_name)(self.db_name)
+        # Репозитории не хранят состояния: при гонке потоков остается первый созданный
+        return self.setdefault(name, repository)
+
+
 REPOSITORIES: Dict[str, Any] = {}
+AUTH: Optional[AuthService] = None
+DB_NAME = "coaching.db"
+
+# Размер страницы в списках
+PAGE_SIZE = 20
+
+# Замеры запуска: (этап, секунды). Отчет печатается при COACHING_STARTUP_REPORT=1
+STARTUP_TIMINGS: List[Tuple[str, float]] = []
+_last_mark = _STARTED
+
+
+def mark_startup(phase: str):
+    """Записывает длительность этапа запуска (время с предыдущей отметки)."""
+    global _last_mark
+    now = time.perf_counter()
+    STARTUP_TIMINGS.append((phase, now - _last_mark))
+    _last_mark = now
+
+
+def print_startup_report(stream=None):
+    """
+    Печатает длительность этапов запуска. Подробности по модулям дает
+    python -X importtime main.py.
+    """
+    stream = stream or sys.stderr
+    total = sum(seconds for _, seconds in STARTUP_TIMINGS)
+    print(f"ℹ️ Запуск: {total * 1000:.1f} мс", file=stream)
+    for phase, seconds in STARTUP_TIMINGS:
+        print(f"   {phase:<28} {seconds * 1000:>8.1f} мс", file=stream)
+
+
+def startup_report_enabled() -> bool:
+    return os.environ.get('COACHING_STARTUP_REPORT', '') not in ('', '0')
+
 
 def initialize_repositories(db_name: str):
-    """Инициализирует все репозитории для использования в меню."""
-    global REPOSITORIES
-    REPOSITORIES = {
-        'User': UserRepository(db_name),
-        'Coach': CoachRepository(db_name),
-        'Inventory': InventoryRepository(db_name),
-        'Booking': BookingRepository(db_name),
-    }
+    """Готовит репозитории для меню (сами репозитории создаются при первом обращении)."""
+    global REPOSITORIES, AUTH, DB_NAME
+    DB_NAME = db_name
+    AUTH = AuthService(db_name)
+    REPOSITORIES = LazyRepositories(db_name)
 
 # 2. ФУНКЦИИ ВВОДА/ВЫВОДА (UI Handlers)
 
-def display_inventory_list() -> List[Dict[str, Any]]:
-    """Показывает доступный инвентарь и возвращает его список."""
-    inventory = REPOSITORIES['Inventory'].get_all("Inventory")
-    if inventory:
-        print("\n--- Доступный инвентарь (ID | Название | Кол-во) ---")
-        for item in inventory:
-            print(f"ID {item['Inventory_ID']}: {item['Name']} (x{item['Count']})")
-    else:
+def display_inventory_list() -> List[Inventory]:
+    """Показывает доступный инвентарь постранично и возвращает показанные записи."""
+    inventory: List[Inventory] = []
+
+    def render(item: Inventory):
+        if not inventory:
+            print("\n--- Доступный инвентарь (ID | Название | Кол-во) ---")
+        inventory.append(item)
+        print(f"ID {item['Inventory_ID']}: {item['Name']} (x{item['Count']})")
+
+    paginate(lambda after: REPOSITORIES['Inventory'].get_inventory_page(after, PAGE_SIZE, as_model=True), render)
+    if not inventory:
         print("ℹ️ Инвентарь отсутствует.")
     return inventory
 
@@ -87,6 +153,14 @@ def add_booking_from_console():
         print("❌ Все поля, кроме инвентаря, обязательны.")
         return
 
+    start_ts, end_ts = parse_datetime(time_start), parse_datetime(time_end)
+    if start_ts is None or end_ts is None:
+        print("❌ Некорректное время. Используйте формат YYYY-MM-DD HH:MM:SS.")
+        return
+    if end_ts <= start_ts:
+        print("❌ Время окончания должно быть позже времени начала.")
+        return
+
     # 2. Запрос инвентаря
     display_inventory_list()
     inventory_ids_str = input("Введите ID инвентаря через запятую (напр., 1,3,4): ")
@@ -98,6 +172,8 @@ def add_booking_from_console():
         print("❌ Ошибка ввода инвентаря. Используйте только числа, разделенные запятыми.")
         return
 
+    # 3. Занятость тренера и клиента и остаток инвентаря проверяются в транзакции вставки:
+    # отдельная проверка заранее не защищает от параллельного бронирования того же предмета
     booking_data = {
         'Coach_ID': coach_id, 'User_ID': user_id, 
         'Time_start': time_start, 'Time_end': time_end, 
@@ -114,7 +190,8 @@ def add_inventory_from_console():
     print("\n--- Добавление нового инвентаря ---")
     inventory_data = {
         'Name': get_validated_input("Введите название инвентаря (1-50): ", max_len=50),
-        'Count': get_int_input("Введите количество: ")
+        'Count': get_int_input("Введите количество: "),
+        'Comment': get_validated_input("Введите комментарий (0-100): ", min_len=0, max_len=100) or None
     }
 
     if inventory_data['Count'] is None:
@@ -165,7 +242,8 @@ def modify_data():
     elif choice == '3':
         inventory_data = {
             'Name': get_validated_input("Новое название: ", max_len=50),
-            'Count': get_int_input("Новое количество: ")
+            'Count': get_int_input("Новое количество: "),
+            'Comment': get_validated_input("Новый комментарий: ", min_len=0, max_len=100) or None
         }
         if REPOSITORIES['Inventory'].update_inventory(item_id, inventory_data):
             print("✅ Инвентарь обновлен.")
@@ -204,46 +282,47 @@ def delete_data():
 def display_users():
     """Выводит детали всех пользователей."""
     print("\n--- Список пользователей ---")
-    users = REPOSITORIES['User'].display_all_users_details()
-    if users:
-        for u in users:
-            print(f"ID: {u['User_ID']}, {u['Surname']} {u['Name']}, Пароль: {u['Password']}")
-    else:
+    shown = paginate(
+        lambda after: REPOSITORIES['User'].get_users_page(after, PAGE_SIZE, as_model=True),
+        lambda u: print(f"ID: {u['User_ID']}, {u['Surname']} {u['Name']}, Пароль: {PASSWORD_MASK}"))
+    if not shown:
         print("ℹ️ Нет зарегистрированных пользователей.")
 
 def display_coaches():
     """Выводит детали всех тренеров."""
     print("\n--- Список тренеров ---")
-    coaches = REPOSITORIES['Coach'].display_all_coaches_details()
-    if coaches:
-        for c in coaches:
-            print(f"ID: {c['Coach_ID']}, Номер: {c['Internal_number']}, {c['Surname']} {c['Name']}, Опыт: {c['Experience']} г., Пароль: {c['Password']}")
-    else:
+    shown = paginate(
+        lambda after: REPOSITORIES['Coach'].get_coaches_page(after, PAGE_SIZE, as_model=True),
+        lambda c: print(f"ID: {c['Coach_ID']}, Номер: {c['Internal_number']}, {c['Surname']} {c['Name']}, Опыт: {c['Experience']} г., Пароль: {PASSWORD_MASK}"))
+    if not shown:
         print("ℹ️ Нет зарегистрированных тренеров.")
 
 def display_bookings_details():
     """Выводит детали всех бронирований."""
     print("\n--- Список бронирований (подробно) ---")
-    bookings = REPOSITORIES['Booking'].display_all_bookings_details()
-    if bookings:
-        for b in bookings:
-            inventory = ", ".join(b.pop('Inventory_list')) if b['Inventory_list'] else "Нет инвентаря"
-            print(f"ID: {b['Booking_ID']} | Номер: {b['Number_booking']} | Тренер: {b['Coach']} | Пользователь: {b['User']}")
-            print(f"    Время: {b['Time_start']} - {b['Time_end']}")
-            print(f"    Инвентарь: {inventory}\n")
-    else:
+
+    def render(b: Dict[str, Any]):
+        inventory = ", ".join(b['Inventory_list']) if b['Inventory_list'] else "Нет инвентаря"
+        print(f"ID: {b['Booking_ID']} | Номер: {b['Number_booking']} | Тренер: {b['Coach']} | Пользователь: {b['User']}")
+        print(f"    Время: {b['Time_start']} - {b['Time_end']}")
+        print(f"    Инвентарь: {inventory}\n")
+
+    shown = paginate(lambda after: REPOSITORIES['Booking'].get_bookings_details_page(after, PAGE_SIZE), render)
+    if not shown:
         print("ℹ️ Нет активных бронирований.")
 
 
 def export_flat_data():
     """Интерфейс для плоского экспорта."""
+    from exporters import is_supported_format
     print("\n--- Универсальный экспорт таблицы ---")
     table_name = get_validated_input("Введите имя таблицы (User, Coach, Inventory): ").capitalize()
     if table_name not in ['User', 'Coach', 'Inventory']: 
         print("❌ Неверное имя таблицы."); return
 
-    file_format = get_validated_input("Выберите формат (json / csv / yaml / xml): ", max_len=4).lower()
-    if file_format not in ['json', 'csv', 'yaml', 'xml']:
+    file_format = get_validated_input("Выберите формат (json / csv / yaml / xml; для аналитики — jsonl, npz,\n"
+                                      "сжатие — суффикс .gz или .xz, например csv.gz): ", max_len=8).lower()
+    if not is_supported_format(file_format):
         print("❌ Неподдерживаемый формат.")
         return
 
@@ -252,9 +331,11 @@ def export_flat_data():
 
 def export_nested_booking():
     """Интерфейс для вложенного экспорта бронирований."""
+    from exporters import is_supported_format, supports_nested
     print("\n--- Вложенный экспорт бронирований ---")
-    file_format = get_validated_input("Выберите формат (json / yaml / xml): ", max_len=4).lower()
-    if file_format not in ['json', 'yaml', 'xml']:
+    file_format = get_validated_input("Выберите формат (json / yaml / xml / jsonl / npz, сжатие — .gz или .xz): ",
+                                      max_len=8).lower()
+    if not is_supported_format(file_format) or not supports_nested(file_format):
         print("❌ Неподдерживаемый формат.")
         return
         
@@ -262,6 +343,135 @@ def export_nested_booking():
 
 
 
+def export_all_data():
+    """Интерфейс для полного экспорта всех таблиц в архив."""
+    from export_job import ExportCancelled, ExportJob, print_progress
+    print("\n--- Полный экспорт (архив) ---")
+    answer = input("Форматы через запятую (json / csv / yaml / xml, а также jsonl, npz, csv.gz и т. п.; "
+                   "Enter — json / csv / yaml / xml): ").strip().lower()
+    formats = [f.strip() for f in answer.split(',') if f.strip()] or None
+    try:
+        job = ExportJob(DB_NAME, formats=formats, progress=print_progress)
+    except ValueError as e:
+        print(f"❌ {e}"); return
+
+    # Задание выполняется в отдельном потоке, чтобы Ctrl+C отменял его, а не прерывал меню
+    outcome: Dict[str, Any] = {}
+
+    def run_job():
+        try:
+            outcome['path'] = job.run()
+        except Exception as e:
+            outcome['error'] = e
+
+    worker = threading.Thread(target=run_job, name="export-job")
+    worker.start()
+    print("ℹ️ Экспорт запущен (Ctrl+C — отмена).")
+    while worker.is_alive():
+        try:
+            worker.join(0.5)
+        except KeyboardInterrupt:
+            print("\nℹ️ Отмена экспорта...")
+            job.cancel()
+
+    error = outcome.get('error')
+    if isinstance(error, ExportCancelled):
+        print("ℹ️ Экспорт отменен, архив не создан.")
+    elif error is not None:
+        print(f"❌ {error}")
+    else:
+        print(f"✅ Архив создан: {outcome['path']}")
+
+
+def export_changes():
+    """Интерфейс для инкрементального экспорта (изменения с прошлой выгрузки потребителя)."""
+    from exporters import is_supported_format
+    print("\n--- Экспорт изменений (дельта) ---")
+    table_name = get_validated_input("Таблица (User, Coach, Inventory, Booking, Booking_inventory, "
+                                     "Bookings_nested; Enter — все): ", min_len=0)
+    file_format = get_validated_input("Формат (json / csv / yaml / xml / jsonl / npz, сжатие — .gz или .xz): ",
+                                      max_len=8).lower()
+    if not is_supported_format(file_format):
+        print("❌ Неподдерживаемый формат.")
+        return
+    consumer = get_validated_input("Потребитель (Enter — default): ", min_len=0) or "default"
+
+    if table_name:
+        REPOSITORIES['Change'].export_changes_to_file(table_name, file_format, consumer)
+    else:
+        REPOSITORIES['Change'].export_all_changes(file_format, consumer)
+
+
+def import_flat_data():
+    """Интерфейс для массового импорта таблицы из файла."""
+    print("\n--- Массовый импорт таблицы ---")
+    table_name = get_validated_input("Введите имя таблицы (User, Coach, Inventory): ").capitalize()
+    if table_name not in ['User', 'Coach', 'Inventory']:
+        print("❌ Неверное имя таблицы."); return
+
+    file_path = get_validated_input("Путь к файлу (json / jsonl / csv / yaml / xml): ", max_len=260)
+    if not os.path.isfile(file_path):
+        print("❌ Файл не найден.")
+        return
+
+    try:
+        summary = REPOSITORIES['Import'].import_file(table_name, file_path)
+    except Exception as e:
+        print(f"❌ Ошибка при импорте: {e}")
+        return
+
+    print(f"✅ Загружено записей: {summary['imported']}, отклонено: {summary['rejected']}.")
+    if summary['hashed']:
+        print(f"ℹ️ Хэшировано паролей: {summary['hashed']}. Пароли, уже хэшированные "
+              f"(как в выгрузке БД), загружаются без пересчета и намного быстрее.")
+    if summary['errors_path']:
+        print(f"ℹ️ Отклоненные строки: {summary['errors_path']}")
+
+
+def change_inventory_status():
+    """Интерфейс для смены статуса инвентаря в бронировании."""
+    print("\n--- Смена статуса инвентаря ---")
+    booking_id = get_int_input("Введите ID бронирования: ")
+    inventory_id = get_int_input("Введите ID инвентаря: ")
+    if not booking_id or not inventory_id:
+        print("❌ ID обязательны."); return
+    status_id = get_int_input("Новый статус (1 - Забронировано, 2 - В использовании, 3 - Доступно, 4 - Возвращено): ")
+    if status_id not in (1, 2, 3, 4):
+        print("❌ Неверный статус."); return
+
+    if REPOSITORIES['Booking'].update_inventory_status(booking_id, inventory_id, status_id):
+        print("✅ Статус обновлен.")
+
+
+def display_usage_report():
+    """Отчет об использовании инвентаря и загрузке тренеров за последние N дней."""
+    print("\n--- Отчет за N дней ---")
+    days = get_int_input("Количество дней: ")
+    if not days or days < 1:
+        print("❌ Число дней должно быть положительным."); return
+    report = REPOSITORIES['Stats'].get_usage_report(days)
+    print(f"Период: {report['From']} — {report['To']}")
+
+    print("\nИнвентарь:")
+    if not report['Items']:
+        print("  ℹ️ Нет бронирований инвентаря.")
+    for item in report['Items']:
+        print(f"  [{item['Inventory_ID']}] {item['Name']}: бронирований {item['Bookings']}, дней с бронированием {item['Active_days']}")
+
+    print("\nТренеры:")
+    if not report['Coaches']:
+        print("  ℹ️ Нет бронирований.")
+    for coach in report['Coaches']:
+        print(f"  [{coach['Coach_ID']}] {coach['Surname']} {coach['Name']}: бронирований {coach['Bookings']}")
+
+    print("\nСмены статусов:")
+    if not report['Transitions']:
+        print("  ℹ️ Нет смен статусов.")
+    for t in report['Transitions']:
+        source = t['From_status'] or 'новый'
+        print(f"  {source} -> {t['To_status']}: {t['Transitions']}")
+
+
 # 3. МЕНЮ И РОЛИ (Menu & Policy)
 
 # Карта действий (Action Map)
@@ -280,14 +490,21 @@ ACTION_MAP: Dict[str, Tuple[str, Callable]] = {
     # EXPORT
     "EXP_FLAT": ("Экспорт таблицы (JSON/CSV/YAML/XML)", export_flat_data),
     "EXP_NESTED": ("Экспорт Бронирований (вложенный JSON/YAML/XML)", export_nested_booking),
+    "EXP_ALL": ("Полный экспорт всех таблиц (архив)", export_all_data),
+    "EXP_DELTA": ("Экспорт изменений с прошлой выгрузки (дельта)", export_changes),
+    # IMPORT
+    "IMP_FLAT": ("Импорт таблицы (JSON/CSV/YAML/XML)", import_flat_data),
+    # STATS
+    "STATUS": ("Сменить статус инвентаря в бронировании", change_inventory_status),
+    "REPORT": ("Отчет за N дней", display_usage_report),
     # EXIT
     "EXIT": ("Выйти из программы", sys.exit)
 }
 
 # Политика доступа (Role Policy)
 ROLE_POLICY: Dict[str, List[str]] = {
-    'Admin': ["ADD_U", "ADD_C", "ADD_B", "ADD_I","MODIFY","DELETE", "SHOW_U", "SHOW_C", "SHOW_B", "EXP_FLAT", "EXP_NESTED", "EXIT"],
-    'Coach': ["ADD_U", "ADD_B", "SHOW_C", "SHOW_B", "SHOW_U", "EXIT"],
+    'Admin': ["ADD_U", "ADD_C", "ADD_B", "ADD_I","MODIFY","DELETE", "SHOW_U", "SHOW_C", "SHOW_B", "EXP_FLAT", "EXP_NESTED", "EXP_ALL", "EXP_DELTA", "IMP_FLAT", "STATUS", "REPORT", "EXIT"],
+    'Coach': ["ADD_U", "ADD_B", "SHOW_C", "SHOW_B", "SHOW_U", "STATUS", "EXIT"],
     'User': ["ADD_B", "SHOW_B", "EXIT"],
 }
 
@@ -326,10 +543,21 @@ def main_menu(current_user_role: str):
 # 4. ТОЧКА ЗАПУСКА
 
 def start_program(db_name: str = "coaching.db"):
-    # 1. Инициализация БД и данных
-    create_tables(db_name)
-    insert_sample_data(db_name)
+    # 1. Инициализация БД и данных (если схема актуальна — только проверка версии
+    # и одно чтение User, чтобы пустая БД тоже получила тестовые данные)
+    if create_tables(db_name):
+        mark_startup("миграции схемы")
+        insert_sample_data(db_name)
+        mark_startup("тестовые данные")
+    else:
+        mark_startup("проверка версии схемы")
+        if is_database_empty(db_name):
+            insert_sample_data(db_name)
+            mark_startup("тестовые данные")
     initialize_repositories(db_name)
+    mark_startup("репозитории")
+    if startup_report_enabled():
+        print_startup_report()
 
     while True:
         print("\n" + "="*40)
@@ -343,8 +571,9 @@ def start_program(db_name: str = "coaching.db"):
         username = input("Введите Логин: ")
         password = input("Введите Пароль: ")
         
-        # Аутентификация через репозиторий
-        current_user_role = REPOSITORIES['User'].authenticate(username, password)
+        # Аутентификация: один запрос к БД, проверка хэша в пуле, токен сессии
+        session = AUTH.login(username, password)
+        current_user_role = session.role if session else None
         
         if current_user_role:
             print(f"✅ Успешный вход! Ваша роль: **{current_user_role}**.")
@@ -355,6 +584,7 @@ def start_program(db_name: str = "coaching.db"):
                     main_menu(current_user_role)
                 except SystemExit:
                     print("\nЗавершение программы.")
+                    close_all_pools()
                     sys.exit() 
                 except Exception as e:
                     print(f"Неизвестная ошибка в меню: {e}")
@@ -364,8 +594,18 @@ def start_program(db_name: str = "coaching.db"):
         continue_choice = input("Хотите попробовать войти снова? (д/н): ").lower()
         if continue_choice != 'д':
             print("\nЗавершение программы.")
+            close_all_pools()
             sys.exit() 
 
 
+mark_startup("загрузка модулей")
+
+
 if __name__ == '__main__':
+    # С аргументами — командный режим (python main.py --help), без них — интерактивное меню
+    if len(sys.argv) > 1:
+        # cli импортирует main: отдаем ему уже загруженный модуль, а не загружаем второй раз
+        sys.modules.setdefault('main', sys.modules[__name__])
+        from cli import run
+        sys.exit(run(sys.argv[1:]))
     start_program()
\ No newline at end of file
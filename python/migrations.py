@@ -0,0 +1,466 @@
+# migrations.py
+# Версионные миграции схемы. Версия хранится в PRAGMA user_version,
+# каждая миграция применяется в отдельной транзакции вместе с повышением версии.
+import sqlite3
+from typing import Callable, Dict, List, Optional, Tuple
+from db_config import get_pool
+from passwords import hash_passwords, is_password_hash
+
+# Управляемый набор вторичных индексов (актуальный для SCHEMA_VERSION): имя -> определение.
+# Покрывает внешние ключи (проверки при удалении) и выборки бронирований.
+# Миграции фиксируют свои индексы сами, чтобы не зависеть от последующих изменений набора.
+INDEXES: Dict[str, str] = {
+    # Конфликты расписания: бронирования тренера/пользователя, заканчивающиеся после начала нового
+    'idx_booking_coach_end': "Booking(Coach_ID, End_ts, Start_ts)",
+    'idx_booking_user_end': "Booking(User_ID, End_ts, Start_ts)",
+    'idx_booking_start_ts': "Booking(Start_ts, End_ts)",
+    # Поиск пересечений: бронирования, заканчивающиеся после начала окна
+    'idx_booking_end_ts': "Booking(End_ts, Start_ts)",
+    'idx_booking_inventory_inventory': "Booking_inventory(Inventory_ID)",
+    'idx_booking_inventory_status': "Booking_inventory(Status_ID)",
+}
+
+
+def _table_columns(cursor: sqlite3.Cursor, table_name: str) -> List[str]:
+    """Возвращает имена столбцов таблицы."""
+    return [row[1] for row in cursor.execute(f"PRAGMA table_info({table_name})")]
+
+
+def _m001_initial_schema(cursor: sqlite3.Cursor):
+    """Исходная схема: тренеры, пользователи, инвентарь, статусы и бронирования."""
+    # 1. Coach (Тренер)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Coach (
+            Coach_ID INTEGER PRIMARY KEY,
+            Internal_number INTEGER UNIQUE NOT NULL,
+            Surname TEXT NOT NULL,
+            Name TEXT NOT NULL,
+            Experience INTEGER DEFAULT 0,
+            Password TEXT NOT NULL -- С миграции 7: соленый PBKDF2-хэш (passwords.py)
+        )
+    ''')
+
+    # 2. User (Пользователь)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS User (
+            User_ID INTEGER PRIMARY KEY,
+            Surname TEXT NOT NULL,
+            Name TEXT NOT NULL,
+            Password TEXT NOT NULL -- С миграции 7: соленый PBKDF2-хэш (passwords.py)
+        )
+    ''')
+
+    # 3. Inventory (Инвентарь)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Inventory (
+            Inventory_ID INTEGER PRIMARY KEY,
+            Name TEXT UNIQUE NOT NULL,
+            Count INTEGER NOT NULL
+        )
+    ''')
+
+    # 4. Status (Статус инвентаря)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Status (
+            Status_ID INTEGER PRIMARY KEY,
+            Name TEXT UNIQUE NOT NULL
+        )
+    ''')
+
+    # 5. Booking (Бронирование)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Booking (
+            Booking_ID INTEGER PRIMARY KEY,
+            Coach_ID INTEGER NOT NULL,
+            User_ID INTEGER NOT NULL,
+            Time_start TEXT NOT NULL,
+            Time_end TEXT NOT NULL,
+            Number_booking INTEGER NOT NULL,
+            FOREIGN KEY (Coach_ID) REFERENCES Coach(Coach_ID),
+            FOREIGN KEY (User_ID) REFERENCES User(User_ID)
+        )
+    ''')
+
+    # 6. Booking_inventory (Связка бронирования и инвентаря)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Booking_inventory (
+            Booking_ID INTEGER NOT NULL,
+            Inventory_ID INTEGER NOT NULL,
+            Status_ID INTEGER NOT NULL,
+            PRIMARY KEY (Booking_ID, Inventory_ID),
+            FOREIGN KEY (Booking_ID) REFERENCES Booking(Booking_ID) ON DELETE CASCADE,
+            FOREIGN KEY (Inventory_ID) REFERENCES Inventory(Inventory_ID),
+            FOREIGN KEY (Status_ID) REFERENCES Status(Status_ID)
+        )
+    ''')
+
+
+def _m002_inventory_comment(cursor: sqlite3.Cursor):
+    """Комментарий к инвентарю (уже используется тестовыми данными)."""
+    if 'Comment' not in _table_columns(cursor, 'Inventory'):
+        cursor.execute("ALTER TABLE Inventory ADD COLUMN Comment TEXT")
+
+
+def create_indexes(cursor: sqlite3.Cursor, indexes: Optional[Dict[str, str]] = None):
+    """Создает индексы (по умолчанию — весь набор INDEXES), которых еще нет."""
+    for name, definition in (indexes or INDEXES).items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+
+
+def drop_indexes(cursor: sqlite3.Cursor):
+    """Удаляет индексы из INDEXES (например, перед массовой загрузкой)."""
+    for name in INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def _m003_secondary_indexes(cursor: sqlite3.Cursor):
+    """Индексы для соединений и проверок внешних ключей бронирований."""
+    create_indexes(cursor, {
+        'idx_booking_coach': "Booking(Coach_ID, Time_start)",
+        'idx_booking_user': "Booking(User_ID, Time_start)",
+        'idx_booking_time': "Booking(Time_start, Time_end)",
+        'idx_booking_inventory_inventory': "Booking_inventory(Inventory_ID)",
+        'idx_booking_inventory_status': "Booking_inventory(Status_ID)",
+    })
+
+
+def _m004_booking_end_index(cursor: sqlite3.Cursor):
+    """Индекс по окончанию бронирования для проверки доступности инвентаря."""
+    create_indexes(cursor, {'idx_booking_end': "Booking(Time_end, Time_start)"})
+
+
+def _m005_booking_timestamps(cursor: sqlite3.Cursor):
+    """
+    Целочисленные метки времени бронирования (секунды, время без часового пояса).
+    Текстовые Time_start/Time_end приводятся к виду YYYY-MM-DD HH:MM:SS, если разбираются.
+    Индексы по тексту заменяются индексами по меткам времени.
+    """
+    columns = _table_columns(cursor, 'Booking')
+    if 'Start_ts' not in columns:
+        cursor.execute("ALTER TABLE Booking ADD COLUMN Start_ts INTEGER")
+    if 'End_ts' not in columns:
+        cursor.execute("ALTER TABLE Booking ADD COLUMN End_ts INTEGER")
+    cursor.execute("""
+        UPDATE Booking SET
+            Time_start = coalesce(datetime(Time_start), Time_start),
+            Time_end = coalesce(datetime(Time_end), Time_end),
+            Start_ts = CAST(strftime('%s', Time_start) AS INTEGER),
+            End_ts = CAST(strftime('%s', Time_end) AS INTEGER)
+    """)
+    for name in ('idx_booking_coach', 'idx_booking_user', 'idx_booking_time', 'idx_booking_end'):
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+    create_indexes(cursor, {
+        'idx_booking_coach_end': "Booking(Coach_ID, End_ts, Start_ts)",
+        'idx_booking_user_end': "Booking(User_ID, End_ts, Start_ts)",
+        'idx_booking_start_ts': "Booking(Start_ts, End_ts)",
+        'idx_booking_end_ts': "Booking(End_ts, Start_ts)",
+    })
+
+
+# Триггеры, поддерживающие дневные агрегаты статистики (таблицы Stats_*).
+# День бронирования — дата Start_ts; день смены статуса — текущая локальная дата.
+STATS_TRIGGERS: Dict[str, str] = {
+    'trg_stats_booking_insert': """
+        AFTER INSERT ON Booking WHEN NEW.Start_ts IS NOT NULL
+        BEGIN
+            INSERT INTO Stats_coach_daily (Day, Coach_ID, Bookings)
+            VALUES (date(NEW.Start_ts, 'unixepoch'), NEW.Coach_ID, 1)
+            ON CONFLICT (Day, Coach_ID) DO UPDATE SET Bookings = Bookings + 1;
+        END
+    """,
+    # BEFORE: при каскадном удалении связей бронирование уже недоступно их триггерам
+    'trg_stats_booking_delete': """
+        BEFORE DELETE ON Booking WHEN OLD.Start_ts IS NOT NULL
+        BEGIN
+            UPDATE Stats_coach_daily SET Bookings = Bookings - 1
+            WHERE Day = date(OLD.Start_ts, 'unixepoch') AND Coach_ID = OLD.Coach_ID;
+            UPDATE Stats_item_daily SET Bookings = Bookings - 1
+            WHERE Day = date(OLD.Start_ts, 'unixepoch')
+              AND Inventory_ID IN (SELECT Inventory_ID FROM Booking_inventory WHERE Booking_ID = OLD.Booking_ID);
+        END
+    """,
+    'trg_stats_booking_update': """
+        AFTER UPDATE OF Coach_ID, Start_ts ON Booking
+        WHEN OLD.Coach_ID IS NOT NEW.Coach_ID OR OLD.Start_ts IS NOT NEW.Start_ts
+        BEGIN
+            UPDATE Stats_coach_daily SET Bookings = Bookings - 1
+            WHERE OLD.Start_ts IS NOT NULL
+              AND Day = date(OLD.Start_ts, 'unixepoch') AND Coach_ID = OLD.Coach_ID;
+            INSERT INTO Stats_coach_daily (Day, Coach_ID, Bookings)
+            SELECT date(NEW.Start_ts, 'unixepoch'), NEW.Coach_ID, 1 WHERE NEW.Start_ts IS NOT NULL
+            ON CONFLICT (Day, Coach_ID) DO UPDATE SET Bookings = Bookings + 1;
+            UPDATE Stats_item_daily SET Bookings = Bookings - 1
+            WHERE OLD.Start_ts IS NOT NULL AND OLD.Start_ts IS NOT NEW.Start_ts
+              AND Day = date(OLD.Start_ts, 'unixepoch')
+              AND Inventory_ID IN (SELECT Inventory_ID FROM Booking_inventory WHERE Booking_ID = OLD.Booking_ID);
+            INSERT INTO Stats_item_daily (Day, Inventory_ID, Bookings)
+            SELECT date(NEW.Start_ts, 'unixepoch'), Inventory_ID, 1 FROM Booking_inventory
+            WHERE Booking_ID = NEW.Booking_ID AND NEW.Start_ts IS NOT NULL
+              AND OLD.Start_ts IS NOT NEW.Start_ts
+            ON CONFLICT (Day, Inventory_ID) DO UPDATE SET Bookings = Bookings + 1;
+        END
+    """,
+    'trg_stats_link_insert': """
+        AFTER INSERT ON Booking_inventory
+        BEGIN
+            INSERT INTO Stats_item_daily (Day, Inventory_ID, Bookings)
+            SELECT date(Start_ts, 'unixepoch'), NEW.Inventory_ID, 1 FROM Booking
+            WHERE Booking_ID = NEW.Booking_ID AND Start_ts IS NOT NULL
+            ON CONFLICT (Day, Inventory_ID) DO UPDATE SET Bookings = Bookings + 1;
+            INSERT INTO Stats_status_daily (Day, From_status_ID, To_status_ID, Transitions)
+            VALUES (date('now', 'localtime'), 0, NEW.Status_ID, 1)
+            ON CONFLICT (Day, From_status_ID, To_status_ID) DO UPDATE SET Transitions = Transitions + 1;
+        END
+    """,
+    # Учитывается только прямое удаление связи: при каскадном бронирования уже нет
+    'trg_stats_link_delete': """
+        AFTER DELETE ON Booking_inventory
+        BEGIN
+            UPDATE Stats_item_daily SET Bookings = Bookings - 1
+            WHERE Inventory_ID = OLD.Inventory_ID
+              AND Day = (SELECT date(Start_ts, 'unixepoch') FROM Booking WHERE Booking_ID = OLD.Booking_ID);
+        END
+    """,
+    # Перенос связи на другой предмет (или в другое бронирование): день и предмет меняются
+    'trg_stats_link_move': """
+        AFTER UPDATE OF Booking_ID, Inventory_ID ON Booking_inventory
+        WHEN OLD.Inventory_ID IS NOT NEW.Inventory_ID OR OLD.Booking_ID IS NOT NEW.Booking_ID
+        BEGIN
+            UPDATE Stats_item_daily SET Bookings = Bookings - 1
+            WHERE Inventory_ID = OLD.Inventory_ID
+              AND Day = (SELECT date(Start_ts, 'unixepoch') FROM Booking WHERE Booking_ID = OLD.Booking_ID);
+            INSERT INTO Stats_item_daily (Day, Inventory_ID, Bookings)
+            SELECT date(Start_ts, 'unixepoch'), NEW.Inventory_ID, 1 FROM Booking
+            WHERE Booking_ID = NEW.Booking_ID AND Start_ts IS NOT NULL
+            ON CONFLICT (Day, Inventory_ID) DO UPDATE SET Bookings = Bookings + 1;
+        END
+    """,
+    'trg_stats_link_status': """
+        AFTER UPDATE OF Status_ID ON Booking_inventory WHEN OLD.Status_ID != NEW.Status_ID
+        BEGIN
+            INSERT INTO Stats_status_daily (Day, From_status_ID, To_status_ID, Transitions)
+            VALUES (date('now', 'localtime'), OLD.Status_ID, NEW.Status_ID, 1)
+            ON CONFLICT (Day, From_status_ID, To_status_ID) DO UPDATE SET Transitions = Transitions + 1;
+        END
+    """,
+}
+
+
+def create_stats_triggers(cursor: sqlite3.Cursor):
+    """Создает триггеры статистики."""
+    for name, body in STATS_TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def drop_stats_triggers(cursor: sqlite3.Cursor):
+    """Удаляет триггеры статистики (например, перед массовой загрузкой)."""
+    for name in STATS_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_usage_stats(cursor: sqlite3.Cursor):
+    """
+    Пересчитывает дневные агрегаты бронирований по инвентарю и тренерам с нуля.
+    История смен статусов не восстанавливается: она накапливается только триггерами.
+    """
+    cursor.execute("DELETE FROM Stats_item_daily")
+    cursor.execute("DELETE FROM Stats_coach_daily")
+    cursor.execute("""
+        INSERT INTO Stats_item_daily (Day, Inventory_ID, Bookings)
+        SELECT date(B.Start_ts, 'unixepoch'), BI.Inventory_ID, count(*)
+        FROM Booking_inventory BI JOIN Booking B ON B.Booking_ID = BI.Booking_ID
+        WHERE B.Start_ts IS NOT NULL
+        GROUP BY 1, 2
+    """)
+    cursor.execute("""
+        INSERT INTO Stats_coach_daily (Day, Coach_ID, Bookings)
+        SELECT date(Start_ts, 'unixepoch'), Coach_ID, count(*)
+        FROM Booking WHERE Start_ts IS NOT NULL
+        GROUP BY 1, 2
+    """)
+
+
+def _m006_usage_stats(cursor: sqlite3.Cursor):
+    """Дневные агрегаты использования инвентаря, загрузки тренеров и смен статусов."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Stats_item_daily (
+            Day TEXT NOT NULL,
+            Inventory_ID INTEGER NOT NULL,
+            Bookings INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (Day, Inventory_ID)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Stats_coach_daily (
+            Day TEXT NOT NULL,
+            Coach_ID INTEGER NOT NULL,
+            Bookings INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (Day, Coach_ID)
+        ) WITHOUT ROWID
+    ''')
+    # From_status_ID = 0 — инвентарь впервые добавлен в бронирование
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Stats_status_daily (
+            Day TEXT NOT NULL,
+            From_status_ID INTEGER NOT NULL,
+            To_status_ID INTEGER NOT NULL,
+            Transitions INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (Day, From_status_ID, To_status_ID)
+        ) WITHOUT ROWID
+    ''')
+    rebuild_usage_stats(cursor)
+    create_stats_triggers(cursor)
+
+
+def _m007_hash_passwords(cursor: sqlite3.Cursor):
+    """Заменяет пароли в открытом виде соленными PBKDF2-хэшами."""
+    for table, id_col in (('Coach', 'Coach_ID'), ('User', 'User_ID')):
+        rows = cursor.execute(f"SELECT {id_col}, Password FROM {table}").fetchall()
+        plain = [(row_id, password) for row_id, password in rows if not is_password_hash(password)]
+        hashes = hash_passwords(password for _, password in plain)
+        cursor.executemany(f"UPDATE {table} SET Password = ? WHERE {id_col} = ?",
+                           [(hashed, row_id) for (row_id, _), hashed in zip(plain, hashes)])
+
+
+# Отслеживаемые таблицы -> столбцы первичного ключа (для журнала изменений)
+CHANGE_TABLES: Dict[str, Tuple[str, ...]] = {
+    'User': ('User_ID',),
+    'Coach': ('Coach_ID',),
+    'Inventory': ('Inventory_ID',),
+    'Booking': ('Booking_ID',),
+    'Booking_inventory': ('Booking_ID', 'Inventory_ID'),
+}
+
+
+def _change_triggers() -> Dict[str, str]:
+    """
+    Триггеры журнала изменений: каждая вставка, изменение и удаление строки
+    отслеживаемой таблицы добавляет запись в Change_log. Ключ строки — Key_1
+    и Key_2 (0 для таблиц с одностолбцовым ключом). Изменение ключа
+    записывается как удаление старой строки и изменение новой.
+    """
+    triggers = {}
+    for table, key in CHANGE_TABLES.items():
+        key_1 = key[0]
+        new_2 = f"NEW.{key[1]}" if len(key) > 1 else "0"
+        old_2 = f"OLD.{key[1]}" if len(key) > 1 else "0"
+        prefix = f"trg_changes_{table.lower()}"
+        insert = "INSERT INTO Change_log (Table_name, Key_1, Key_2, Op)"
+        triggers[f"{prefix}_insert"] = f"""
+            AFTER INSERT ON {table}
+            BEGIN
+                {insert} VALUES ('{table}', NEW.{key_1}, {new_2}, 'I');
+            END
+        """
+        triggers[f"{prefix}_update"] = f"""
+            AFTER UPDATE ON {table}
+            BEGIN
+                {insert} SELECT '{table}', OLD.{key_1}, {old_2}, 'D'
+                WHERE OLD.{key_1} IS NOT NEW.{key_1} OR {old_2} IS NOT {new_2};
+                {insert} VALUES ('{table}', NEW.{key_1}, {new_2}, 'U');
+            END
+        """
+        triggers[f"{prefix}_delete"] = f"""
+            AFTER DELETE ON {table}
+            BEGIN
+                {insert} VALUES ('{table}', OLD.{key_1}, {old_2}, 'D');
+            END
+        """
+    return triggers
+
+
+CHANGE_TRIGGERS: Dict[str, str] = _change_triggers()
+
+
+def create_change_triggers(cursor: sqlite3.Cursor):
+    """Создает триггеры журнала изменений."""
+    for name, body in CHANGE_TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def drop_change_triggers(cursor: sqlite3.Cursor):
+    """
+    Удаляет триггеры журнала изменений (например, перед массовой загрузкой).
+    Изменения, сделанные без триггеров, в дельту не попадут: после такой загрузки
+    потребителям нужен полный экспорт (сброс водяных знаков).
+    """
+    for name in CHANGE_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def _m008_change_log(cursor: sqlite3.Cursor):
+    """Журнал изменений и водяные знаки инкрементального экспорта."""
+    # AUTOINCREMENT: номера не переиспользуются даже после очистки журнала
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Change_log (
+            Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            Table_name TEXT NOT NULL,
+            Key_1 INTEGER NOT NULL,
+            Key_2 INTEGER NOT NULL DEFAULT 0,
+            Op TEXT NOT NULL CHECK (Op IN ('I', 'U', 'D')),
+            Changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_table ON Change_log(Table_name, Seq)")
+    # Потребитель дельты -> последний выгруженный номер изменения по каждой таблице
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Export_watermark (
+            Consumer TEXT NOT NULL,
+            Table_name TEXT NOT NULL,
+            Seq INTEGER NOT NULL,
+            Updated_at TEXT NOT NULL,
+            PRIMARY KEY (Consumer, Table_name)
+        ) WITHOUT ROWID
+    ''')
+    create_change_triggers(cursor)
+
+
+# Упорядоченный список миграций: (версия, описание, функция)
+def _m009_link_move_stats(cursor: sqlite3.Cursor):
+    """Триггер статистики для переноса связи на другой предмет; счетчики, сбитые переносами, пересчитываются."""
+    create_stats_triggers(cursor)
+    rebuild_usage_stats(cursor)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "Исходная схема", _m001_initial_schema),
+    (2, "Inventory.Comment", _m002_inventory_comment),
+    (3, "Вторичные индексы бронирований", _m003_secondary_indexes),
+    (4, "Индекс окончания бронирований", _m004_booking_end_index),
+    (5, "Метки времени бронирований", _m005_booking_timestamps),
+    (6, "Дневная статистика использования", _m006_usage_stats),
+    (7, "Хэширование паролей", _m007_hash_passwords),
+    (8, "Журнал изменений для инкрементального экспорта", _m008_change_log),
+    (9, "Статистика при переносе инвентаря", _m009_link_move_stats),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы БД."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db_name: str = "coaching.db") -> int:
+    """
+    Приводит схему БД к SCHEMA_VERSION и возвращает число примененных миграций.
+    Если схема актуальна, выполняется только одна проверка версии.
+    """
+    pool = get_pool(db_name)
+    with pool.connection() as conn:
+        if get_schema_version(conn) >= SCHEMA_VERSION:
+            return 0
+
+    applied = 0
+    for version, description, step in MIGRATIONS:
+        with pool.transaction() as conn:
+            # Версию перечитываем под блокировкой записи: другой процесс
+            # мог применить миграцию, пока мы ждали
+            if get_schema_version(conn) >= version:
+                continue
+            step(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+        print(f"ℹ️ Применена миграция схемы {version}: {description}")
+        applied += 1
+    return applied
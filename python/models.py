@@ -1,57 +1,188 @@
-from dataclasses import dataclass
-from typing import Optional
+import sqlite3
+from dataclasses import dataclass, fields
+from operator import itemgetter
+from typing import Any, Callable, ClassVar, Dict, Iterator, Optional, Tuple, Type
 
 
 # СТРУКТУРЫ ДАННЫХ (МОДЕЛИ)
 
+# Модели — компактные объекты со __slots__ вместо словаря на каждую строку.
+# Поля объявлены в порядке столбцов таблицы (COLUMNS), а доступ по имени
+# столбца БД (model['Name'], keys(), items()) работает так же, как у sqlite3.Row,
+# поэтому модели принимают консоль и writer'ы экспорта. Объекты из репозиториев
+# не изменяют: один и тот же объект может лежать в кэше чтения, для правок —
+# dataclasses.replace(). Модели не заморожены, так как frozen-конструктор
+# в несколько раз медленнее, а строки строятся на каждую запись результата.
 
-@dataclass
-class User:
+
+class Model:
+    """Базовый класс моделей: доступ к полям по именам столбцов БД."""
+    __slots__ = ()
+
+    COLUMNS: ClassVar[Tuple[str, ...]] = ()
+    _ATTRS: ClassVar[Dict[str, str]] = {}
+
+    def __getitem__(self, column: str) -> Any:
+        try:
+            return getattr(self, self._ATTRS[column])
+        except KeyError:
+            raise KeyError(column) from None
+
+    def __contains__(self, column: object) -> bool:
+        return column in self._ATTRS
+
+    def get(self, column: str, default: Any = None) -> Any:
+        attr = self._ATTRS.get(column)
+        return default if attr is None else getattr(self, attr)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.COLUMNS
+
+    def values(self) -> Iterator[Any]:
+        return (getattr(self, attr) for attr in self._ATTRS.values())
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((column, getattr(self, attr)) for column, attr in self._ATTRS.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь с именами столбцов БД в качестве ключей."""
+        return dict(self.items())
+
+
+def _model(cls):
+    """Связывает поля модели со столбцами БД (порядок полей = порядок COLUMNS)."""
+    names = [f.name for f in fields(cls)]
+    if len(names) != len(cls.COLUMNS):
+        raise TypeError(f"{cls.__name__}: число полей не совпадает с COLUMNS")
+    cls._ATTRS = dict(zip(cls.COLUMNS, names))
+    return cls
+
+
+@_model
+@dataclass(slots=True)
+class User(Model):
     """Модель Пользователя."""
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('User_ID', 'Surname', 'Name', 'Password')
+
     user_id: Optional[int]
     surname: str
     name: str
-    password: str 
+    password: str
 
 
-@dataclass
-class Coach(User):
-    """
-    Модель Тренера. Наследует свойства Пользователя.
-    """
+@_model
+@dataclass(slots=True)
+class Coach(Model):
+    """Модель Тренера."""
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('Coach_ID', 'Internal_number', 'Surname', 'Name',
+                                          'Experience', 'Password')
+
+    coach_id: Optional[int]
     internal_number: int
+    surname: str
+    name: str
     experience: Optional[int] = 0
+    password: Optional[str] = None
 
 
-@dataclass
-class Status:
+@_model
+@dataclass(slots=True)
+class Status(Model):
     """Модель Статуса (для бронирования инвентаря)."""
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('Status_ID', 'Name')
+
     status_id: Optional[int]
     name: str
 
 
-@dataclass
-class Inventory:
+@_model
+@dataclass(slots=True)
+class Inventory(Model):
     """Модель Инвентаря."""
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('Inventory_ID', 'Name', 'Count', 'Comment')
+
     inventory_id: Optional[int]
     name: str
     count: int
+    comment: Optional[str] = None
 
 
-@dataclass
-class Booking:
+@_model
+@dataclass(slots=True)
+class Booking(Model):
     """Модель Бронирования."""
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('Booking_ID', 'Coach_ID', 'User_ID', 'Time_start', 'Time_end',
+                                          'Number_booking', 'Start_ts', 'End_ts')
+
     booking_id: Optional[int]
-    coach_id: int 
+    coach_id: int
     user_id: int
-    time_start: str 
-    time_end: str   
-    number_booking: int 
+    time_start: str
+    time_end: str
+    number_booking: int
+    start_ts: Optional[int] = None
+    end_ts: Optional[int] = None
 
 
-@dataclass
-class BookingInventoryLink:
+@_model
+@dataclass(slots=True)
+class BookingInventoryLink(Model):
     """Модель для таблицы-связки Booking_inventory."""
+    COLUMNS: ClassVar[Tuple[str, ...]] = ('Booking_ID', 'Inventory_ID', 'Status_ID')
+
     booking_id: int
     inventory_id: int
-    status_id: int
\ No newline at end of file
+    status_id: int
+
+
+# Модель для каждой таблицы
+TABLE_MODELS: Dict[str, Type[Model]] = {
+    'User': User,
+    'Coach': Coach,
+    'Status': Status,
+    'Inventory': Inventory,
+    'Booking': Booking,
+    'Booking_inventory': BookingInventoryLink,
+}
+
+
+def model_for_table(table_name: str) -> Type[Model]:
+    """Возвращает модель таблицы."""
+    model = TABLE_MODELS.get(table_name)
+    if model is None:
+        raise ValueError(f"Для таблицы {table_name} нет модели")
+    return model
+
+
+def model_row_factory(model: Type[Model]) -> Callable[[sqlite3.Cursor, tuple], Model]:
+    """
+    Создает row_factory для курсора, который строит модели прямо из кортежей строк.
+    Соответствие столбцов полям вычисляется один раз на запрос; столбцы,
+    отсутствующие в проекции, получают None.
+    """
+    last_description = None
+    build: Callable[[tuple], Model] = model
+
+    def prepare(description) -> Callable[[tuple], Model]:
+        names = [column[0] for column in description]
+        unknown = [name for name in names if name not in model._ATTRS]
+        if unknown:
+            raise ValueError(f"Столбцы {unknown} не соответствуют модели {model.__name__}")
+        if tuple(names) == model.COLUMNS:
+            return lambda row: model(*row)
+        positions = {name: i for i, name in enumerate(names)}
+        if len(positions) == len(model.COLUMNS):
+            getter = itemgetter(*(positions[column] for column in model.COLUMNS))
+            return lambda row: model(*getter(row))
+        order = [positions.get(column) for column in model.COLUMNS]
+        return lambda row: model(*(None if i is None else row[i] for i in order))
+
+    def factory(cursor: sqlite3.Cursor, row: tuple) -> Model:
+        nonlocal last_description, build
+        description = cursor.description
+        if description is not last_description:
+            build = prepare(description)
+            last_description = description
+        return build(row)
+
+    return factory
@@ -0,0 +1,105 @@
+# passwords.py
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+# Формат хранения: pbkdf2_sha256$<итерации>$<соль>$<хэш> (соль и хэш — base64)
+HASH_ALGORITHM = 'pbkdf2_sha256'
+HASH_ITERATIONS = 260000
+SALT_BYTES = 16
+
+# Маска пароля при выводе: длина хэша не связана с длиной пароля
+PASSWORD_MASK = '********'
+
+# Хэширование выполняется в отдельном пуле потоков: hashlib отпускает GIL,
+# а ограниченное число потоков не дает дорогим проверкам занять весь процессор
+HASH_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def is_password_hash(value: Optional[str]) -> bool:
+    """Проверяет, что значение уже является хэшем в формате хранения."""
+    return bool(value) and value.startswith(HASH_ALGORITHM + '$') and value.count('$') == 3
+
+
+def hash_password(password: str, iterations: int = HASH_ITERATIONS, salt: Optional[bytes] = None) -> str:
+    """Возвращает соленый PBKDF2-хэш пароля для хранения в БД."""
+    salt = salt or secrets.token_bytes(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f"{HASH_ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def ensure_hashed(value: str) -> str:
+    """Хэширует пароль, если он еще не хэширован (импорт ранее выгруженных данных)."""
+    return value if is_password_hash(value) else hash_password(value)
+
+
+def with_hashed_password(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Копия данных учетной записи с хэшированным полем Password. Вызывается до
+    транзакции записи: PBKDF2 (~0.1 с) не должен выполняться под блокировкой БД.
+    """
+    if 'Password' not in data:
+        return data
+    return {**data, 'Password': ensure_hashed(data['Password'])}
+
+
+def verify_password(password: str, stored: Optional[str]) -> bool:
+    """
+    Сравнивает пароль с сохраненным значением за постоянное время.
+    Значения не в формате хэша считаются паролями старых версий в открытом виде.
+    """
+    if not stored:
+        return False
+    if not is_password_hash(stored):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    try:
+        _, iterations, salt, expected = stored.split('$')
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), _unb64(salt), int(iterations))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(digest, _unb64(expected))
+
+
+def needs_rehash(stored: Optional[str]) -> bool:
+    """Нужно ли перехэшировать значение (открытый текст или устаревшее число итераций)."""
+    if not is_password_hash(stored):
+        return True
+    try:
+        return int(stored.split('$')[1]) != HASH_ITERATIONS
+    except ValueError:
+        return True
+
+
+def get_hash_executor() -> ThreadPoolExecutor:
+    """Общий пул потоков для хэширования и проверки паролей."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pwhash")
+        return _executor
+
+
+def hash_passwords(passwords: Iterable[str]) -> List[str]:
+    """Хэширует пачку паролей в пуле (уже хэшированные значения сохраняются как есть)."""
+    return list(get_hash_executor().map(ensure_hashed, passwords))
+
+
+def verify_password_async(password: str, stored: Optional[str]) -> 'Future[bool]':
+    """Проверяет пароль в пуле хэширования."""
+    return get_hash_executor().submit(verify_password, password, stored)
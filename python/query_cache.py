@@ -0,0 +1,178 @@
+# query_cache.py
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+from db_config import get_connection_profile
+
+# Таблицы, содержимое которых меняется при записи в ключевую таблицу:
+# каскадные удаления внешних ключей и триггеры дневной статистики.
+WRITE_EFFECTS: Dict[str, Set[str]] = {
+    'Booking': {'Booking_inventory', 'Stats_coach_daily', 'Stats_item_daily'},
+    'Booking_inventory': {'Stats_item_daily', 'Stats_status_daily'},
+}
+
+# Значение-маркер промаха (None — допустимый кэшируемый результат)
+MISS = object()
+
+
+class QueryCache:
+    """
+    Ограниченный LRU-кэш результатов чтения с временем жизни записей.
+
+    Каждая запись помечена таблицами, из которых она прочитана, и удаляется
+    при записи в любую из них через репозитории. Изменения из других
+    процессов обнаруживаются по PRAGMA data_version соединения потока:
+    если значение изменилось, а записей этого процесса с прошлой сверки
+    не было, затронутые таблицы неизвестны, и кэш очищается целиком.
+
+    Ограничение: внешняя запись, совпавшая по времени с записью этого
+    процесса, принимается за свою и видна в кэше не позже чем через ttl.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Hashable, Tuple[float, frozenset, Any]]' = OrderedDict()
+        self._by_table: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+        # Число записей этого процесса, сброшенных через invalidate
+        self._local_commits = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def generation(self) -> int:
+        """Счетчик инвалидаций; снимается до чтения из БД и передается в put."""
+        return self._generation
+
+    def _drop(self, key: Hashable):
+        """Удаляет запись и ее пометки по таблицам (вызывать под блокировкой)."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[1]:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def get(self, key: Hashable) -> Any:
+        """Возвращает закэшированный результат или MISS."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Hashable, tables: Iterable[str], value: Any, generation: Optional[int] = None):
+        """
+        Сохраняет результат. Если с момента снятия generation была инвалидация,
+        результат мог устареть еще до сохранения и не кэшируется.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._drop(key)
+            tags = frozenset(tables)
+            self._entries[key] = (time.monotonic() + self.ttl, tags, value)
+            for table in tags:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, tables: Iterable[str]):
+        """Удаляет записи, прочитанные из измененных таблиц (с учетом WRITE_EFFECTS)."""
+        affected: Set[str] = set()
+        for table in tables:
+            affected.add(table)
+            affected |= WRITE_EFFECTS.get(table, set())
+        with self._lock:
+            self._generation += 1
+            self._local_commits += 1
+            self.invalidations += 1
+            for table in affected:
+                for key in list(self._by_table.get(table, ())):
+                    self._drop(key)
+
+    def clear(self):
+        """Очищает кэш целиком."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+            self._by_table.clear()
+
+    def sync_data_version(self, conn: sqlite3.Connection):
+        """
+        Сверяет PRAGMA data_version соединения текущего потока с последним
+        увиденным этим соединением значением. Значение меняется, когда изменения
+        зафиксировало другое соединение. Записи других потоков этого процесса
+        уже сброшены по таблицам через invalidate; если их с прошлой сверки
+        не было, изменение внешнее, таблицы неизвестны, и кэш очищается.
+        Новое соединение потока только запоминает значение.
+        """
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        local_commits = self._local_commits
+        if getattr(self._local, 'conn', None) is conn and self._local.version != version:
+            if local_commits == self._local.commits and self._entries:
+                self.clear()
+        self._local.conn = conn
+        self._local.version = version
+        self._local.commits = local_commits
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов."""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'invalidations': self.invalidations,
+        }
+
+
+_CACHES: Dict[str, QueryCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_query_cache(db_name: str = "coaching.db") -> QueryCache:
+    """Возвращает общий кэш запросов для указанной БД (размеры — из профиля соединений)."""
+    with _CACHES_LOCK:
+        cache = _CACHES.get(db_name)
+        if cache is None:
+            settings = get_connection_profile()
+            cache = QueryCache(settings['query_cache_size'], settings['query_cache_ttl'])
+            _CACHES[db_name] = cache
+        return cache
+
+
+def discard_query_cache(db_name: str):
+    """Удаляет кэш запросов БД из реестра."""
+    with _CACHES_LOCK:
+        _CACHES.pop(db_name, None)
+
+
+def clear_query_caches():
+    """Очищает кэши всех БД."""
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,90 @@
+# query_plan.py
+# Самопроверка индексов: прогоняет EXPLAIN QUERY PLAN по горячим запросам
+# репозиториев и сообщает, какие из них все еще читают таблицы целиком.
+import re
+import sys
+import sqlite3
+from typing import Any, Dict, List, Set, Tuple
+from db_config import get_pool
+from repositories.booking_repo import BookingRepository
+from repositories.change_repo import ChangeRepository
+from repositories.inventory_repo import InventoryRepository
+from repositories.user_repo import UserRepository
+
+TEMP_BTREE = "TEMP B-TREE"
+
+# (название, SQL, параметры, псевдонимы таблиц, для которых полный проход ожидаем).
+# TEMP_BTREE в этом наборе разрешает сортировку во временном B-дереве (например, окна журнала)
+CHECKED_QUERIES: List[Tuple[str, str, tuple, Set[str]]] = [
+    ("Бронирования с деталями", BookingRepository.DETAILS_SQL, (), {'B'}),
+    ("Страница бронирований", BookingRepository.DETAILS_SELECT
+     + " WHERE B.Booking_ID > ? ORDER BY B.Booking_ID LIMIT ?", (0, 21), set()),
+    ("Страница пользователей", "SELECT User_ID, Surname, Name "
+     "FROM User WHERE (User_ID) > (?) ORDER BY User_ID ASC LIMIT ?", (0, 21), set()),
+    ("Бронирования тренера", BookingRepository.BY_COACH_SQL, (1,), set()),
+    ("Бронирования за период", BookingRepository.BETWEEN_SQL, (1735689600, 1738368000), set()),
+    ("Конфликт расписания тренера", BookingRepository.COACH_CONFLICT_SQL, (1, 1735689600, 1735693200, 0), set()),
+    ("Конфликт расписания пользователя", BookingRepository.USER_CONFLICT_SQL, (1, 1735689600, 1735693200, 0), set()),
+    ("Доступность инвентаря", InventoryRepository.OVERLAP_SQL + " AND BI.Inventory_ID IN (?)",
+     (1735689600, 1735776000, 1), set()),
+    ("Запись по ID", "SELECT * FROM Booking WHERE Booking_ID = ?", (1,), set()),
+    ("Тренер по внутреннему номеру", "SELECT * FROM Coach WHERE Internal_number = ?", (1,), set()),
+    ("Вход: тренер или пользователь", UserRepository.CREDENTIALS_SQL, (1, 1), set()),
+    # Выборки, которые выполняют триггеры дневной статистики
+    ("Статистика: инвентарь бронирования", "SELECT Inventory_ID FROM Booking_inventory WHERE Booking_ID = ?", (1,), set()),
+    ("Статистика: день инвентаря", "UPDATE Stats_item_daily SET Bookings = Bookings - 1 "
+     "WHERE Day = ? AND Inventory_ID = ?", ('2025-01-01', 1), set()),
+    ("Статистика: окно отчета", "SELECT * FROM Stats_coach_daily WHERE Day BETWEEN ? AND ?",
+     ('2025-01-01', '2025-01-31'), set()),
+    # Инкрементальный экспорт: окно журнала изменений и текущее состояние строк
+    ("Дельта: изменения таблицы", ChangeRepository.CHANGES_SQL.format(
+        table='Booking_inventory', join="T.Booking_ID = K.Key_1 AND T.Inventory_ID = K.Key_2"),
+     ('Booking_inventory', 0, 100), {'K', TEMP_BTREE}),
+    ("Дельта: вложенные бронирования", ChangeRepository.NESTED_CHANGES_SQL, (0, 100), {'K', 'L', 'C', TEMP_BTREE}),
+    # Запросы ниже повторяют проверки внешних ключей, которые SQLite
+    # выполняет при delete_coach / delete_user / delete_inventory / delete_status
+    ("FK: удаление тренера", "SELECT 1 FROM Booking WHERE Coach_ID = ?", (1,), set()),
+    ("FK: удаление пользователя", "SELECT 1 FROM Booking WHERE User_ID = ?", (1,), set()),
+    ("FK: удаление инвентаря", "SELECT 1 FROM Booking_inventory WHERE Inventory_ID = ?", (1,), set()),
+    ("FK: удаление статуса", "SELECT 1 FROM Booking_inventory WHERE Status_ID = ?", (1,), set()),
+]
+
+_SCAN_RE = re.compile(r"^SCAN (\w+)(.*)$")
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    """Возвращает строки плана выполнения запроса."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plans(db_name: str = "coaching.db") -> List[Dict[str, Any]]:
+    """Проверяет планы запросов и возвращает отчет по каждому из них."""
+    report = []
+    with get_pool(db_name).connection() as conn:
+        for name, sql, params, allowed_scans in CHECKED_QUERIES:
+            plan = explain(conn, sql, params)
+            scans = []
+            for detail in plan:
+                match = _SCAN_RE.match(detail)
+                if match and match.group(1) not in allowed_scans:
+                    scans.append(detail)
+                elif detail.startswith("USE TEMP B-TREE") and TEMP_BTREE not in allowed_scans:
+                    scans.append(detail)
+            report.append({'name': name, 'plan': plan, 'scans': scans, 'ok': not scans})
+    return report
+
+
+def print_query_plan_report(db_name: str = "coaching.db") -> bool:
+    """Печатает отчет о планах запросов. Возвращает True, если полных проходов нет."""
+    report = check_query_plans(db_name)
+    for entry in report:
+        if entry['ok']:
+            print(f"✅ {entry['name']}")
+        else:
+            print(f"❌ {entry['name']}: {'; '.join(entry['scans'])}")
+    return all(entry['ok'] for entry in report)
+
+
+if __name__ == '__main__':
+    ok = print_query_plan_report(sys.argv[1] if len(sys.argv) > 1 else "coaching.db")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,285 @@
+# query_stats.py
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+from db_config import get_connection_profile, get_pool
+
+# Сколько последних длительностей хранить на выражение для расчета p95
+SAMPLE_SIZE = 1024
+# Ограничение числа различных выражений; остальные попадают в общую группу
+MAX_STATEMENTS = 2000
+OTHER_STATEMENTS = "<прочие выражения>"
+
+# Литералы в тексте SQL (трассировка SQLite отдает текст с подставленными параметрами)
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b[xX]'[0-9a-fA-F]*'|\b\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b|\bNULL\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql: str) -> str:
+    """
+    Приводит выражение к виду без значений: литералы заменяются на ?,
+    списки IN (?, ?, ...) сворачиваются, пробелы схлопываются.
+    Такой текст служит ключом статистики и безопасен для журнала.
+    Тексты запросов репозиториев повторяются, поэтому результат кэшируется.
+    """
+    sql = _LITERAL_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?, ...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def redact_params(params: Any) -> Any:
+    """Заменяет значения параметров их типом (и длиной), не раскрывая содержимое."""
+    def redact(value: Any) -> str:
+        if value is None:
+            return "<null>"
+        if isinstance(value, (str, bytes)):
+            return f"<{type(value).__name__}:{len(value)}>"
+        return f"<{type(value).__name__}>"
+
+    if isinstance(params, dict):
+        return {name: redact(value) for name, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [redact(value) for value in params]
+    return redact(params)
+
+
+class _StatementStats:
+    __slots__ = ('calls', 'total', 'max', 'rows', 'executed', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.executed = 0
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+
+
+class QueryStats:
+    """
+    Статистика выражений SQL одной БД: число вызовов, суммарное и p95 время,
+    число строк. Время измеряется курсором InstrumentedCursor (выполнение и
+    выборка строк), а трассировка SQLite (enable_sql_trace) дополнительно
+    считает в executed все выполненные выражения, включая управление
+    транзакциями. Программы триггеров SQLite относит к запустившему их
+    выражению, поэтому executed больше calls показывает работу триггеров.
+    Выражения дольше slow_ms пишутся в журнал медленных запросов
+    (JSON Lines) без значений параметров.
+    """
+
+    def __init__(self, enabled: bool = True, slow_ms: float = 0.0, slow_log: Optional[str] = None):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self._statements: Dict[str, _StatementStats] = {}
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+    def _entry(self, key: str) -> _StatementStats:
+        entry = self._statements.get(key)
+        if entry is None:
+            if len(self._statements) >= MAX_STATEMENTS:
+                key = OTHER_STATEMENTS
+                entry = self._statements.get(key)
+            if entry is None:
+                entry = self._statements[key] = _StatementStats()
+        return entry
+
+    def record(self, sql: str, params: Any, elapsed: float, rows: int):
+        """Учитывает выполненное выражение (elapsed — секунды)."""
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._entry(key)
+            entry.calls += 1
+            entry.total += elapsed
+            entry.rows += max(rows, 0)
+            entry.samples.append(elapsed)
+            if elapsed > entry.max:
+                entry.max = elapsed
+        if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+            self._log_slow(key, params, elapsed, rows)
+
+    def trace(self, statement: str):
+        """Callback для Connection.set_trace_callback: считает каждое выполненное выражение."""
+        key = normalize_sql(statement)
+        with self._lock:
+            self._entry(key).executed += 1
+
+    def _log_slow(self, sql: str, params: Any, elapsed: float, rows: int):
+        if not self.slow_log:
+            return
+        line = json.dumps({
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'ms': round(elapsed * 1000, 3),
+            'rows': rows,
+            'sql': sql,
+            'params': redact_params(params),
+            'thread': threading.current_thread().name,
+        }, ensure_ascii=False)
+        try:
+            with self._log_lock, open(self.slow_log, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"❌ Не удалось записать журнал медленных запросов: {e}")
+
+    def snapshot(self, top: Optional[int] = None, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        """Статистика по выражениям, отсортированная по order_by (по убыванию)."""
+        with self._lock:
+            items = [(sql, entry.calls, entry.total, entry.max, entry.rows, entry.executed, sorted(entry.samples))
+                     for sql, entry in self._statements.items()]
+        report = []
+        for sql, calls, total, longest, rows, executed, samples in items:
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+            report.append({
+                'sql': sql, 'calls': calls, 'executed': executed,
+                'total_ms': round(total * 1000, 3),
+                'avg_ms': round(total * 1000 / calls, 3) if calls else 0.0,
+                'p95_ms': round(p95 * 1000, 3),
+                'max_ms': round(longest * 1000, 3),
+                'rows': rows,
+            })
+        report.sort(key=lambda entry: entry[order_by], reverse=True)
+        return report[:top] if top else report
+
+    def reset(self):
+        """Обнуляет статистику."""
+        with self._lock:
+            self._statements.clear()
+
+    def cursor(self, conn: sqlite3.Connection) -> sqlite3.Cursor:
+        """Создает курсор, который измеряет свои выражения."""
+        cursor = conn.cursor(InstrumentedCursor)
+        cursor.stats = self
+        return cursor
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Курсор с замером времени. Для SELECT время выполнения складывается со
+    временем выборки строк и учитывается, когда результат дочитан, курсор
+    закрыт или выполняет следующее выражение.
+    """
+
+    stats: QueryStats
+    _pending: Optional[list] = None  # [sql, params, секунды, строки]
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            self.stats.record(*pending)
+
+    def execute(self, sql: str, parameters: Any = ()):
+        self._finish()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - started
+        if self.description is None:
+            self.stats.record(sql, parameters, elapsed, self.rowcount)
+        else:
+            self._pending = [sql, parameters, elapsed, 0]
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any):
+        self._finish()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self.stats.record(sql, (), time.perf_counter() - started, self.rowcount)
+        return self
+
+    def _fetched(self, started: float, rows: int, exhausted: bool):
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter() - started
+            pending[3] += rows
+            if exhausted:
+                self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+_STATS: Dict[str, QueryStats] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def _default_slow_log(db_name: str) -> Optional[str]:
+    path = os.environ.get('COACHING_SLOW_QUERY_LOG')
+    if path is not None:
+        return path or None
+    return None if db_name == ':memory:' else f"{db_name}.slow.log"
+
+
+def get_query_stats(db_name: str = "coaching.db") -> QueryStats:
+    """Возвращает общую статистику запросов для указанной БД (настройки — из профиля соединений)."""
+    with _STATS_LOCK:
+        stats = _STATS.get(db_name)
+        if stats is None:
+            settings = get_connection_profile()
+            stats = QueryStats(settings['query_stats'], settings['slow_query_ms'], _default_slow_log(db_name))
+            _STATS[db_name] = stats
+            if settings['trace_sql']:
+                get_pool(db_name).set_trace_callback(stats.trace)
+        return stats
+
+
+def discard_query_stats(db_name: str):
+    """Удаляет статистику запросов БД из реестра."""
+    with _STATS_LOCK:
+        _STATS.pop(db_name, None)
+
+
+def enable_sql_trace(db_name: str = "coaching.db", enabled: bool = True):
+    """Включает (или выключает) трассировку всех выражений соединений БД."""
+    stats = get_query_stats(db_name)
+    get_pool(db_name).set_trace_callback(stats.trace if enabled else None)
+
+
+def print_query_stats(db_name: str = "coaching.db", top: int = 15):
+    """Печатает самые затратные выражения."""
+    report = get_query_stats(db_name).snapshot(top)
+    if not report:
+        print("ℹ️ Статистика запросов пуста.")
+        return
+    for entry in report:
+        print(f"{entry['total_ms']:>10.1f} мс  x{entry['calls']:<6} (выполнено {entry['executed']:<6}) "
+              f"p95 {entry['p95_ms']:>8.2f} мс  строк {entry['rows']:<8} {entry['sql'][:120]}")
@@ -0,0 +1,126 @@
+# repositories/async_repo.py
+from .base_repo import BaseRepository
+from .user_repo import UserRepository
+from .coach_repo import CoachRepository
+from .inventory_repo import InventoryRepository
+from .booking_repo import BookingRepository
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Dict, Type, TypeVar
+
+T = TypeVar('T')
+
+
+class AsyncRepository:
+    """
+    Асинхронная обертка над синхронным репозиторием.
+
+    У каждого экземпляра свой однопоточный executor, а значит и свое соединение
+    из пула (соединения закреплены за потоками): все вызовы экземпляра выполняются
+    последовательно в одном потоке, и SQLite используется безопасно, а долгая
+    операция одного клиента (например, экспорт) не блокирует цикл событий
+    и других клиентов. Экземпляр рассчитан на одного клиента: транзакция,
+    открытая через transaction(), охватывает все его вызовы до выхода из блока.
+
+    Публичные методы синхронного репозитория доступны как корутины:
+    await repo.get_all("Inventory").
+    """
+
+    repository_class: Type[BaseRepository] = BaseRepository
+
+    def __init__(self, db_name: str = "coaching.db"):
+        self._sync = self.repository_class(db_name)
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix=type(self).__name__)
+        self._closed = False
+
+    async def _run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Выполняет синхронную функцию в потоке экземпляра."""
+        if self._closed:
+            raise RuntimeError("Репозиторий закрыт")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        # Вызывается только для атрибутов, не найденных обычным способом
+        if name.startswith('_'):
+            raise AttributeError(name)
+        attr = getattr(self._sync, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self._run(attr, *args, **kwargs)
+
+        # Кэшируем обертку в экземпляре, чтобы не создавать ее при каждом вызове
+        self.__dict__[name] = method
+        return method
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Объединяет вызовы экземпляра в одну транзакцию (фиксация при успехе, откат при ошибке)."""
+        context = self._sync.transaction()
+        await self._run(context.__enter__)
+        try:
+            yield
+        except BaseException as e:
+            await self._run(context.__exit__, type(e), e, e.__traceback__)
+            raise
+        else:
+            await self._run(context.__exit__, None, None, None)
+
+    async def iterate(self, method_name: str, *args, chunk_size: int = 500, **kwargs) -> AsyncIterator[Any]:
+        """
+        Асинхронно отдает записи синхронного генератора репозитория (iter_*),
+        забирая их из потока экземпляра пачками по chunk_size.
+        """
+        iterator = await self._run(lambda: iter(getattr(self._sync, method_name)(*args, **kwargs)))
+        try:
+            while True:
+                chunk = await self._run(lambda: list(islice(iterator, chunk_size)))
+                if not chunk:
+                    break
+                for item in chunk:
+                    yield item
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None and not self._closed:
+                await self._run(close)
+
+    async def close(self):
+        """Закрывает соединение потока экземпляра и останавливает executor."""
+        if self._closed:
+            return
+        await self._run(self._sync._pool.release_current)
+        self._closed = True
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class AsyncUserRepository(AsyncRepository):
+    repository_class = UserRepository
+
+
+class AsyncCoachRepository(AsyncRepository):
+    repository_class = CoachRepository
+
+
+class AsyncInventoryRepository(AsyncRepository):
+    repository_class = InventoryRepository
+
+
+class AsyncBookingRepository(AsyncRepository):
+    repository_class = BookingRepository
+
+    def iter_bookings_details(self, chunk_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """Асинхронно отдает бронирования с деталями по мере чтения из БД."""
+        return self.iterate('iter_bookings_details', chunk_size=chunk_size)
@@ -1,52 +1,259 @@
 # repositories/base_repo.py
-from db_config import get_connection
+from db_config import get_pool, get_connection_profile, is_busy_error, ConnectionPool
+from query_cache import MISS, QueryCache, get_query_cache
+from query_stats import QueryStats, get_query_stats
+from models import Model, model_for_table, model_row_factory
+import re
 import sqlite3
-from typing import List, Any, Dict, Optional
+import random
+import time
+from contextlib import contextmanager
+from typing import List, Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, Type, TypeVar, Union
+
+T = TypeVar('T')
+
+# Операторы, допустимые в фильтрах get_page
+FILTER_OPERATORS = {'=', '!=', '<', '<=', '>', '>=', 'LIKE'}
+
+# Таблица, в которую пишет INSERT / UPDATE / DELETE (для инвалидации кэша)
+_WRITE_TARGET_RE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)",
+    re.IGNORECASE)
 
 class BaseRepository:
     def __init__(self, db_name: str = "coaching.db"):
         self._db_name = db_name
 
-    def _execute_query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
-        """Выполняет SELECT запрос и возвращает результат в виде списка sqlite3.Row."""
-        conn = None
+    @property
+    def _pool(self) -> ConnectionPool:
+        """Общий пул соединений для БД репозитория."""
+        return get_pool(self._db_name)
+
+    @property
+    def _stats(self) -> QueryStats:
+        """Общая статистика выражений SQL для БД репозитория."""
+        return get_query_stats(self._db_name)
+
+    def _cursor(self, conn: sqlite3.Connection) -> sqlite3.Cursor:
+        """Курсор соединения; при включенной статистике — с замером выражений."""
+        stats = self._stats
+        return stats.cursor(conn) if stats.enabled else conn.cursor()
+
+    def query_stats(self, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Самые затратные выражения SQL: вызовы, суммарное и p95 время, строки."""
+        return self._stats.snapshot(top)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Открывает транзакцию на соединении потока и выдает курсор."""
+        with self._pool.transaction() as conn:
+            yield self._cursor(conn)
+
+    @contextmanager
+    def _read_transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Открывает транзакцию чтения (один снимок БД) на соединении потока и выдает курсор."""
+        with self._pool.read_transaction() as conn:
+            yield self._cursor(conn)
+
+    def transaction(self):
+        """Группирует несколько операций репозиториев в одну транзакцию."""
+        return self._pool.transaction()
+
+    @property
+    def _cache(self) -> QueryCache:
+        """Общий кэш результатов чтения для БД репозитория."""
+        return get_query_cache(self._db_name)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов кэша чтения."""
+        return self._cache.stats()
+
+    def _invalidate(self, *tables: str):
+        """
+        Сбрасывает кэшированные чтения измененных таблиц. Внутри транзакции
+        сброс откладывается до ее завершения, чтобы другие потоки не успели
+        закэшировать еще не зафиксированное состояние.
+        """
+        cache = self._cache
+        if cache.enabled:
+            self._pool.after_commit(lambda: cache.invalidate(tables))
+
+    def _with_retry(self, operation: Callable[[], T]) -> T:
+        """
+        Выполняет операцию, повторяя ее с экспоненциальной задержкой, пока БД занята.
+        Внутри уже открытой транзакции повтор невозможен, ошибка пробрасывается сразу.
+        """
+        settings = get_connection_profile()
+        retries = settings['busy_retries']
+        delay = settings['retry_backoff']
+        attempt = 0
+        while True:
+            try:
+                return operation()
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt >= retries or self._pool.in_transaction():
+                    raise
+                attempt += 1
+                time.sleep(delay * (2 ** (attempt - 1)) * (1 + random.random()))
+
+    def _execute_query(self, sql: str, params: tuple = (),
+                       tables: Optional[Sequence[str]] = None,
+                       model: Optional[Type[Model]] = None) -> List[Union[sqlite3.Row, Model]]:
+        """
+        Выполняет SELECT запрос и возвращает результат в виде списка sqlite3.Row
+        (или объектов model, если она передана).
+        Если переданы tables (все таблицы, из которых читает запрос), результат
+        кэшируется по тексту запроса и параметрам до записи в эти таблицы.
+        """
+        cache = self._cache
+        use_cache = tables is not None and cache.enabled and not self._pool.in_transaction()
+        key = (sql, params, model)
+        generation = 0
+
+        def run() -> List[sqlite3.Row]:
+            nonlocal generation
+            with self._pool.connection() as conn:
+                if use_cache:
+                    cache.sync_data_version(conn)
+                    cached = cache.get(key)
+                    if cached is not MISS:
+                        return cached
+                    generation = cache.generation
+                cursor = self._cursor(conn)
+                cursor.row_factory = model_row_factory(model) if model else sqlite3.Row
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            if use_cache:
+                cache.put(key, tables, rows, generation)
+            return rows
+
         try:
-            conn = get_connection(self._db_name)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(sql, params)
-            return cursor.fetchall()
+            return list(self._with_retry(run))
         except sqlite3.Error as e:
             print(f"❌ Ошибка БД при чтении: {e}")
             return []
-        finally:
-            if conn:
-                conn.close()
+
+    def _iter_query(self, sql: str, params: tuple = (), chunk_size: int = 1000,
+                    model: Optional[Type[Model]] = None) -> Iterator[Union[sqlite3.Row, Model]]:
+        """
+        Выполняет SELECT и отдает строки (sqlite3.Row или объекты model) по мере
+        чтения курсора пачками по chunk_size, не загружая весь результат в память.
+        """
+        with self._pool.connection() as conn:
+            cursor = self._cursor(conn)
+            cursor.row_factory = model_row_factory(model) if model else sqlite3.Row
+            self._with_retry(lambda: cursor.execute(sql, params))
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
 
     def _execute_non_query(self, sql: str, params: tuple = ()) -> bool:
         """Выполняет INSERT, UPDATE, DELETE запросы и возвращает статус успеха."""
-        conn = None
+        def run():
+            with self._transaction() as cursor:
+                cursor.execute(sql, params)
+
         try:
-            conn = get_connection(self._db_name)
-            cursor = conn.cursor()
-            cursor.execute(sql, params)
-            conn.commit()
+            self._with_retry(run)
+            match = _WRITE_TARGET_RE.match(sql)
+            if match:
+                self._invalidate(match.group(1))
+            else:
+                self._cache.clear()
             return True
         except sqlite3.Error as e:
             print(f"❌ Ошибка БД при записи: {e}")
             return False
-        finally:
-            if conn:
-                conn.close()
 
-    def get_all(self, table_name: str) -> List[Dict[str, Any]]:
-        """Возвращает все записи из указанной таблицы."""
+    def get_all(self, table_name: str, as_model: bool = False) -> List[Union[Dict[str, Any], Model]]:
+        """
+        Возвращает все записи из указанной таблицы: словари или, при as_model,
+        объекты модели таблицы (models.py), которые не нужно копировать в dict.
+        """
         sql = f"SELECT * FROM {table_name}"
-        rows = self._execute_query(sql)
+        if as_model:
+            return self._execute_query(sql, tables=(table_name,), model=model_for_table(table_name))
+        rows = self._execute_query(sql, tables=(table_name,))
         return [dict(row) for row in rows]
     
-    def get_by_id(self, table_name: str, id_col: str, item_id: int) -> Optional[Dict[str, Any]]:
-        """Возвращает запись по ID."""
+    def get_by_id(self, table_name: str, id_col: str, item_id: int,
+                  as_model: bool = False) -> Optional[Union[Dict[str, Any], Model]]:
+        """Возвращает запись по ID (словарь или, при as_model, объект модели)."""
         sql = f"SELECT * FROM {table_name} WHERE {id_col} = ?"
-        rows = self._execute_query(sql, (item_id,))
-        return dict(rows[0]) if rows else None
\ No newline at end of file
+        if as_model:
+            rows = self._execute_query(sql, (item_id,), tables=(table_name,), model=model_for_table(table_name))
+            return rows[0] if rows else None
+        rows = self._execute_query(sql, (item_id,), tables=(table_name,))
+        return dict(rows[0]) if rows else None
+
+    def _table_columns(self, table_name: str) -> List[str]:
+        """Возвращает имена столбцов таблицы (для проверки проекции и сортировки)."""
+        rows = self._execute_query(f"PRAGMA table_info({table_name})", tables=(table_name,))
+        columns = [row['name'] for row in rows]
+        if not columns:
+            raise ValueError(f"Неизвестная таблица: {table_name}")
+        return columns
+
+    def get_page(self, table_name: str, id_col: str, columns: Optional[Sequence[str]] = None,
+                 filters: Optional[Dict[str, Any]] = None, order_by: Optional[str] = None,
+                 descending: bool = False, after: Optional[tuple] = None, limit: int = 50,
+                 computed: Optional[Dict[str, str]] = None,
+                 as_model: bool = False) -> Tuple[List[Union[Dict[str, Any], Model]], Optional[tuple]]:
+        """
+        Возвращает страницу записей с keyset-пагинацией и курсор следующей страницы.
+
+        columns  — проекция (по умолчанию все столбцы);
+        filters  — {столбец: значение} или {столбец: (оператор, значение)};
+        order_by — столбец сортировки, дубликаты разрешаются по id_col;
+        after    — курсор, полученный с предыдущей страницы (None — первая страница);
+        computed — {псевдоним: SQL-выражение}, только для доверенных выражений репозиториев;
+        as_model — вернуть объекты модели таблицы (поля вне проекции равны None,
+                   computed с моделью не сочетается).
+        Курсор следующей страницы равен None, если записей больше нет.
+        """
+        known = set(self._table_columns(table_name))
+        requested = list(columns) if columns else []
+        for name in [id_col, order_by, *requested, *(filters or {})]:
+            if name and name not in known:
+                raise ValueError(f"Неизвестный столбец {table_name}.{name}")
+
+        key_cols = [order_by, id_col] if order_by and order_by != id_col else [id_col]
+        select_cols = requested or ['*']
+        if requested:
+            select_cols += [col for col in key_cols if col not in requested]
+        select_cols += [f"{expr} AS {alias}" for alias, expr in (computed or {}).items()]
+
+        conditions, params = [], []
+        for col, value in (filters or {}).items():
+            operator, operand = value if isinstance(value, tuple) else ('=', value)
+            if operator.upper() not in FILTER_OPERATORS:
+                raise ValueError(f"Недопустимый оператор фильтра: {operator}")
+            conditions.append(f"{col} {operator} ?")
+            params.append(operand)
+        if after is not None:
+            comparison = '<' if descending else '>'
+            conditions.append(f"({', '.join(key_cols)}) {comparison} ({', '.join('?' * len(key_cols))})")
+            params.extend(after)
+
+        direction = 'DESC' if descending else 'ASC'
+        sql = f"SELECT {', '.join(select_cols)} FROM {table_name}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY " + ", ".join(f"{col} {direction}" for col in key_cols) + " LIMIT ?"
+        params.append(limit + 1)
+
+        if as_model:
+            if computed:
+                raise ValueError("Вычисляемые столбцы не поддерживаются моделями")
+            rows = self._execute_query(sql, tuple(params), tables=(table_name,), model=model_for_table(table_name))
+        else:
+            rows = [dict(row) for row in self._execute_query(sql, tuple(params), tables=(table_name,))]
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, tuple(rows[-1][col] for col in key_cols)
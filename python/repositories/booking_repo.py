@@ -1,234 +1,443 @@
 # repositories/booking_repo.py
 from .base_repo import BaseRepository
-from db_config import get_connection
-from utils import ensure_output_directory, indent
-from typing import Dict, Any, List, Optional
+from .inventory_repo import InventoryRepository
+from availability import peak_concurrency
+from utils import ensure_output_directory, parse_datetime, format_timestamp
+from exporters import create_writer, open_output
+from models import Booking, TABLE_MODELS
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple, Union
 import sqlite3
 import json
-import csv
-import yaml
-import xml.etree.ElementTree as ET
 import os
 
+
+class BookingConflictError(sqlite3.IntegrityError):
+    """Тренер или пользователь уже заняты в это время."""
+
+
+class InventoryShortageError(BookingConflictError):
+    """Свободного инвентаря не хватает на время бронирования."""
+
+
 class BookingRepository(BaseRepository):
 
-    def add_booking(self, booking_data: Dict[str, Any], inventory_ids: List[int]) -> bool:
+    # Запросы вынесены в атрибуты класса, чтобы их планы проверял query_plan.py
+    # Инвентарь собирается в JSON-массив на стороне SQLite: одна строка на бронирование
+    DETAILS_SELECT = """
+            SELECT 
+                B.Booking_ID, B.Number_booking, B.Time_start, B.Time_end,
+                C.Surname || ' ' || C.Name || ' (' || C.Internal_number || ')' AS Coach,
+                U.Surname || ' ' || U.Name AS User,
+                (
+                    SELECT json_group_array(I.Name || ' (Статус: ' || ifnull(S.Name, 'None') || ')')
+                    FROM Booking_inventory BI
+                    JOIN Inventory I ON BI.Inventory_ID = I.Inventory_ID
+                    LEFT JOIN Status S ON BI.Status_ID = S.Status_ID
+                    WHERE BI.Booking_ID = B.Booking_ID
+                ) AS Inventory_list
+            FROM Booking B
+            JOIN Coach C ON B.Coach_ID = C.Coach_ID
+            JOIN User U ON B.User_ID = U.User_ID
+    """
+
+    DETAILS_SQL = DETAILS_SELECT + " ORDER BY B.Booking_ID"
+
+    # Таблицы, из которых читает DETAILS_SELECT (для инвалидации кэша)
+    DETAILS_TABLES = ('Booking', 'Coach', 'User', 'Booking_inventory', 'Inventory', 'Status')
+
+    # Бронирования тренера не пересекаются, поэтому порядок окончаний совпадает с порядком начал
+    BY_COACH_SQL = "SELECT * FROM Booking WHERE Coach_ID = ? ORDER BY End_ts, Start_ts"
+
+    BETWEEN_SQL = "SELECT * FROM Booking WHERE Start_ts >= ? AND Start_ts < ? ORDER BY Start_ts"
+
+    # Пересечение с [начало, конец): поиск по индексу (Coach_ID/User_ID, End_ts) затрагивает
+    # только бронирования, заканчивающиеся после начала нового, а не всю историю
+    COACH_CONFLICT_SQL = """
+        SELECT Booking_ID FROM Booking
+        WHERE Coach_ID = ? AND End_ts > ? AND Start_ts < ? AND Booking_ID != ? LIMIT 1
+    """
+
+    USER_CONFLICT_SQL = """
+        SELECT Booking_ID FROM Booking
+        WHERE User_ID = ? AND End_ts > ? AND Start_ts < ? AND Booking_ID != ? LIMIT 1
+    """
+
+    SQL_INSERT_BOOKING = """
+        INSERT INTO Booking (Booking_ID, Coach_ID, User_ID, Time_start, Time_end, Number_booking, Start_ts, End_ts) 
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    # Инвентарь добавляется к бронированию со статусом "Забронировано" (ID 1)
+    SQL_INSERT_LINK = "INSERT INTO Booking_inventory (Booking_ID, Inventory_ID, Status_ID) VALUES (?, ?, 1)"
+
+    # Политики обработки ошибок в add_bookings
+    BATCH_POLICIES = ('all_or_nothing', 'skip_failed', 'stop_on_error')
+
+    def _booking_params(self, booking_data: Dict[str, Any]) -> tuple:
         """
-        Добавляет бронирование и связывает его с инвентарем в рамках одной транзакции.
+        Параметры вставки бронирования (без Booking_ID): время приводится
+        к каноническому виду и дополняется метками Start_ts / End_ts.
         """
-        conn = None
+        start_ts = parse_datetime(str(booking_data['Time_start']))
+        end_ts = parse_datetime(str(booking_data['Time_end']))
+        if start_ts is None or end_ts is None:
+            raise ValueError("время должно быть в формате YYYY-MM-DD HH:MM[:SS]")
+        if end_ts <= start_ts:
+            raise ValueError("время окончания должно быть позже начала")
+        return (
+            booking_data['Coach_ID'], booking_data['User_ID'],
+            format_timestamp(start_ts), format_timestamp(end_ts),
+            booking_data['Number_booking'], start_ts, end_ts
+        )
+
+    def _check_conflicts(self, cursor: sqlite3.Cursor, params: tuple, exclude_id: int = 0):
+        """Проверяет, что тренер и пользователь свободны в интервале бронирования."""
+        coach_id, user_id, _, _, _, start_ts, end_ts = params
+        row = cursor.execute(self.COACH_CONFLICT_SQL, (coach_id, start_ts, end_ts, exclude_id)).fetchone()
+        if row:
+            raise BookingConflictError(f"Тренер уже занят в это время (бронирование {row[0]})")
+        row = cursor.execute(self.USER_CONFLICT_SQL, (user_id, start_ts, end_ts, exclude_id)).fetchone()
+        if row:
+            raise BookingConflictError(f"Пользователь уже занят в это время (бронирование {row[0]})")
+
+    def _check_inventory(self, cursor: sqlite3.Cursor, params: tuple, inventory_ids: List[int],
+                         accepted: Optional[Dict[int, List[Tuple[int, int]]]] = None, exclude_id: int = 0):
+        """
+        Проверяет, что на интервале бронирования свободна хотя бы одна единица каждого
+        предмета. Выполняется в транзакции записи (BEGIN IMMEDIATE), поэтому два
+        параллельных бронирования не могут оба пройти проверку и занять одну единицу.
+        accepted — интервалы предметов, уже принятые в этой же пачке;
+        exclude_id — изменяемое бронирование, его собственный инвентарь не учитывается.
+        """
+        ids = sorted(set(inventory_ids))
+        if not ids:
+            return
+        start_ts, end_ts = params[5], params[6]
+        placeholders = ", ".join("?" * len(ids))
+        items = {row[0]: (row[1], row[2]) for row in cursor.execute(
+            f"SELECT Inventory_ID, Name, Count FROM Inventory WHERE Inventory_ID IN ({placeholders})", ids)}
+        intervals = {inventory_id: list((accepted or {}).get(inventory_id, [])) for inventory_id in ids}
+        for row in cursor.execute(InventoryRepository.OVERLAP_SQL + f" AND BI.Inventory_ID IN ({placeholders})"
+                                  " AND B.Booking_ID != ?", (start_ts, end_ts, *ids, exclude_id)):
+            intervals[row[0]].append((row[1], row[2]))
+
+        shortages = []
+        for inventory_id in ids:
+            if inventory_id not in items:
+                shortages.append(f"инвентарь с ID {inventory_id} не найден")
+                continue
+            name, count = items[inventory_id]
+            peak, _ = peak_concurrency(intervals[inventory_id], start_ts, end_ts)
+            if count - peak < 1:
+                shortages.append(f"'{name}' (свободно {max(count - peak, 0)} из {count})")
+        if shortages:
+            raise InventoryShortageError("Недостаточно инвентаря: " + ", ".join(shortages))
+
+    def _check_batch_conflicts(self, cursor: sqlite3.Cursor,
+                               items: List[Tuple[tuple, List[int]]]) -> List[Optional[str]]:
+        """
+        Проверяет конфликты пачки: с уже сохраненными бронированиями (по индексу)
+        и между бронированиями самой пачки, включая остаток инвентаря.
+        Возвращает текст ошибки или None для каждого.
+        """
+        errors: List[Optional[str]] = []
+        accepted: Dict[Tuple[str, int], List[Tuple[int, int]]] = {}
+        accepted_inventory: Dict[int, List[Tuple[int, int]]] = {}
+        for params, inventory_ids in items:
+            coach_id, user_id, _, _, _, start_ts, end_ts = params
+            try:
+                self._check_conflicts(cursor, params)
+                for key, who in ((('Coach', coach_id), "Тренер"), (('User', user_id), "Пользователь")):
+                    if any(start < end_ts and end > start_ts for start, end in accepted.get(key, [])):
+                        raise BookingConflictError(f"{who} уже занят в это время (в этом же пакете)")
+                self._check_inventory(cursor, params, inventory_ids, accepted_inventory)
+            except BookingConflictError as e:
+                errors.append(str(e))
+                continue
+            accepted.setdefault(('Coach', coach_id), []).append((start_ts, end_ts))
+            accepted.setdefault(('User', user_id), []).append((start_ts, end_ts))
+            for inventory_id in set(inventory_ids):
+                accepted_inventory.setdefault(inventory_id, []).append((start_ts, end_ts))
+            errors.append(None)
+        return errors
+
+    def _insert_batch(self, cursor: sqlite3.Cursor, items: List[Tuple[tuple, List[int]]]) -> List[int]:
+        """
+        Вставляет пачку бронирований и их инвентарь двумя executemany.
+        ID назначаются заранее (max + 1, как это сделал бы SQLite): транзакция
+        открыта через BEGIN IMMEDIATE, поэтому параллельных вставок быть не может.
+        """
+        next_id = cursor.execute("SELECT ifnull(max(Booking_ID), 0) + 1 FROM Booking").fetchone()[0]
+        booking_ids = list(range(next_id, next_id + len(items)))
+        cursor.executemany(self.SQL_INSERT_BOOKING,
+                           [(booking_id, *params) for booking_id, (params, _) in zip(booking_ids, items)])
+        cursor.executemany(self.SQL_INSERT_LINK,
+                           [(booking_id, inventory_id)
+                            for booking_id, (_, inventory_ids) in zip(booking_ids, items)
+                            for inventory_id in inventory_ids])
+        return booking_ids
+
+    def add_bookings(self, bookings: Sequence[Tuple[Dict[str, Any], List[int]]],
+                     policy: str = 'all_or_nothing') -> List[Dict[str, Any]]:
+        """
+        Пакетно добавляет бронирования с инвентарем в одной транзакции.
+
+        bookings — список пар (данные бронирования, список ID инвентаря);
+        policy:
+          all_or_nothing — все бронирования одним executemany, при ошибке откатываются все;
+          skip_failed    — ошибочные бронирования пропускаются, остальные сохраняются;
+          stop_on_error  — сохраняются бронирования до первой ошибки, остальные не обрабатываются.
+        Возвращает по результату на каждое бронирование: index, ok, Booking_ID, error.
+        """
+        if policy not in self.BATCH_POLICIES:
+            raise ValueError(f"Неизвестная политика: {policy}")
+        results = [{'index': i, 'ok': False, 'Booking_ID': None, 'error': None} for i in range(len(bookings))]
+
+        # Проверка полей до обращения к БД
+        items: List[Tuple[int, tuple, List[int]]] = []
+        for i, (booking_data, inventory_ids) in enumerate(bookings):
+            try:
+                items.append((i, self._booking_params(booking_data), [int(x) for x in inventory_ids]))
+            except (KeyError, TypeError, ValueError) as e:
+                results[i]['error'] = f"Некорректные данные: {e}"
+        if not items:
+            return results
+        if policy != 'skip_failed' and len(items) < len(bookings):
+            for result in results:
+                result['error'] = result['error'] or "Не обработано из-за ошибки в пакете"
+            return results
+
+        def run_all_or_nothing():
+            with self._transaction() as cursor:
+                conflicts = self._check_batch_conflicts(cursor, [(params, inv) for _, params, inv in items])
+                if any(conflicts):
+                    for (i, _, _), error in zip(items, conflicts):
+                        results[i]['error'] = error or "Не обработано из-за конфликта в пакете"
+                    return
+                booking_ids = self._insert_batch(cursor, [(params, inv) for _, params, inv in items])
+            for (i, _, _), booking_id in zip(items, booking_ids):
+                results[i].update(ok=True, Booking_ID=booking_id, error=None)
+
+        def run_per_item():
+            with self._transaction() as cursor:
+                failed = False
+                for i, params, inventory_ids in items:
+                    if failed:
+                        results[i]['error'] = "Не обработано после ошибки"
+                        continue
+                    try:
+                        # Каждое бронирование — в своей точке сохранения (SAVEPOINT)
+                        with self._transaction() as item_cursor:
+                            self._check_conflicts(item_cursor, params)
+                            self._check_inventory(item_cursor, params, inventory_ids)
+                            booking_id, = self._insert_batch(item_cursor, [(params, inventory_ids)])
+                        results[i].update(ok=True, Booking_ID=booking_id, error=None)
+                    except sqlite3.IntegrityError as e:
+                        results[i].update(ok=False, Booking_ID=None, error=str(e))
+                        failed = policy == 'stop_on_error'
+
         try:
-            conn = get_connection(self._db_name)
-            cursor = conn.cursor()
-
-            # 1. Добавление бронирования
-            sql_booking = """
-                INSERT INTO Booking (Coach_ID, User_ID, Time_start, Time_end, Number_booking) 
-                VALUES (?, ?, ?, ?, ?)
-            """
-            params_booking = (
-                booking_data['Coach_ID'], booking_data['User_ID'], 
-                booking_data['Time_start'], booking_data['Time_end'], 
-                booking_data['Number_booking']
-            )
-            cursor.execute(sql_booking, params_booking)
-            new_booking_id = cursor.lastrowid
-
-            # 2. Добавление инвентаря к бронированию (Статус "Забронировано" = ID 1)
-            sql_inventory = "INSERT INTO Booking_inventory (Booking_ID, Inventory_ID, Status_ID) VALUES (?, ?, 1)"
-            
-            for inventory_id in inventory_ids:
-                cursor.execute(sql_inventory, (new_booking_id, inventory_id))
-
-            conn.commit()
-            return True
+            self._with_retry(run_all_or_nothing if policy == 'all_or_nothing' else run_per_item)
         except sqlite3.Error as e:
-            if conn:
-                conn.rollback()
-            print(f"❌ Ошибка БД при добавлении бронирования. Транзакция отменена: {e}")
-            return False
-        finally:
-            if conn:
-                conn.close()
+            for i, _, _ in items:
+                results[i].update(ok=False, Booking_ID=None, error=str(e))
+        if any(result['ok'] for result in results):
+            self._invalidate('Booking', 'Booking_inventory')
+        return results
+
+    def add_booking(self, booking_data: Dict[str, Any], inventory_ids: List[int]) -> bool:
+        """
+        Добавляет бронирование и связывает его с инвентарем в рамках одной транзакции.
+        """
+        result = self.add_bookings([(booking_data, inventory_ids)])[0]
+        if not result['ok']:
+            print(f"❌ Ошибка БД при добавлении бронирования. Транзакция отменена: {result['error']}")
+        return result['ok']
     
     def update_booking(self, booking_id: int, booking_data: Dict[str, Any]) -> bool:
-        """Обновляет данные бронирования."""
+        """
+        Обновляет данные бронирования с проверкой занятости тренера и пользователя
+        и остатка выданного бронированию инвентаря на новом интервале.
+        """
         sql = """
             UPDATE Booking SET Coach_ID = ?, User_ID = ?, Time_start = ?, 
-            Time_end = ?, Number_booking = ? WHERE Booking_ID = ?
+            Time_end = ?, Number_booking = ?, Start_ts = ?, End_ts = ? WHERE Booking_ID = ?
         """
-        params = (
-            booking_data['Coach_ID'], booking_data['User_ID'],
-            booking_data['Time_start'], booking_data['Time_end'],
-            booking_data['Number_booking'], booking_id
-        )
-        return self._execute_non_query(sql, params)
+        try:
+            params = self._booking_params(booking_data)
+        except (KeyError, ValueError) as e:
+            print(f"❌ Некорректные данные бронирования: {e}")
+            return False
+
+        def run():
+            with self._transaction() as cursor:
+                self._check_conflicts(cursor, params, exclude_id=booking_id)
+                inventory_ids = [row[0] for row in cursor.execute(
+                    "SELECT Inventory_ID FROM Booking_inventory WHERE Booking_ID = ? AND Status_ID IN (1, 2)",
+                    (booking_id,))]
+                self._check_inventory(cursor, params, inventory_ids, exclude_id=booking_id)
+                cursor.execute(sql, (*params, booking_id))
+
+        try:
+            self._with_retry(run)
+            self._invalidate('Booking')
+            return True
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка БД при записи: {e}")
+            return False
 
     def delete_booking(self, booking_id: int) -> bool:
         """Удаляет бронирование по ID."""
         sql = "DELETE FROM Booking WHERE Booking_ID = ?"
         return self._execute_non_query(sql, (booking_id,))
 
-    def get_booking_by_id(self, booking_id: int) -> Optional[Dict[str, Any]]:
+    def update_inventory_status(self, booking_id: int, inventory_id: int, status_id: int) -> bool:
+        """Меняет статус предмета инвентаря в бронировании."""
+        sql = "UPDATE Booking_inventory SET Status_ID = ? WHERE Booking_ID = ? AND Inventory_ID = ?"
+        return self._execute_non_query(sql, (status_id, booking_id, inventory_id))
+
+    def get_booking_by_id(self, booking_id: int, as_model: bool = False) -> Optional[Union[Dict[str, Any], Booking]]:
         """Получает бронирование по ID."""
-        return self.get_by_id("Booking", "Booking_ID", booking_id)
+        return self.get_by_id("Booking", "Booking_ID", booking_id, as_model=as_model)
+
+    def get_bookings_by_coach(self, coach_id: int, as_model: bool = False) -> List[Union[Dict[str, Any], Booking]]:
+        """Возвращает бронирования тренера в порядке времени начала."""
+        if as_model:
+            return self._execute_query(self.BY_COACH_SQL, (coach_id,), model=Booking)
+        rows = self._execute_query(self.BY_COACH_SQL, (coach_id,))
+        return [dict(row) for row in rows]
+
+    def get_bookings_between(self, time_from: str, time_to: str,
+                             as_model: bool = False) -> List[Union[Dict[str, Any], Booking]]:
+        """Возвращает бронирования, начинающиеся в интервале [time_from, time_to)."""
+        start_ts, end_ts = parse_datetime(time_from), parse_datetime(time_to)
+        if start_ts is None or end_ts is None:
+            raise ValueError("время должно быть в формате YYYY-MM-DD HH:MM[:SS]")
+        if as_model:
+            return self._execute_query(self.BETWEEN_SQL, (start_ts, end_ts), model=Booking)
+        rows = self._execute_query(self.BETWEEN_SQL, (start_ts, end_ts))
+        return [dict(row) for row in rows]
+
+    def iter_bookings_details(self) -> Iterator[Dict[str, Any]]:
+        """Отдает бронирования с деталями по одному, по мере чтения из БД."""
+        for row in self._iter_query(self.DETAILS_SQL):
+            booking = dict(row)
+            booking['Inventory_list'] = json.loads(booking['Inventory_list'])
+            yield booking
+
+    def get_bookings_details_page(self, after: Optional[int] = None, limit: int = 20,
+                                  coach_id: Optional[int] = None,
+                                  user_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Страница бронирований с деталями (keyset-пагинация по Booking_ID).
+        Возвращает записи и Booking_ID для следующей страницы (None — страниц больше нет).
+        """
+        conditions, params = [], []
+        if after is not None:
+            conditions.append("B.Booking_ID > ?")
+            params.append(after)
+        if coach_id is not None:
+            conditions.append("B.Coach_ID = ?")
+            params.append(coach_id)
+        if user_id is not None:
+            conditions.append("B.User_ID = ?")
+            params.append(user_id)
+        sql = self.DETAILS_SELECT
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY B.Booking_ID LIMIT ?"
+        params.append(limit + 1)
+
+        bookings = []
+        for row in self._execute_query(sql, tuple(params), tables=self.DETAILS_TABLES):
+            booking = dict(row)
+            booking['Inventory_list'] = json.loads(booking['Inventory_list'])
+            bookings.append(booking)
+        if len(bookings) <= limit:
+            return bookings, None
+        bookings = bookings[:limit]
+        return bookings, bookings[-1]['Booking_ID']
 
     def display_all_bookings_details(self) -> List[Dict[str, Any]]:
-        """Возвращает все бронирования с деталями тренера, пользователя и инвентаря."""
-        sql = """
-            SELECT 
-                B.Booking_ID, B.Time_start, B.Time_end, B.Number_booking,
-                C.Surname AS Coach_Surname, C.Name AS Coach_Name, C.Internal_number,
-                U.Surname AS User_Surname, U.Name AS User_Name,
-                I.Name AS Inventory_Name, S.Name AS Status_Name
-            FROM Booking B
-            JOIN Coach C ON B.Coach_ID = C.Coach_ID
-            JOIN User U ON B.User_ID = U.User_ID
-            LEFT JOIN Booking_inventory BI ON B.Booking_ID = BI.Booking_ID
-            LEFT JOIN Inventory I ON BI.Inventory_ID = I.Inventory_ID
-            LEFT JOIN Status S ON BI.Status_ID = S.Status_ID
-            ORDER BY B.Booking_ID
-        """
-        rows = self._execute_query(sql)
-        
-        grouped_bookings = {}
-        for row in rows:
-            booking_id = row['Booking_ID']
-            if booking_id not in grouped_bookings:
-                grouped_bookings[booking_id] = {
-                    'Booking_ID': row['Booking_ID'],
-                    'Number_booking': row['Number_booking'],
-                    'Time_start': row['Time_start'],
-                    'Time_end': row['Time_end'],
-                    'Coach': f"{row['Coach_Surname']} {row['Coach_Name']} ({row['Internal_number']})",
-                    'User': f"{row['User_Surname']} {row['User_Name']}",
-                    'Inventory_list': []
-                }
-
-            if row['Inventory_Name']:
-                grouped_bookings[booking_id]['Inventory_list'].append(
-                    f"{row['Inventory_Name']} (Статус: {row['Status_Name']})"
-                )
-
-        return list(grouped_bookings.values())
-
-    def export_table_to_file(self, table_name: str, file_format: str):
-        """Универсальный экспорт одной таблицы в JSON, CSV, YAML или XML."""
-        
+        """
+        Возвращает все бронирования с деталями тренера, пользователя и инвентаря.
+        Результат кэшируется до изменения любой из таблиц соединения; для выгрузок
+        больших объемов используйте iter_bookings_details.
+        """
+        bookings = []
+        for row in self._execute_query(self.DETAILS_SQL, tables=self.DETAILS_TABLES):
+            booking = dict(row)
+            booking['Inventory_list'] = json.loads(booking['Inventory_list'])
+            bookings.append(booking)
+        return bookings
+
+    def export_table_to_file(self, table_name: str, file_format: str, output_dir: str = "out") -> Optional[str]:
+        """
+        Универсальный потоковый экспорт одной таблицы в JSON, CSV, YAML или XML.
+        Строки читаются из курсора пачками и сразу пишутся в файл.
+        Возвращает путь к файлу или None, если экспорт не выполнен.
+        """
         output_filename = f"{table_name.lower()}.{file_format}"
-        output_path = os.path.join("out", output_filename)
-        ensure_output_directory()
-        records = self.get_all(table_name) 
-        if not records:
-            print(f"ℹ️ Таблица '{table_name}' пуста.")
-            return
+        output_path = os.path.join(output_dir, output_filename)
+        ensure_output_directory(output_dir)
 
         try:
-            if file_format == 'json':
-                self._export_to_json(records, output_path)
-            elif file_format == 'csv':
-                self._export_to_csv(records, output_path, table_name)
-            elif file_format == 'yaml':
-                self._export_to_yaml(records, output_path)
-            elif file_format == 'xml':
-                self._export_to_xml(records, output_path, table_name)
-            
+            # Таблицы с моделью читаются в компактные объекты без словаря на строку
+            model = TABLE_MODELS.get(table_name)
+            rows = self._iter_query(f"SELECT * FROM {table_name}", model=model)
+            if model is None:
+                rows = map(dict, rows)
+            first_row = next(rows, None)
+            if first_row is None:
+                print(f"ℹ️ Таблица '{table_name}' пуста.")
+                return None
+
+            item_tag = table_name[:-1] if table_name.endswith('s') else table_name
+            with open_output(output_path, file_format) as stream:
+                writer = create_writer(file_format, stream, f"{table_name}List", item_tag,
+                                       list(first_row.keys()))
+                writer.begin()
+                writer.write(first_row)
+                for row in rows:
+                    writer.write(row)
+                writer.end()
+
             print(f"✅ Данные экспортированы в: {output_path}")
-            
+            return output_path
+
         except Exception as e:
             print(f"❌ Ошибка при экспорте в {file_format}: {e}")
+            return None
 
-    def _export_to_json(self, records: List[Dict], file_path: str):
-        """Экспорт в JSON формат."""
-        import json
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(records, f, ensure_ascii=False, indent=2)
-
-    def _export_to_csv(self, records: List[Dict], file_path: str, table_name: str):
-        """Экспорт в CSV формат."""
-        import csv
-        if not records:
-            return
-            
-        fieldnames = records[0].keys()
-        with open(file_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(records)
-
-    def _export_to_yaml(self, records: List[Dict], file_path: str):
-        """Экспорт в YAML формат."""
-        import yaml
-        with open(file_path, 'w', encoding='utf-8') as f:
-            yaml.dump(records, f, allow_unicode=True, default_flow_style=False)
-
-    def _export_to_xml(self, records: List[Dict], file_path: str, table_name: str):
-        """Экспорт в XML формат."""
-        root = ET.Element(f"{table_name}List")
-        
-        for record in records:
-            item_elem = ET.SubElement(root, table_name[:-1] if table_name.endswith('s') else table_name)
-            for key, value in record.items():
-                field_elem = ET.SubElement(item_elem, str(key))
-                field_elem.text = str(value) if value is not None else ""
-        
-        indent(root)
-        tree = ET.ElementTree(root)
-        tree.write(file_path, encoding='utf-8', xml_declaration=True)
-
-    def export_nested_booking_to_file(self, file_format: str):
-        """Экспорт бронирований с вложенной структурой (инвентарь внутри брони)."""
+    def export_nested_booking_to_file(self, file_format: str, output_dir: str = "out") -> Optional[str]:
+        """
+        Потоковый экспорт бронирований с вложенной структурой (инвентарь внутри брони).
+        Каждое бронирование пишется в файл сразу после чтения из БД.
+        """
         output_filename = f"bookings_nested.{file_format}"
-        output_path = os.path.join("out", output_filename)
-        ensure_output_directory()
-        bookings = self.display_all_bookings_details()
-        if not bookings:
-            print("ℹ️ Нет данных для экспорта.")
-            return
+        output_path = os.path.join(output_dir, output_filename)
+        ensure_output_directory(output_dir)
 
         try:
-            if file_format == 'json':
-                self._export_nested_to_json(bookings, output_path)
-            elif file_format == 'yaml':
-                self._export_nested_to_yaml(bookings, output_path)
-            elif file_format == 'xml':
-                self._export_nested_to_xml(bookings, output_path)
-            
+            bookings = self.iter_bookings_details()
+            first_booking = next(bookings, None)
+            if first_booking is None:
+                print("ℹ️ Нет данных для экспорта.")
+                return None
+
+            with open_output(output_path, file_format) as stream:
+                writer = create_writer(file_format, stream, "Bookings", "Booking",
+                                       list(first_booking.keys()),
+                                       list_tags={'Inventory_list': ("InventoryList", "Item")})
+                writer.begin()
+                writer.write(first_booking)
+                for booking in bookings:
+                    writer.write(booking)
+                writer.end()
+
             print(f"✅ Вложенные данные бронирований экспортированы в: {output_path}")
-            
+            return output_path
+
         except Exception as e:
             print(f"❌ Ошибка при вложенном экспорте в {file_format}: {e}")
-
-    def _export_nested_to_json(self, bookings: List[Dict], file_path: str):
-        """Экспорт вложенных данных в JSON."""
-        import json
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(bookings, f, ensure_ascii=False, indent=2)
-
-    def _export_nested_to_yaml(self, bookings: List[Dict], file_path: str):
-        """Экспорт вложенных данных в YAML."""
-        import yaml
-        with open(file_path, 'w', encoding='utf-8') as f:
-            yaml.dump(bookings, f, allow_unicode=True, default_flow_style=False)
-
-    def _export_nested_to_xml(self, bookings: List[Dict], file_path: str):
-        """Экспорт вложенных данных в XML."""
-        root = ET.Element("Bookings")
-        
-        for booking in bookings:
-            booking_elem = ET.SubElement(root, "Booking")
-            
-            for key, value in booking.items():
-                if key == 'Inventory_list':
-                    # Обрабатываем список инвентаря отдельно
-                    inventory_elem = ET.SubElement(booking_elem, "InventoryList")
-                    for item in value:
-                        item_elem = ET.SubElement(inventory_elem, "Item")
-                        item_elem.text = item
-                else:
-                    field_elem = ET.SubElement(booking_elem, key)
-                    field_elem.text = str(value) if value is not None else ""
-        
-        indent(root)
-        tree = ET.ElementTree(root)
-        tree.write(file_path, encoding='utf-8', xml_declaration=True)
\ No newline at end of file
+            return None
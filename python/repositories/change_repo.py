@@ -0,0 +1,293 @@
+# repositories/change_repo.py
+from .base_repo import BaseRepository
+from .booking_repo import BookingRepository
+from utils import ensure_output_directory
+from exporters import create_writer, open_output, supports_nested
+from export_job import NESTED_BOOKINGS
+from migrations import CHANGE_TABLES
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+import json
+import os
+
+# Служебные поля записи дельты: номер последнего изменения и операция (I / U / D)
+CHANGE_FIELDS = ['Change_seq', 'Change_op']
+
+
+class ChangeRepository(BaseRepository):
+    """
+    Инкрементальный экспорт по журналу изменений (Change_log, ведется триггерами).
+
+    Для каждого потребителя и таблицы хранится водяной знак — номер последнего
+    выгруженного изменения. Дельта содержит по одной записи на ключ: изменения
+    с момента водяного знака схлопываются, строка берется в текущем состоянии.
+    Строка, вставленная и удаленная внутри окна, в дельту не попадает. Первая
+    выгрузка потребителя — полная (все строки с операцией I).
+    """
+
+    # Схлопнутые изменения таблицы с текущим состоянием строки; {table} и {join} подставляются
+    CHANGES_SQL = """
+        WITH K AS (
+            SELECT Key_1, Key_2, max(Seq) AS Seq, min(Seq) AS First_seq
+            FROM Change_log
+            WHERE Table_name = ? AND Seq > ? AND Seq <= ?
+            GROUP BY Key_1, Key_2
+        )
+        SELECT K.Seq AS Change_seq, F.Op AS First_op, K.Key_1, K.Key_2, T.*
+        FROM K
+        JOIN Change_log F ON F.Seq = K.First_seq
+        LEFT JOIN {table} T ON {join}
+        ORDER BY K.Seq
+    """
+
+    # Бронирования, чье вложенное представление могло измениться: сама бронь, ее инвентарь,
+    # а также тренер, пользователь и предметы, имена которых попадают в запись.
+    # CROSS JOIN фиксирует порядок: от короткого окна журнала к индексам бронирований
+    NESTED_CHANGES_SQL = """
+        WITH L AS (
+            SELECT Table_name, Key_1, Seq FROM Change_log WHERE Seq > ? AND Seq <= ?
+        ),
+        C (Booking_ID, Seq, Booking_seq) AS (
+            SELECT Key_1, Seq, CASE WHEN Table_name = 'Booking' THEN Seq END
+            FROM L WHERE Table_name IN ('Booking', 'Booking_inventory')
+            UNION ALL
+            SELECT B.Booking_ID, L.Seq, NULL FROM L CROSS JOIN Booking B ON B.Coach_ID = L.Key_1
+            WHERE L.Table_name = 'Coach'
+            UNION ALL
+            SELECT B.Booking_ID, L.Seq, NULL FROM L CROSS JOIN Booking B ON B.User_ID = L.Key_1
+            WHERE L.Table_name = 'User'
+            UNION ALL
+            SELECT BI.Booking_ID, L.Seq, NULL FROM L CROSS JOIN Booking_inventory BI ON BI.Inventory_ID = L.Key_1
+            WHERE L.Table_name = 'Inventory'
+        ),
+        K AS (
+            SELECT Booking_ID, max(Seq) AS Seq, min(Booking_seq) AS First_seq FROM C GROUP BY Booking_ID
+        )
+        SELECT K.Booking_ID, K.Seq AS Change_seq, F.Op AS First_op,
+               EXISTS (SELECT 1 FROM Booking WHERE Booking_ID = K.Booking_ID) AS Present
+        FROM K LEFT JOIN Change_log F ON F.Seq = K.First_seq
+        ORDER BY K.Seq
+    """
+
+    # Сколько бронирований читать одним запросом DETAILS_SELECT
+    NESTED_CHUNK = 500
+
+    def _check_table(self, table_name: str):
+        if table_name not in CHANGE_TABLES and table_name != NESTED_BOOKINGS:
+            raise ValueError(f"Таблица '{table_name}' не отслеживается "
+                             f"(доступны: {', '.join(list(CHANGE_TABLES) + [NESTED_BOOKINGS])})")
+
+    def current_seq(self) -> int:
+        """Номер последнего зафиксированного изменения (0, если журнал пуст)."""
+        # sqlite_sequence хранит номер даже после очистки журнала
+        rows = self._execute_query("SELECT seq FROM sqlite_sequence WHERE name = 'Change_log'")
+        return rows[0][0] if rows else 0
+
+    def get_watermark(self, consumer: str, table_name: str) -> Optional[int]:
+        """Водяной знак потребителя по таблице; None — потребитель еще не выгружал таблицу."""
+        rows = self._execute_query("SELECT Seq FROM Export_watermark WHERE Consumer = ? AND Table_name = ?",
+                                   (consumer, table_name))
+        return rows[0][0] if rows else None
+
+    def get_watermarks(self) -> List[Dict[str, Any]]:
+        """Все водяные знаки с числом еще не выгруженных изменений журнала."""
+        sql = """
+            SELECT W.Consumer, W.Table_name, W.Seq, W.Updated_at,
+                   (SELECT count(*) FROM Change_log L WHERE L.Seq > W.Seq) AS Pending
+            FROM Export_watermark W ORDER BY W.Consumer, W.Table_name
+        """
+        return [dict(row) for row in self._execute_query(sql)]
+
+    def set_watermark(self, consumer: str, table_name: str, seq: int) -> bool:
+        """Сдвигает водяной знак вперед (параллельная выгрузка с большим номером не откатывается)."""
+        sql = """
+            INSERT INTO Export_watermark (Consumer, Table_name, Seq, Updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (Consumer, Table_name) DO UPDATE
+            SET Seq = max(Seq, excluded.Seq), Updated_at = excluded.Updated_at
+        """
+        return self._execute_non_query(sql, (consumer, table_name, seq, datetime.now().isoformat(timespec='seconds')))
+
+    def reset_watermark(self, consumer: str, table_name: Optional[str] = None) -> bool:
+        """Забывает водяные знаки потребителя: следующая выгрузка будет полной."""
+        if table_name is None:
+            return self._execute_non_query("DELETE FROM Export_watermark WHERE Consumer = ?", (consumer,))
+        return self._execute_non_query("DELETE FROM Export_watermark WHERE Consumer = ? AND Table_name = ?",
+                                       (consumer, table_name))
+
+    def prune_change_log(self) -> int:
+        """
+        Удаляет из журнала изменения, уже выгруженные всеми потребителями
+        (до минимального водяного знака). Без потребителей журнал очищается целиком:
+        новый потребитель все равно начнет с полной выгрузки. Возвращает число удаленных записей.
+        """
+        sql = """
+            DELETE FROM Change_log WHERE Seq <= coalesce((SELECT min(Seq) FROM Export_watermark),
+                                                         (SELECT max(Seq) FROM Change_log))
+        """
+        deleted = 0
+
+        def run():
+            nonlocal deleted
+            with self._transaction() as cursor:
+                cursor.execute(sql)
+                deleted = cursor.rowcount
+
+        try:
+            self._with_retry(run)
+        except Exception as e:
+            print(f"❌ Ошибка БД при очистке журнала изменений: {e}")
+        return deleted
+
+    # 1. ЧТЕНИЕ ДЕЛЬТЫ
+
+    def iter_table_changes(self, table_name: str, since: int, until: int) -> Iterator[Dict[str, Any]]:
+        """
+        Изменения таблицы с номерами (since, until], по одной записи на ключ.
+        Для I / U — текущее состояние строки, для D — только столбцы ключа.
+        """
+        key = CHANGE_TABLES[table_name]
+        join = " AND ".join(f"T.{column} = K.Key_{i}" for i, column in enumerate(key, 1))
+        sql = self.CHANGES_SQL.format(table=table_name, join=join)
+        columns = self._table_columns(table_name)
+        for row in self._iter_query(sql, (table_name, since, until)):
+            record = {'Change_seq': row['Change_seq']}
+            if row[key[0]] is None:
+                # Строки уже нет: если она и появилась внутри окна, потребитель ее не видел
+                if row['First_op'] == 'I':
+                    continue
+                record['Change_op'] = 'D'
+                record.update((column, None) for column in columns)
+                for i, column in enumerate(key, 1):
+                    record[column] = row[f'Key_{i}']
+            else:
+                record['Change_op'] = 'I' if row['First_op'] == 'I' else 'U'
+                record.update((column, row[column]) for column in columns)
+            yield record
+
+    def _iter_nested_details(self, booking_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        placeholders = ", ".join("?" * len(booking_ids))
+        sql = BookingRepository.DETAILS_SELECT + f" WHERE B.Booking_ID IN ({placeholders})"
+        details = {}
+        for row in self._iter_query(sql, tuple(booking_ids)):
+            booking = dict(row)
+            booking['Inventory_list'] = json.loads(booking['Inventory_list'])
+            details[booking['Booking_ID']] = booking
+        return details
+
+    def iter_nested_changes(self, since: int, until: int) -> Iterator[Dict[str, Any]]:
+        """Вложенные записи бронирований (как в export_nested_booking_to_file), измененные в (since, until]."""
+        changed = [dict(row) for row in self._iter_query(self.NESTED_CHANGES_SQL, (since, until))]
+        fields = self._nested_fields() if changed else []
+        for start in range(0, len(changed), self.NESTED_CHUNK):
+            chunk = changed[start:start + self.NESTED_CHUNK]
+            details = self._iter_nested_details([item['Booking_ID'] for item in chunk if item['Present']])
+            for item in chunk:
+                booking = details.get(item['Booking_ID'])
+                if booking is None:
+                    if item['First_op'] == 'I':
+                        continue
+                    deleted = dict.fromkeys(fields)
+                    deleted['Booking_ID'] = item['Booking_ID']
+                    yield {'Change_seq': item['Change_seq'], 'Change_op': 'D', **deleted}
+                else:
+                    op = 'I' if item['First_op'] == 'I' else 'U'
+                    yield {'Change_seq': item['Change_seq'], 'Change_op': op, **booking}
+
+    def _iter_full(self, table_name: str, until: int) -> Iterator[Dict[str, Any]]:
+        """Полная выгрузка для нового потребителя: все строки как вставки."""
+        if table_name == NESTED_BOOKINGS:
+            rows = BookingRepository(self._db_name).iter_bookings_details()
+        else:
+            rows = map(dict, self._iter_query(f"SELECT * FROM {table_name}"))
+        for row in rows:
+            yield {'Change_seq': until, 'Change_op': 'I', **row}
+
+    # 2. ЭКСПОРТ ДЕЛЬТЫ
+
+    def export_changes_to_file(self, table_name: str, file_format: str, consumer: str = "default",
+                               output_dir: str = "out") -> Optional[Dict[str, Any]]:
+        """
+        Выгружает изменения таблицы (или NESTED_BOOKINGS) с водяного знака потребителя
+        в файл <таблица>_changes_<от>_<до>.<формат> (первая выгрузка — <таблица>_full_<до>)
+        и сдвигает водяной знак. Водяной знак сдвигается только после успешной записи файла.
+        Возвращает {'path', 'full', 'since', 'until', 'records'} (path = None, если изменений нет)
+        или None, если экспорт не выполнен.
+        """
+        partial_path = None
+        try:
+            self._check_table(table_name)
+            if table_name == NESTED_BOOKINGS and not supports_nested(file_format):
+                raise ValueError(f"Формат {file_format} не подходит для вложенного экспорта")
+
+            # until и строки читаются из одного снимка БД: изменение, зафиксированное
+            # между ними, иначе попало бы и в эту дельту, и в следующую
+            with self._read_transaction():
+                until = self.current_seq()
+                since = self.get_watermark(consumer, table_name)
+                full = since is None
+                if full:
+                    records = self._iter_full(table_name, until)
+                    since = 0
+                elif table_name == NESTED_BOOKINGS:
+                    records = self.iter_nested_changes(since, until)
+                else:
+                    records = self.iter_table_changes(table_name, since, until)
+                result = {'path': None, 'full': full, 'since': since, 'until': until, 'records': 0}
+
+                first_record = next(records, None)
+                if first_record is not None:
+                    if table_name == NESTED_BOOKINGS:
+                        fieldnames = CHANGE_FIELDS + self._nested_fields()
+                        root_tag, item_tag = "BookingChanges", "Booking"
+                        list_tags = {'Inventory_list': ("InventoryList", "Item")}
+                    else:
+                        fieldnames = CHANGE_FIELDS + self._table_columns(table_name)
+                        item_tag = table_name[:-1] if table_name.endswith('s') else table_name
+                        root_tag, list_tags = f"{table_name}Changes", None
+
+                    # Файл пишется под временным именем: недописанная дельта не должна попасть к потребителю
+                    ensure_output_directory(output_dir)
+                    kind = f"full_{until}" if full else f"changes_{since}_{until}"
+                    output_path = os.path.join(output_dir, f"{table_name.lower()}_{kind}.{file_format}")
+                    partial_path = output_path + ".part"
+                    with open_output(partial_path, file_format) as stream:
+                        writer = create_writer(file_format, stream, root_tag, item_tag, fieldnames,
+                                               list_tags=list_tags)
+                        writer.begin()
+                        writer.write(first_record)
+                        for record in records:
+                            writer.write(record)
+                        writer.end()
+
+            if first_record is None:
+                self.set_watermark(consumer, table_name, until)
+                print(f"ℹ️ Изменений в '{table_name}' нет (номер изменения {until}).")
+                return result
+
+            os.replace(partial_path, output_path)
+            partial_path = None
+
+            if not self.set_watermark(consumer, table_name, until):
+                print(f"❌ Водяной знак не сохранен: следующая выгрузка повторит изменения до {until}.")
+            result.update(path=output_path, records=writer.count)
+            print(f"✅ Изменения экспортированы в: {output_path} (записей: {writer.count})")
+            return result
+
+        except Exception as e:
+            print(f"❌ Ошибка при экспорте изменений в {file_format}: {e}")
+            return None
+        finally:
+            if partial_path and os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def _nested_fields(self) -> List[str]:
+        """Поля вложенной записи бронирования (по описанию запроса DETAILS_SELECT)."""
+        with self._pool.connection() as conn:
+            cursor = conn.execute(BookingRepository.DETAILS_SELECT + " LIMIT 0")
+            return [column[0] for column in cursor.description]
+
+    def export_all_changes(self, file_format: str, consumer: str = "default", output_dir: str = "out",
+                           tables: Optional[List[str]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Выгружает изменения нескольких таблиц (по умолчанию — всех отслеживаемых): таблица -> результат."""
+        return {table_name: self.export_changes_to_file(table_name, file_format, consumer, output_dir)
+                for table_name in tables or list(CHANGE_TABLES)}
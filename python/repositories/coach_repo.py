@@ -1,16 +1,22 @@
 # repositories/coach_repo.py
 from .base_repo import BaseRepository
-from typing import List, Dict, Any, List, Optional
+from passwords import ensure_hashed, PASSWORD_MASK
+from models import Coach
+from dataclasses import replace
+from typing import List, Dict, Any, Optional, Tuple, Union
 
 class CoachRepository(BaseRepository):
     
     def add_coach(self, coach_data: Dict[str, Any]) -> bool:
-        """Добавляет нового тренера."""
+        """
+        Добавляет нового тренера. Пароль можно передать уже хэшированным
+        (with_hashed_password), чтобы не хэшировать его внутри транзакции.
+        """
         sql = """
             INSERT INTO Coach (Internal_number, Surname, Name, Experience, Password) 
             VALUES (?, ?, ?, ?, ?)
         """
-        params = (coach_data['Internal_number'], coach_data['Surname'], coach_data['Name'], coach_data['Experience'], coach_data['Password'])
+        params = (coach_data['Internal_number'], coach_data['Surname'], coach_data['Name'], coach_data['Experience'], ensure_hashed(coach_data['Password']))
         return self._execute_non_query(sql, params)
 
     def get_coach_by_internal_number(self, num: int) -> List[Dict[str, Any]]:
@@ -19,15 +25,27 @@ class CoachRepository(BaseRepository):
         rows = self._execute_query(sql, (num,))
         return [dict(row) for row in rows]
     
-    def display_all_coaches_details(self) -> List[Dict[str, Any]]:
+    def display_all_coaches_details(self, as_model: bool = False) -> List[Union[Dict[str, Any], Coach]]:
         """Возвращает все детали тренеров, маскируя пароль."""
+        if as_model:
+            return [replace(coach, password=PASSWORD_MASK) for coach in self.get_all("Coach", as_model=True)]
         coaches = self.get_all("Coach")
         for coach in coaches:
-            coach['Password'] = '*' * len(coach['Password'])
+            coach['Password'] = PASSWORD_MASK
         return coaches
     
+    def get_coaches_page(self, after: Optional[tuple] = None, limit: int = 20,
+                         filters: Optional[Dict[str, Any]] = None, order_by: Optional[str] = None,
+                         descending: bool = False,
+                         as_model: bool = False) -> Tuple[List[Union[Dict[str, Any], Coach]], Optional[tuple]]:
+        """Страница тренеров без паролей."""
+        return self.get_page("Coach", "Coach_ID",
+                             columns=["Coach_ID", "Internal_number", "Surname", "Name", "Experience"],
+                             filters=filters, order_by=order_by, descending=descending,
+                             after=after, limit=limit, as_model=as_model)
+
     def update_coach(self, coach_id: int, coach_data: Dict[str, Any]) -> bool:
-        """Обновляет данные тренера."""
+        """Обновляет данные тренера (пароль — открытый или уже хэшированный)."""
         sql = """
             UPDATE Coach SET Internal_number = ?, Surname = ?, Name = ?, 
             Experience = ?, Password = ? WHERE Coach_ID = ?
@@ -35,7 +53,7 @@ class CoachRepository(BaseRepository):
         params = (
             coach_data['Internal_number'], coach_data['Surname'], 
             coach_data['Name'], coach_data['Experience'], 
-            coach_data['Password'], coach_id
+            ensure_hashed(coach_data['Password']), coach_id
         )
         return self._execute_non_query(sql, params)
 
@@ -44,6 +62,6 @@ class CoachRepository(BaseRepository):
         sql = "DELETE FROM Coach WHERE Coach_ID = ?"
         return self._execute_non_query(sql, (coach_id,))
 
-    def get_coach_by_id(self, coach_id: int) -> Optional[Dict[str, Any]]:
+    def get_coach_by_id(self, coach_id: int, as_model: bool = False) -> Optional[Union[Dict[str, Any], Coach]]:
         """Получает тренера по ID."""
-        return self.get_by_id("Coach", "Coach_ID", coach_id)
\ No newline at end of file
+        return self.get_by_id("Coach", "Coach_ID", coach_id, as_model=as_model)
\ No newline at end of file
@@ -0,0 +1,151 @@
+# repositories/import_repo.py
+from .base_repo import BaseRepository
+from importers import IMPORT_TABLES, BadRecord, iter_records, validate_record, detect_format
+from utils import ensure_output_directory
+from passwords import hash_passwords, is_password_hash
+from typing import Any, Dict, List, Optional, Tuple
+import sqlite3
+import csv
+import json
+import os
+
+class ImportRepository(BaseRepository):
+
+    def _upsert_sql(self, table_name: str) -> str:
+        """INSERT с обновлением существующей записи по первичному ключу."""
+        spec = IMPORT_TABLES[table_name]
+        columns = [spec['id']] + [field[0] for field in spec['fields']]
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns[1:])
+        return (f"INSERT INTO {table_name} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT({spec['id']}) DO UPDATE SET {updates}")
+
+    def _hash_passwords(self, table_name: str,
+                        chunk: List[Tuple[int, tuple]]) -> Tuple[List[Tuple[int, tuple]], int]:
+        """
+        Хэширует пароли пачки в пуле хэширования (готовые хэши не меняются).
+        Вызывается до открытия транзакции: PBKDF2 занимает ~0.1 с на пароль,
+        и блокировка записи не должна удерживаться на это время.
+        Возвращает пачку и число хэшированных паролей.
+        """
+        fields = IMPORT_TABLES[table_name]['fields']
+        positions = [i + 1 for i, field in enumerate(fields) if field[1] == 'password']
+        count = 0
+        for pos in positions:
+            count += sum(1 for _, params in chunk if not is_password_hash(params[pos]))
+            hashed = hash_passwords(params[pos] for _, params in chunk)
+            chunk = [(line_no, params[:pos] + (value,) + params[pos + 1:])
+                     for (line_no, params), value in zip(chunk, hashed)]
+        return chunk, count
+
+    def _mask_passwords(self, table_name: str, data: Any) -> Any:
+        """Скрывает пароли отклоненной записи: файл ошибок не должен их содержать."""
+        if not isinstance(data, dict):
+            return data
+        masked = dict(data)
+        for column, kind, _, _ in IMPORT_TABLES[table_name]['fields']:
+            if kind == 'password' and masked.get(column) not in (None, ""):
+                masked[column] = "***"
+        return masked
+
+    def _load_chunk(self, sql: str, chunk: List[Tuple[int, tuple]]) -> List[Tuple[int, tuple, str]]:
+        """
+        Загружает пачку одним executemany. Если пачка нарушает ограничения БД,
+        она откатывается и загружается построчно, чтобы найти ошибочные строки.
+        """
+        try:
+            with self._transaction() as chunk_cursor:
+                chunk_cursor.executemany(sql, [params for _, params in chunk])
+            return []
+        except sqlite3.IntegrityError:
+            pass
+
+        failed = []
+        for line_no, params in chunk:
+            try:
+                with self._transaction() as row_cursor:
+                    row_cursor.execute(sql, params)
+            except sqlite3.IntegrityError as e:
+                failed.append((line_no, params, str(e)))
+        return failed
+
+    def import_file(self, table_name: str, file_path: str, file_format: Optional[str] = None,
+                    chunk_size: int = 5000, commit_every: int = 50000,
+                    errors_dir: str = "out") -> Dict[str, Any]:
+        """
+        Массово загружает таблицу из файла экспорта с обновлением существующих записей.
+        Строки читаются и проверяются пачками по chunk_size, пароли хэшируются вне
+        транзакции, затем до commit_every строк пишутся через executemany в одной
+        транзакции. Отклоненные строки (и записи, которые не удалось разобрать) сохраняются
+        в <errors_dir>/<table>_import_errors.csv, пароли в нем скрыты.
+
+        Открытый пароль стоит ~0.1 с PBKDF2 (10 000 клиентов — несколько минут).
+        Уже хэшированные пароли (формат pbkdf2_sha256$..., как в выгрузке БД)
+        загружаются без пересчета — так тысячи записей загружаются за секунды.
+        В итогах hashed — число паролей, которые пришлось хэшировать.
+        """
+        if table_name not in IMPORT_TABLES:
+            raise ValueError(f"Импорт таблицы {table_name} не поддерживается")
+        file_format = file_format or detect_format(file_path)
+        sql = self._upsert_sql(table_name)
+        columns = [IMPORT_TABLES[table_name]['id']] + [field[0] for field in IMPORT_TABLES[table_name]['fields']]
+        summary: Dict[str, Any] = {'table': table_name, 'imported': 0, 'rejected': 0, 'hashed': 0,
+                                   'errors_path': None}
+
+        errors_file = None
+        errors_writer = None
+
+        def report(line_no: int, error: str, data: Any):
+            nonlocal errors_file, errors_writer
+            if errors_writer is None:
+                ensure_output_directory(errors_dir)
+                summary['errors_path'] = os.path.join(errors_dir, f"{table_name.lower()}_import_errors.csv")
+                errors_file = open(summary['errors_path'], 'w', newline='', encoding='utf-8')
+                errors_writer = csv.writer(errors_file)
+                errors_writer.writerow(["Row", "Error", "Data"])
+            data = self._mask_passwords(table_name, data)
+            errors_writer.writerow([line_no, error, json.dumps(data, ensure_ascii=False, default=str)])
+            summary['rejected'] += 1
+
+        try:
+            records = enumerate(iter_records(file_path, file_format), 1)
+            exhausted = False
+            while not exhausted:
+                # 1. Чтение, проверка и хэширование до commit_every строк — без блокировки БД
+                chunks: List[List[Tuple[int, tuple]]] = []
+                pending = 0
+                while not exhausted and pending < commit_every:
+                    chunk: List[Tuple[int, tuple]] = []
+                    for line_no, record in records:
+                        if isinstance(record, BadRecord):
+                            report(line_no, record.error, None)
+                            continue
+                        params, error = validate_record(table_name, record)
+                        if error:
+                            report(line_no, error, record)
+                            continue
+                        chunk.append((line_no, params))
+                        if len(chunk) >= chunk_size:
+                            break
+                    else:
+                        exhausted = True
+                    if chunk:
+                        chunk, hashed = self._hash_passwords(table_name, chunk)
+                        chunks.append(chunk)
+                        summary['hashed'] += hashed
+                        pending += len(chunk)
+
+                # 2. Запись: одна транзакция на commit_every строк
+                failed = []
+                with self._transaction():
+                    for chunk in chunks:
+                        failed.extend(self._load_chunk(sql, chunk))
+                summary['imported'] += pending - len(failed)
+                for line_no, params, error in failed:
+                    report(line_no, error, dict(zip(columns, params)))
+        finally:
+            if errors_file:
+                errors_file.close()
+            # Часть пачек могла быть зафиксирована и до ошибки
+            self._invalidate(table_name)
+        return summary
@@ -1,29 +1,61 @@
 # repositories/inventory_repo.py
 from .base_repo import BaseRepository
-from typing import Dict, Any, Optional
+from availability import peak_concurrency
+from utils import parse_datetime, format_timestamp
+from models import Inventory, Status
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
 
 class InventoryRepository(BaseRepository):
+
+    # Статусы, при которых единица инвентаря занята: "Забронировано", "В использовании"
+    ACTIVE_STATUS_IDS = (1, 2)
+
+    # Активные бронирования инвентаря, пересекающиеся с окном [начало, конец)
+    OVERLAP_SQL = """
+        SELECT BI.Inventory_ID, B.Start_ts, B.End_ts
+        FROM Booking B
+        JOIN Booking_inventory BI ON BI.Booking_ID = B.Booking_ID
+        WHERE B.End_ts > ? AND B.Start_ts < ?
+          AND BI.Status_ID IN (1, 2)
+    """
+
+    def _parse_window(self, time_start: str, time_end: str) -> Tuple[int, int]:
+        """Переводит границы окна в метки времени."""
+        start_ts, end_ts = parse_datetime(time_start), parse_datetime(time_end)
+        if start_ts is None or end_ts is None:
+            raise ValueError("время должно быть в формате YYYY-MM-DD HH:MM[:SS]")
+        return start_ts, end_ts
     
     def add_inventory(self, inventory_data: Dict[str, Any]) -> bool:
         """Добавляет новый инвентарь."""
-        sql = "INSERT INTO Inventory (Name, Count) VALUES (?, ?)"
-        params = (inventory_data['Name'], inventory_data['Count'])
+        sql = "INSERT INTO Inventory (Name, Count, Comment) VALUES (?, ?, ?)"
+        params = (inventory_data['Name'], inventory_data['Count'], inventory_data.get('Comment'))
         return self._execute_non_query(sql, params)
 
+    def get_inventory_page(self, after: Optional[tuple] = None, limit: int = 20,
+                           filters: Optional[Dict[str, Any]] = None, order_by: Optional[str] = None,
+                           descending: bool = False,
+                           columns: Optional[List[str]] = None,
+                           as_model: bool = False) -> Tuple[List[Union[Dict[str, Any], Inventory]], Optional[tuple]]:
+        """Страница инвентаря."""
+        return self.get_page("Inventory", "Inventory_ID", columns=columns or ["Inventory_ID", "Name", "Count"],
+                             filters=filters, order_by=order_by, descending=descending,
+                             after=after, limit=limit, as_model=as_model)
+
     def add_status(self, status_data: Dict[str, Any]) -> bool:
         """Добавляет новый статус."""
         sql = "INSERT INTO Status (Name) VALUES (?)"
         params = (status_data['Name'],)
         return self._execute_non_query(sql, params)
 
-    def get_all_statuses(self):
+    def get_all_statuses(self, as_model: bool = False) -> List[Union[Dict[str, Any], Status]]:
         """Возвращает все статусы."""
-        return self.get_all("Status")
+        return self.get_all("Status", as_model=as_model)
     
     def update_inventory(self, inventory_id: int, inventory_data: Dict[str, Any]) -> bool:
         """Обновляет данные инвентаря."""
-        sql = "UPDATE Inventory SET Name = ?, Count = ? WHERE Inventory_ID = ?"
-        params = (inventory_data['Name'], inventory_data['Count'], inventory_id)
+        sql = "UPDATE Inventory SET Name = ?, Count = ?, Comment = ? WHERE Inventory_ID = ?"
+        params = (inventory_data['Name'], inventory_data['Count'], inventory_data.get('Comment'), inventory_id)
         return self._execute_non_query(sql, params)
 
     def delete_inventory(self, inventory_id: int) -> bool:
@@ -31,9 +63,10 @@ class InventoryRepository(BaseRepository):
         sql = "DELETE FROM Inventory WHERE Inventory_ID = ?"
         return self._execute_non_query(sql, (inventory_id,))
 
-    def get_inventory_by_id(self, inventory_id: int) -> Optional[Dict[str, Any]]:
+    def get_inventory_by_id(self, inventory_id: int,
+                            as_model: bool = False) -> Optional[Union[Dict[str, Any], Inventory]]:
         """Получает инвентарь по ID."""
-        return self.get_by_id("Inventory", "Inventory_ID", inventory_id)
+        return self.get_by_id("Inventory", "Inventory_ID", inventory_id, as_model=as_model)
 
     def update_status(self, status_id: int, status_data: Dict[str, Any]) -> bool:
         """Обновляет статус."""
@@ -44,4 +77,78 @@ class InventoryRepository(BaseRepository):
     def delete_status(self, status_id: int) -> bool:
         """Удаляет статус по ID."""
         sql = "DELETE FROM Status WHERE Status_ID = ?"
-        return self._execute_non_query(sql, (status_id,))
\ No newline at end of file
+        return self._execute_non_query(sql, (status_id,))
+
+    def get_availability(self, inventory_ids: Sequence[int], time_start: str,
+                         time_end: str) -> Dict[int, Dict[str, Any]]:
+        """
+        Для каждого предмета возвращает общее количество, пик одновременного
+        использования в окне [time_start, time_end) и число свободных единиц.
+        """
+        ids = sorted(set(inventory_ids))
+        if not ids:
+            return {}
+        start_ts, end_ts = self._parse_window(time_start, time_end)
+        placeholders = ", ".join("?" * len(ids))
+        items = self._execute_query(
+            f"SELECT Inventory_ID, Name, Count FROM Inventory WHERE Inventory_ID IN ({placeholders})",
+            tuple(ids), tables=('Inventory',))
+        rows = self._execute_query(
+            self.OVERLAP_SQL + f" AND BI.Inventory_ID IN ({placeholders})",
+            (start_ts, end_ts, *ids))
+
+        intervals: Dict[int, List[Tuple[int, int]]] = {}
+        for row in rows:
+            intervals.setdefault(row['Inventory_ID'], []).append((row['Start_ts'], row['End_ts']))
+
+        availability = {}
+        for item in items:
+            peak, peak_at = peak_concurrency(intervals.get(item['Inventory_ID'], []), start_ts, end_ts)
+            availability[item['Inventory_ID']] = {
+                'Inventory_ID': item['Inventory_ID'], 'Name': item['Name'], 'Count': item['Count'],
+                'Peak': peak, 'Peak_at': format_timestamp(peak_at) if peak_at is not None else None,
+                'Free': max(item['Count'] - peak, 0),
+            }
+        return availability
+
+    def get_free_count(self, inventory_id: int, time_start: str, time_end: str) -> Optional[int]:
+        """Сколько единиц предмета свободно на всем интервале [time_start, time_end)."""
+        item = self.get_availability([inventory_id], time_start, time_end).get(inventory_id)
+        return item['Free'] if item else None
+
+    def find_shortages(self, inventory_ids: Sequence[int], time_start: str,
+                       time_end: str) -> List[Dict[str, Any]]:
+        """
+        Проверка перед бронированием: возвращает предметы, которых не хватит
+        (неизвестные ID тоже попадают в список, с Count = 0).
+        """
+        availability = self.get_availability(inventory_ids, time_start, time_end)
+        shortages = []
+        for inventory_id in sorted(set(inventory_ids)):
+            item = availability.get(inventory_id)
+            if item is None:
+                shortages.append({'Inventory_ID': inventory_id, 'Name': None, 'Count': 0, 'Free': 0})
+            elif item['Free'] < 1:
+                shortages.append(item)
+        return shortages
+
+    def get_peak_usage(self, time_start: Optional[str] = None,
+                       time_end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Пиковое одновременное использование каждого предмета в окне (по умолчанию — за все время)."""
+        start_ts, end_ts = (self._parse_window(time_start, time_end)
+                            if time_start and time_end else (-2 ** 62, 2 ** 62))
+        rows = self._execute_query(self.OVERLAP_SQL + " ORDER BY BI.Inventory_ID", (start_ts, end_ts))
+        intervals: Dict[int, List[Tuple[int, int]]] = {}
+        for row in rows:
+            intervals.setdefault(row['Inventory_ID'], []).append((row['Start_ts'], row['End_ts']))
+
+        report = []
+        for item in self._execute_query("SELECT Inventory_ID, Name, Count FROM Inventory ORDER BY Inventory_ID",
+                                       tables=('Inventory',)):
+            peak, peak_at = peak_concurrency(intervals.get(item['Inventory_ID'], []), start_ts, end_ts)
+            report.append({
+                'Inventory_ID': item['Inventory_ID'], 'Name': item['Name'], 'Count': item['Count'],
+                'Peak': peak, 'Peak_at': format_timestamp(peak_at) if peak_at is not None else None,
+                'Utilization': peak / item['Count'] if item['Count'] else 0.0,
+            })
+        return report
@@ -0,0 +1,70 @@
+# repositories/stats_repo.py
+from .base_repo import BaseRepository
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+class StatsRepository(BaseRepository):
+    """Отчеты по дневным агрегатам (таблицы Stats_*), без чтения истории бронирований."""
+
+    def _window(self, days: int, end_day: Optional[str] = None) -> tuple:
+        """Границы окна из days дней, заканчивающегося end_day (по умолчанию — сегодня)."""
+        if days < 1:
+            raise ValueError("Число дней должно быть положительным")
+        last = date.fromisoformat(end_day) if end_day else date.today()
+        first = last - timedelta(days=days - 1)
+        return first.isoformat(), last.isoformat()
+
+    def get_item_usage(self, days: int, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Число бронирований каждого предмета за окно, по убыванию."""
+        first, last = self._window(days, end_day)
+        sql = """
+            SELECT S.Inventory_ID, I.Name, I.Count, sum(S.Bookings) AS Bookings,
+                   count(CASE WHEN S.Bookings > 0 THEN 1 END) AS Active_days
+            FROM Stats_item_daily S
+            LEFT JOIN Inventory I ON I.Inventory_ID = S.Inventory_ID
+            WHERE S.Day BETWEEN ? AND ?
+            GROUP BY S.Inventory_ID
+            HAVING sum(S.Bookings) > 0
+            ORDER BY Bookings DESC
+        """
+        return [dict(row) for row in self._execute_query(sql, (first, last), tables=('Stats_item_daily', 'Inventory'))]
+
+    def get_coach_load(self, days: int, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Число бронирований каждого тренера за окно, по убыванию."""
+        first, last = self._window(days, end_day)
+        sql = """
+            SELECT S.Coach_ID, C.Surname, C.Name, sum(S.Bookings) AS Bookings
+            FROM Stats_coach_daily S
+            LEFT JOIN Coach C ON C.Coach_ID = S.Coach_ID
+            WHERE S.Day BETWEEN ? AND ?
+            GROUP BY S.Coach_ID
+            HAVING sum(S.Bookings) > 0
+            ORDER BY Bookings DESC
+        """
+        return [dict(row) for row in self._execute_query(sql, (first, last), tables=('Stats_coach_daily', 'Coach'))]
+
+    def get_status_transitions(self, days: int, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Смены статусов инвентаря за окно."""
+        first, last = self._window(days, end_day)
+        sql = """
+            SELECT S.From_status_ID, F.Name AS From_status, S.To_status_ID, T.Name AS To_status,
+                   sum(S.Transitions) AS Transitions
+            FROM Stats_status_daily S
+            LEFT JOIN Status F ON F.Status_ID = S.From_status_ID
+            LEFT JOIN Status T ON T.Status_ID = S.To_status_ID
+            WHERE S.Day BETWEEN ? AND ?
+            GROUP BY S.From_status_ID, S.To_status_ID
+            ORDER BY Transitions DESC
+        """
+        return [dict(row) for row in self._execute_query(sql, (first, last), tables=('Stats_status_daily', 'Status'))]
+
+    def get_usage_report(self, days: int, end_day: Optional[str] = None) -> Dict[str, Any]:
+        """Сводный отчет за days дней."""
+        first, last = self._window(days, end_day)
+        return {
+            'From': first,
+            'To': last,
+            'Items': self.get_item_usage(days, end_day),
+            'Coaches': self.get_coach_load(days, end_day),
+            'Transitions': self.get_status_transitions(days, end_day),
+        }
@@ -1,53 +1,84 @@
 # repositories/user_repo.py
 from .base_repo import BaseRepository
-from typing import List, Dict, Any, Optional
+from passwords import ensure_hashed, verify_password, PASSWORD_MASK
+from models import Model, User
+from dataclasses import replace
+from typing import List, Dict, Any, Optional, Tuple, Union
 
 class UserRepository(BaseRepository):
     
+    # Вход по числовому логину: внутренний номер тренера или ID пользователя,
+    # оба кандидата одним запросом по уникальным индексам (тренер проверяется первым)
+    CREDENTIALS_SQL = """
+        SELECT 'Coach' AS Kind, Coach_ID AS ID, Password FROM Coach WHERE Internal_number = ?
+        UNION ALL
+        SELECT 'User' AS Kind, User_ID AS ID, Password FROM User WHERE User_ID = ?
+    """
+
+    # Нечисловой логин — системный администратор
+    ADMIN_CREDENTIALS_SQL = """
+        SELECT 'Coach' AS Kind, Coach_ID AS ID, Password FROM Coach
+        WHERE Name = 'Администратор' AND Surname = 'Системный'
+    """
+
+    def find_credentials(self, login: str) -> List[Dict[str, Any]]:
+        """Возвращает кандидатов для входа (Kind, ID, Password) в порядке проверки."""
+        login = login.strip()
+        if login.isdigit():
+            rows = self._execute_query(self.CREDENTIALS_SQL, (int(login), int(login)))
+        else:
+            rows = self._execute_query(self.ADMIN_CREDENTIALS_SQL)
+        return [dict(row) for row in rows]
+
+    def set_password_hash(self, kind: str, subject_id: int, password_hash: str) -> bool:
+        """Сохраняет новый хэш пароля тренера (kind='Coach') или пользователя (kind='User')."""
+        table, id_col = ('Coach', 'Coach_ID') if kind == 'Coach' else ('User', 'User_ID')
+        sql = f"UPDATE {table} SET Password = ? WHERE {id_col} = ?"
+        return self._execute_non_query(sql, (password_hash, subject_id))
+
     def authenticate(self, login: str, password: str) -> Optional[str]:
         """
         Проверяет учетные данные пользователя/тренера и возвращает его роль.
+        Сессии и пул проверки хэшей — в auth.AuthService.
         """
-        # 1. Проверяем в таблице Coach (Админ/Тренер)
-        sql_coach = "SELECT Coach_ID, Password FROM Coach WHERE Internal_number = ? OR Coach_ID = ?"
-        params = (login, login)
-        
-        if login.isdigit():
-            sql= "SELECT Coach_ID, Password FROM Coach WHERE Internal_number = ?"
-            result = self._execute_query(sql, (int(login),))
-        else: # Проверка админа по специальному логину 'admin'
-            sql = "SELECT Coach_ID, Password FROM Coach WHERE Name = 'Администратор' AND Surname = 'Системный'"
-            result = self._execute_query(sql)
-            
-        if result and dict(result[0])['Password'] == password:
-                return 'Admin' if dict(result[0])['Coach_ID'] == 1 else 'Coach'
-
-        # 2. Проверяем в таблице User (Пользователь)
-        if login.isdigit():
-            sql = "SELECT Password FROM User WHERE User_ID = ?"
-            result = self._execute_query(sql, (int(login),))
-            if result and dict(result[0])['Password'] == password:
-                return 'User'
-
+        for candidate in self.find_credentials(login):
+            if verify_password(password, candidate['Password']):
+                if candidate['Kind'] == 'User':
+                    return 'User'
+                return 'Admin' if candidate['ID'] == 1 else 'Coach'
         return None
 
     def add_user(self, user_data: Dict[str, Any]) -> bool:
-        """Добавляет нового пользователя."""
+        """
+        Добавляет нового пользователя. Пароль можно передать уже хэшированным
+        (with_hashed_password), чтобы не хэшировать его внутри транзакции.
+        """
         sql = "INSERT INTO User (Surname, Name, Password) VALUES (?, ?, ?)"
-        params = (user_data['Surname'], user_data['Name'], user_data['Password'])
+        params = (user_data['Surname'], user_data['Name'], ensure_hashed(user_data['Password']))
         return self._execute_non_query(sql, params)
 
-    def display_all_users_details(self) -> List[Dict[str, Any]]:
+    def display_all_users_details(self, as_model: bool = False) -> List[Union[Dict[str, Any], User]]:
         """Возвращает все детали пользователей, маскируя пароль."""
+        if as_model:
+            return [replace(user, password=PASSWORD_MASK) for user in self.get_all("User", as_model=True)]
         users = self.get_all("User")
         for user in users:
-            user['Password'] = '*' * len(user['Password'])
+            user['Password'] = PASSWORD_MASK
         return users
     
+    def get_users_page(self, after: Optional[tuple] = None, limit: int = 20,
+                       filters: Optional[Dict[str, Any]] = None, order_by: Optional[str] = None,
+                       descending: bool = False,
+                       as_model: bool = False) -> Tuple[List[Union[Dict[str, Any], User]], Optional[tuple]]:
+        """Страница пользователей без паролей."""
+        return self.get_page("User", "User_ID", columns=["User_ID", "Surname", "Name"],
+                             filters=filters, order_by=order_by, descending=descending,
+                             after=after, limit=limit, as_model=as_model)
+
     def update_user(self, user_id: int, user_data: Dict[str, Any]) -> bool:
-        """Обновляет данные пользователя."""
+        """Обновляет данные пользователя (пароль — открытый или уже хэшированный)."""
         sql = "UPDATE User SET Surname = ?, Name = ?, Password = ? WHERE User_ID = ?"
-        params = (user_data['Surname'], user_data['Name'], user_data['Password'], user_id)
+        params = (user_data['Surname'], user_data['Name'], ensure_hashed(user_data['Password']), user_id)
         return self._execute_non_query(sql, params)
 
     def delete_user(self, user_id: int) -> bool:
@@ -55,6 +86,6 @@ class UserRepository(BaseRepository):
         sql = "DELETE FROM User WHERE User_ID = ?"
         return self._execute_non_query(sql, (user_id,))
 
-    def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+    def get_user_by_id(self, user_id: int, as_model: bool = False) -> Optional[Union[Dict[str, Any], User]]:
         """Получает пользователя по ID."""
-        return self.get_by_id("User", "User_ID", user_id)
+        return self.get_by_id("User", "User_ID", user_id, as_model=as_model)
@@ -0,0 +1,479 @@
+# seed.py
+# Генератор тестовых данных заданного масштаба. Данные детерминированы: при одном
+# seed получается одна и та же БД. Бронирования распределены по дням недели,
+# сезонам и часам пик, у тренеров и клиентов нет пересечений по времени, а
+# инвентарь выбирается с учетом популярности.
+#
+# Загрузка идет пачками executemany в крупных транзакциях; на время массовой
+# загрузки вторичные индексы и триггеры (статистика, журнал изменений) удаляются
+# и создаются заново в конце — это быстрее, чем поддерживать их на каждой вставке.
+# Если загрузка прервалась, уже записанные строки удаляются: БД остается пустой.
+#
+#   python seed.py --db load.db --preset large
+#   python seed.py --db load.db --preset medium --users 2000000 --seed 7
+import argparse
+import calendar
+import os
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from db_config import create_tables, get_connection
+from migrations import (create_change_triggers, create_indexes, create_stats_triggers, drop_change_triggers,
+                        drop_indexes, drop_stats_triggers, rebuild_usage_stats)
+from passwords import hash_password, hash_passwords
+
+# Учетные записи для входа из подсказок на экране входа: создаются при любом масштабе
+DEMO_COACHES = [
+    # (внутренний номер, фамилия, имя, опыт, пароль); номер 1 — администратор системы
+    (1, 'Adminov', 'Admin', 5, 'admin_pass'),
+    (101, 'Sidorova', 'Elena', 5, 'pass101'),
+    (102, 'Ivanov', 'Petr', 3, 'pass102'),
+]
+DEMO_USERS = [
+    ('Klimov', 'Alexey', 'userpass1'),
+    ('Smirnova', 'Maria', 'userpass2'),
+    ('Vorobyov', 'Ilya', 'userpass3'),
+]
+
+STATUSES = [(1, 'Забронировано'), (2, 'В использовании'), (3, 'Доступно'), (4, 'Возвращено')]
+
+# Бронирования исходного набора тестовых данных (insert_sample_data): (Coach_ID, User_ID,
+# начало, окончание, номер, [(Inventory_ID, Status_ID)]); None — текущее время загрузки
+DEMO_BOOKINGS = [
+    (2, 1, None, "2025-12-31 15:00:00", 1001, [(1, 2)]),
+    (3, 2, None, "2025-12-31 15:00:00", 1002, [(3, 1)]),
+]
+
+# Каталог инвентаря: (название, количество, комментарий); чем раньше предмет, тем он популярнее.
+# Если предметов нужно больше, добавляются экземпляры с номером ("Фитбол №2").
+INVENTORY_CATALOG = [
+    ('Штанга 20кг', 5, "Смотри чтоб не придавило"),
+    ('Гантели 5кг', 10, "Кто их приклеил?"),
+    ('Коврик для йоги', 20, "Для любимых поз"),
+    ('Скакалка', 25, None),
+    ('Фитбол', 12, None),
+    ('Резиновая петля', 20, None),
+    ('Гиря 16кг', 8, None),
+    ('Гантели 10кг', 6, None),
+    ('Степ-платформа', 10, None),
+    ('Медбол 5кг', 8, None),
+    ('Ролл для МФР', 10, None),
+    ('Эспандер', 15, None),
+    ('Боксерские перчатки', 10, None),
+    ('Лапы боксерские', 6, None),
+    ('Петли TRX', 6, None),
+    ('Гиря 24кг', 4, None),
+    ('Блин 10кг', 12, None),
+    ('Ролик для пресса', 10, None),
+    ('Балансировочная подушка', 6, None),
+    ('Утяжелители 1кг', 10, None),
+]
+
+# Пресеты масштаба: число сгенерированных тренеров, клиентов, предметов и бронирований
+# (демо-учетные записи добавляются сверх них). 'demo' совпадает с исходным набором
+# тестовых данных: три предмета каталога и DEMO_BOOKINGS без сгенерированных бронирований
+PRESETS: Dict[str, Dict[str, int]] = {
+    'demo': {'coaches': 0, 'users': 0, 'items': 3, 'bookings': 0},
+    'small': {'coaches': 20, 'users': 500, 'items': 30, 'bookings': 5000},
+    'medium': {'coaches': 200, 'users': 50000, 'items': 40, 'bookings': 200000},
+    'large': {'coaches': 2000, 'users': 1000000, 'items': 60, 'bookings': 1000000},
+}
+
+# Внутренний номер первого сгенерированного тренера (демо-номера — меньше)
+FIRST_GENERATED_COACH = 1000
+
+# Пароль сгенерированных учетных записей. PBKDF2 на каждую строку занял бы часы,
+# поэтому хэш вычисляется один раз и общий для всех сгенерированных записей
+DEFAULT_PASSWORD = 'seed_pass'
+
+# Строк в одном executemany и строк в одной транзакции загрузки
+CHUNK_ROWS = 50000
+TRANSACTION_ROWS = 1000000
+# С этого числа строк (тренеры + клиенты + бронирования) загрузка массовая: индексы
+# и триггеры удаляются и строятся заново после нее. Меньшие наборы, включая 'demo',
+# пишутся как обычные вставки — со статистикой и журналом изменений через триггеры
+BULK_ROWS = 50000
+
+# Часы начала занятий (7:00–21:00) и их веса: утренний и вечерний пик
+HOURS = list(range(7, 22))
+HOUR_WEIGHTS = [6, 8, 7, 4, 3, 3, 4, 4, 3, 4, 6, 9, 10, 8, 4]
+# Веса дней недели (пн..вс) и месяцев (январь — пик, лето — спад)
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 0.9, 0.8, 0.5]
+MONTH_WEIGHTS = [1.3, 1.15, 1.1, 1.0, 0.95, 0.75, 0.7, 0.75, 1.15, 1.1, 1.05, 0.9]
+# Число предметов инвентаря в бронировании: 0..3
+ITEMS_PER_BOOKING_WEIGHTS = [25, 45, 20, 10]
+# Доля двухчасовых занятий
+LONG_SESSION_SHARE = 0.3
+
+MALE_NAMES = ['Алексей', 'Андрей', 'Артем', 'Дмитрий', 'Евгений', 'Иван', 'Илья', 'Кирилл', 'Максим',
+              'Михаил', 'Никита', 'Павел', 'Петр', 'Роман', 'Сергей', 'Тимур', 'Федор', 'Ярослав']
+FEMALE_NAMES = ['Алина', 'Анна', 'Валерия', 'Дарья', 'Екатерина', 'Елена', 'Ирина', 'Ксения', 'Мария',
+                'Наталья', 'Ольга', 'Полина', 'Светлана', 'Софья', 'Татьяна', 'Юлия']
+# Мужские формы фамилий; женская форма — с окончанием "а"
+SURNAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов',
+            'Новиков', 'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров',
+            'Павлов', 'Козлов', 'Степанов', 'Николаев', 'Орлов', 'Андреев', 'Макаров', 'Никитин',
+            'Захаров', 'Зайцев', 'Соловьев', 'Борисов', 'Яковлев', 'Григорьев', 'Романов', 'Воробьев',
+            'Климов', 'Сидоров', 'Белов', 'Комаров', 'Киселев', 'Медведев', 'Тарасов', 'Беляев']
+
+
+def _person(rng: random.Random) -> Tuple[str, str]:
+    """Случайные фамилия и имя (женские формы — примерно для половины записей)."""
+    surname = rng.choice(SURNAMES)
+    if rng.random() < 0.5:
+        return surname + 'а', rng.choice(FEMALE_NAMES)
+    return surname, rng.choice(MALE_NAMES)
+
+
+# 1. ГЕНЕРАЦИЯ СТРОК
+
+def _day_counts(total: int, first_day: date, days: int) -> List[int]:
+    """
+    Раскладывает total бронирований по дням пропорционально весам дня недели и
+    месяца с небольшим ростом к концу периода. Сумма всегда равна total.
+    """
+    weights = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        growth = 1.0 + 0.3 * offset / max(days - 1, 1)
+        weights.append(WEEKDAY_WEIGHTS[day.weekday()] * MONTH_WEIGHTS[day.month - 1] * growth)
+    scale = total / sum(weights)
+    counts, carry = [], 0.0
+    for weight in weights:
+        carry += weight * scale
+        count = int(carry)
+        carry -= count
+        counts.append(count)
+    counts[-1] += total - sum(counts)
+    return counts
+
+
+def _status(start_ts: int, end_ts: int, now_ts: int, rng: random.Random) -> int:
+    """Статус инвентаря по времени занятия относительно "текущего" момента генерации."""
+    if start_ts > now_ts:
+        return 1
+    if end_ts > now_ts:
+        return 2
+    return 4 if rng.random() < 0.9 else 3
+
+
+def iter_bookings(rng: random.Random, total: int, coach_ids: Tuple[int, int], user_count: int,
+                  items: int, first_day: date, days: int, now_ts: int,
+                  first_id: int = 1) -> Iterator[Tuple[tuple, List[tuple]]]:
+    """
+    Генерирует (строка Booking, строки Booking_inventory) в хронологическом порядке,
+    Booking_ID — с first_id.
+    Занятие длится 1 или 2 часа; тренер и клиент не заняты дважды в один час.
+    Тренер — из диапазона coach_ids, клиент — с перекосом к первым ID (постоянные клиенты).
+    """
+    first_coach, last_coach = coach_ids
+    coach_span = last_coach - first_coach + 1
+    check_density(total, coach_span, user_count, first_day, days)
+    hour_cum = []
+    for weight in HOUR_WEIGHTS:
+        hour_cum.append((hour_cum[-1] if hour_cum else 0) + weight)
+    item_cum = []
+    for i in range(items):
+        item_cum.append((item_cum[-1] if item_cum else 0.0) + 1.0 / (i + 1) ** 0.8)
+    item_ids = list(range(1, items + 1))
+    link_counts = list(range(len(ITEMS_PER_BOOKING_WEIGHTS)))
+    choices, rand = rng.choices, rng.random
+
+    booking_id = first_id - 1
+    for offset, count in enumerate(_day_counts(total, first_day, days)):
+        day = first_day + timedelta(days=offset)
+        day_text = day.isoformat()
+        day_ts = calendar.timegm(day.timetuple())
+        busy_coaches, busy_users = set(), set()
+        for _ in range(count):
+            while True:
+                hour = choices(HOURS, cum_weights=hour_cum)[0]
+                length = 2 if hour < HOURS[-1] and rand() < LONG_SESSION_SHARE else 1
+                coach = first_coach + int(coach_span * rand() ** 1.3)
+                user = 1 + int(user_count * rand() ** 1.5)
+                slots = [(hour + i) for i in range(length)]
+                if any((coach, h) in busy_coaches for h in slots) or any((user, h) in busy_users for h in slots):
+                    continue
+                busy_coaches.update((coach, h) for h in slots)
+                busy_users.update((user, h) for h in slots)
+                break
+            booking_id += 1
+            start_ts = day_ts + hour * 3600
+            end_ts = start_ts + length * 3600
+            booking = (booking_id, coach, user, f"{day_text} {hour:02d}:00:00",
+                       f"{day_text} {hour + length:02d}:00:00", 1000 + booking_id, start_ts, end_ts)
+            link_count = min(choices(link_counts, weights=ITEMS_PER_BOOKING_WEIGHTS)[0], items)
+            linked = set()
+            while len(linked) < link_count:
+                linked.add(choices(item_ids, cum_weights=item_cum)[0])
+            links = [(booking_id, item_id, _status(start_ts, end_ts, now_ts, rng)) for item_id in sorted(linked)]
+            yield booking, links
+
+
+def _inventory_rows(items: int) -> List[tuple]:
+    rows = []
+    for i in range(items):
+        name, count, comment = INVENTORY_CATALOG[i % len(INVENTORY_CATALOG)]
+        copy = i // len(INVENTORY_CATALOG)
+        rows.append((f"{name} №{copy + 1}" if copy else name, count, comment))
+    return rows
+
+
+# 2. ЗАГРУЗКА
+
+class _Loader:
+    """Пишет строки пачками executemany и фиксирует транзакцию каждые TRANSACTION_ROWS строк."""
+
+    def __init__(self, conn, chunk_rows: int = CHUNK_ROWS, transaction_rows: int = TRANSACTION_ROWS):
+        self._conn = conn
+        self._chunk_rows = chunk_rows
+        self._transaction_rows = transaction_rows
+        self._uncommitted = 0
+
+    def insert(self, sql: str, rows) -> int:
+        chunk, total = [], 0
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self._chunk_rows:
+                total += self._flush(sql, chunk)
+                chunk = []
+        if chunk:
+            total += self._flush(sql, chunk)
+        return total
+
+    def _flush(self, sql: str, chunk: List[tuple]) -> int:
+        self._conn.executemany(sql, chunk)
+        self._uncommitted += len(chunk)
+        if self._uncommitted >= self._transaction_rows:
+            self.commit()
+        return len(chunk)
+
+    def commit(self):
+        self._conn.commit()
+        self._uncommitted = 0
+
+
+def check_density(bookings: int, coaches: int, users: int, first_day: date, days: int):
+    """
+    ValueError, если в самый загруженный день бронирований больше половины
+    свободных часов тренеров или клиентов (иначе подбор времени без пересечений
+    почти не находит свободных слотов). Проверяется до загрузки.
+    """
+    if not bookings:
+        return
+    busiest = max(_day_counts(bookings, first_day, days))
+    if coaches < 1 or busiest > min(coaches, users) * len(HOURS) // 2:
+        raise ValueError(f"Слишком плотное расписание: {busiest} занятий в день на {coaches} тренеров "
+                         f"и {users} клиентов. Увеличьте их число или число дней.")
+
+
+def _demo_booking_rows() -> Tuple[List[tuple], List[tuple]]:
+    """Строки Booking и Booking_inventory для DEMO_BOOKINGS (ID с 1)."""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    bookings, links = [], []
+    for booking_id, (coach_id, user_id, start, end, number, items) in enumerate(DEMO_BOOKINGS, 1):
+        start = start or now
+        # Метки времени считаются так же, как при миграции 5 (время без зоны — UTC)
+        start_ts, end_ts = (calendar.timegm(datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timetuple())
+                            for value in (start, end))
+        bookings.append((booking_id, coach_id, user_id, start, end, number, start_ts, end_ts))
+        links.extend((booking_id, inventory_id, status_id) for inventory_id, status_id in items)
+    return bookings, links
+
+
+# Таблицы, которые заполняет загрузка (вместе с триггерами), в порядке очистки
+SEEDED_TABLES = ['Booking_inventory', 'Booking', 'Inventory', 'User', 'Coach', 'Status',
+                 'Stats_item_daily', 'Stats_coach_daily', 'Stats_status_daily', 'Change_log']
+
+
+def _clear_tables(conn):
+    """Удаляет частично загруженные данные и сбрасывает счетчики ID: БД снова пуста."""
+    for table in SEEDED_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute(f"DELETE FROM sqlite_sequence WHERE name IN ({', '.join('?' * len(SEEDED_TABLES))})",
+                 SEEDED_TABLES)
+    conn.commit()
+
+
+def _is_empty(conn) -> bool:
+    return not any(conn.execute(f"SELECT EXISTS (SELECT 1 FROM {table})").fetchone()[0]
+                   for table in ('Coach', 'User', 'Inventory', 'Booking'))
+
+
+def seed_database(db_name: str = "coaching.db", coaches: int = 0, users: int = 0, items: int = 10,
+                  bookings: int = 40, seed: int = 42, password: str = DEFAULT_PASSWORD,
+                  start_day: date = date(2024, 1, 1), days: int = 730, demo_bookings: bool = False,
+                  progress: Optional[Callable[[str, int], None]] = None) -> Optional[Dict[str, int]]:
+    """
+    Заполняет пустую БД: демо-учетные записи (DEMO_COACHES, DEMO_USERS), статусы,
+    items предметов, coaches тренеров и users клиентов с паролем password и
+    bookings бронирований за days дней с start_day. "Текущий" момент для статусов
+    инвентаря — 18:00 дня на отметке 80% периода: часть занятий идет, часть в будущем.
+    demo_bookings — добавить DEMO_BOOKINGS исходного набора (нужны первые три предмета).
+    Если в БД уже есть данные, ничего не делает и возвращает None; иначе —
+    количество строк по таблицам. При ошибке загруженные строки удаляются
+    (БД остается пустой, индексы и триггеры восстанавливаются), исключение передается дальше.
+    Массовая загрузка (от BULK_ROWS строк) не пишет журнал изменений: первая
+    инкрементальная выгрузка потребителя и так полная.
+    """
+    if demo_bookings and items < 3:
+        raise ValueError("Для демо-бронирований нужны хотя бы 3 предмета инвентаря")
+    check_density(bookings, len(DEMO_COACHES) - 1 + coaches, len(DEMO_USERS) + users, start_day, days)
+    create_tables(db_name)
+    rng = random.Random(seed)
+    now_ts = calendar.timegm(start_day.timetuple()) + int(days * 0.8) * 86400 + 18 * 3600
+    report = progress or (lambda stage, rows: None)
+
+    conn = get_connection(db_name)
+    try:
+        if not _is_empty(conn):
+            return None
+        bulk = coaches + users + bookings >= BULK_ROWS
+        cursor = conn.cursor()
+        if bulk:
+            # Данные согласованы по построению: проверки внешних ключей на каждой строке не нужны.
+            # synchronous = OFF только для этого соединения: при сбое загрузку проще повторить
+            conn.execute("PRAGMA foreign_keys = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("PRAGMA cache_size = -131072")
+            drop_indexes(cursor)
+            drop_stats_triggers(cursor)
+            drop_change_triggers(cursor)
+            conn.commit()
+
+        loader = _Loader(conn)
+        loaded = False
+        try:
+            # 1. Справочники и демо-учетные записи (отдельные хэши — это настоящие пароли для входа)
+            conn.executemany("INSERT OR IGNORE INTO Status (Status_ID, Name) VALUES (?, ?)", STATUSES)
+            demo_hashes = hash_passwords([row[4] for row in DEMO_COACHES] + [row[2] for row in DEMO_USERS])
+            conn.executemany(
+                "INSERT INTO Coach (Internal_number, Surname, Name, Experience, Password) VALUES (?, ?, ?, ?, ?)",
+                [(*row[:4], hashed) for row, hashed in zip(DEMO_COACHES, demo_hashes)])
+            conn.executemany("INSERT INTO User (Surname, Name, Password) VALUES (?, ?, ?)",
+                             [(*row[:2], hashed) for row, hashed in zip(DEMO_USERS, demo_hashes[len(DEMO_COACHES):])])
+            loader.insert("INSERT INTO Inventory (Name, Count, Comment) VALUES (?, ?, ?)", _inventory_rows(items))
+
+            # 2. Тренеры и клиенты
+            password_hash = hash_password(password)
+            loader.insert(
+                "INSERT INTO Coach (Internal_number, Surname, Name, Experience, Password) VALUES (?, ?, ?, ?, ?)",
+                ((FIRST_GENERATED_COACH + i, *_person(rng), int(25 * rng.random() ** 2), password_hash) for i in range(coaches)))
+            report('Coach', coaches)
+            loader.insert("INSERT INTO User (Surname, Name, Password) VALUES (?, ?, ?)",
+                          ((*_person(rng), password_hash) for _ in range(users)))
+            report('User', users)
+
+            # 3. Бронирования: ведет их любой тренер, кроме администратора (Coach_ID 1)
+            link_sql = "INSERT INTO Booking_inventory (Booking_ID, Inventory_ID, Status_ID) VALUES (?, ?, ?)"
+            booking_sql = ("INSERT INTO Booking (Booking_ID, Coach_ID, User_ID, Time_start, Time_end, "
+                           "Number_booking, Start_ts, End_ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+            first_id = 1
+            if demo_bookings:
+                demo_rows, demo_links = _demo_booking_rows()
+                loader.insert(booking_sql, demo_rows)
+                loader.insert(link_sql, demo_links)
+                first_id += len(demo_rows)
+            link_buffer: List[tuple] = []
+
+            def booking_rows():
+                for booking, links in iter_bookings(rng, bookings, (2, len(DEMO_COACHES) + coaches),
+                                                    len(DEMO_USERS) + users, items, start_day, days, now_ts,
+                                                    first_id):
+                    link_buffer.extend(links)
+                    yield booking
+
+            rows = booking_rows()
+            while True:
+                chunk = [row for _, row in zip(range(CHUNK_ROWS), rows)]
+                if not chunk:
+                    break
+                loader.insert(booking_sql, chunk)
+                loader.insert(link_sql, link_buffer)
+                link_buffer.clear()
+                report('Booking', chunk[-1][0])
+            loader.commit()
+            loaded = True
+        finally:
+            conn.rollback()
+            if not loaded:
+                # Промежуточные фиксации уже сохранены: без очистки осталась бы
+                # частично заполненная БД, которая выглядит готовой
+                _clear_tables(conn)
+            if bulk:
+                # 4. Индексы, агрегаты статистики и триггеры — одним проходом после загрузки
+                cursor.execute("BEGIN")
+                create_indexes(cursor)
+                rebuild_usage_stats(cursor)
+                create_stats_triggers(cursor)
+                create_change_triggers(cursor)
+                conn.commit()
+                report('indexes', 0)
+
+        conn.execute("ANALYZE")
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('Coach', 'User', 'Inventory', 'Status', 'Booking', 'Booking_inventory')}
+    finally:
+        conn.close()
+
+
+# 3. КОМАНДНАЯ СТРОКА
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Заполнение БД детерминированными тестовыми данными")
+    parser.add_argument("--db", default="coaching.db", help="файл БД (должна быть пустой или отсутствовать)")
+    parser.add_argument("--preset", choices=list(PRESETS), default='small', help="масштаб по умолчанию")
+    for name in ('coaches', 'users', 'items', 'bookings'):
+        parser.add_argument(f"--{name}", type=int, help=f"переопределить число ({name}) из пресета")
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="пароль сгенерированных учетных записей")
+    parser.add_argument("--start-day", default="2024-01-01", help="первый день бронирований (ГГГГ-ММ-ДД)")
+    parser.add_argument("--days", type=int, default=730, help="длина периода бронирований в днях")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    sizes = dict(PRESETS[args.preset])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    try:
+        start_day = date.fromisoformat(args.start_day)
+    except ValueError:
+        print("❌ Некорректная дата --start-day (ожидается ГГГГ-ММ-ДД).", file=sys.stderr)
+        return 2
+    if min(sizes.values()) < 0 or sizes['items'] < 1 or args.days < 1:
+        print("❌ Размеры должны быть неотрицательными, предметов и дней — хотя бы по одному.", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+
+    def progress(stage: str, rows: int):
+        print(f"ℹ️ {stage}: {rows} ({time.perf_counter() - started:.1f} с)", file=sys.stderr)
+
+    try:
+        with redirect_stdout(sys.stderr):
+            counts = seed_database(args.db, seed=args.seed, password=args.password, start_day=start_day,
+                                   days=args.days, demo_bookings=args.preset == 'demo', progress=progress,
+                                   **sizes)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    if counts is None:
+        print(f"❌ В БД '{args.db}' уже есть данные: генератор заполняет только пустую БД.", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    size_mb = sum(os.path.getsize(path) for path in (args.db, args.db + '-wal') if os.path.exists(path)) / 1024 / 1024
+    print(f"✅ БД '{args.db}' заполнена за {elapsed:.1f} с ({size_mb:.1f} МБ):")
+    for table, count in counts.items():
+        print(f"   {table:<18} {count:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
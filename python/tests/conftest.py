@@ -0,0 +1,45 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Модули пакета импортируются как верхнеуровневые (как при запуске из python/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_config import close_pool, create_tables
+from query_cache import discard_query_cache
+from query_stats import discard_query_stats
+
+
+@pytest.fixture
+def db_name(tmp_path):
+    """Пустая БД с актуальной схемой; пул и кэши БД освобождаются после теста."""
+    path = str(tmp_path / "test.db")
+    create_tables(path)
+    yield path
+    close_pool(path)
+    discard_query_stats(path)
+    discard_query_cache(path)
+
+
+@pytest.fixture
+def sample_db(db_name):
+    """
+    БД с минимальным набором данных без PBKDF2: три тренера, три пользователя
+    (пароли — готовые хэши-заглушки), статусы и предметы Мяч (1 шт.) и Конус (2 шт.).
+    """
+    import sqlite3
+    from seed import STATUSES
+    conn = sqlite3.connect(db_name)
+    with conn:
+        conn.executemany("INSERT INTO Status (Status_ID, Name) VALUES (?, ?)", STATUSES)
+        conn.executemany("INSERT INTO Coach (Coach_ID, Internal_number, Surname, Name, Experience, Password) "
+                         "VALUES (?, ?, 'Coach', 'Test', 1, 'pbkdf2_sha256$1$salt$hash')",
+                         [(i, 100 + i) for i in (1, 2, 3)])
+        conn.executemany("INSERT INTO User (User_ID, Surname, Name, Password) "
+                         "VALUES (?, 'User', 'Test', 'pbkdf2_sha256$1$salt$hash')", [(i,) for i in (1, 2, 3)])
+        conn.executemany("INSERT INTO Inventory (Inventory_ID, Name, Count) VALUES (?, ?, ?)",
+                         [(1, 'Мяч', 1), (2, 'Конус', 2)])
+    conn.close()
+    return db_name
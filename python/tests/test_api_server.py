@@ -0,0 +1,84 @@
+# tests/test_api_server.py
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import api_server
+from db_config import get_pool
+from repositories.import_repo import ImportRepository
+
+
+@pytest.fixture
+def server(db_name):
+    # БД со схемой, но без данных: тестовые данные вставляет create_server
+    server = api_server.create_server(db_name, port=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _post(base: str, path: str, body: dict, token: str = None) -> dict:
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    request = Request(base + path, json.dumps(body).encode(), headers, method='POST')
+    with urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def _status(base: str, path: str, body: dict = None, token: str = None) -> int:
+    try:
+        if body is None:
+            headers = {'Authorization': f"Bearer {token}"} if token else {}
+            with urlopen(Request(base + path, headers=headers)) as response:
+                return response.status
+        _post(base, path, body, token)
+        return 200
+    except HTTPError as e:
+        return e.code
+
+
+def test_login_and_role_policy(server):
+    assert _status(server, "/api/health") == 200
+    assert _status(server, "/api/login", {'login': '1', 'password': 'wrong_pass'}) == 401
+    assert _status(server, "/api/actions/SHOW_U") == 401
+
+    user = _post(server, "/api/login", {'login': '1', 'password': 'userpass1'})
+    assert user['role'] == 'User'
+    assert _status(server, "/api/actions/ADD_I", {'Name': 'Сетка', 'Count': 1}, user['token']) == 403
+
+    admin = _post(server, "/api/login", {'login': '1', 'password': 'admin_pass'})['token']
+    # Действия записи выполняются только через POST
+    assert _status(server, "/api/actions/ADD_I", token=admin) == 405
+    assert _status(server, "/api/actions/ADD_I", {'Name': 'Сетка'}, admin) == 400
+    assert _post(server, "/api/actions/ADD_I", {'Name': 'Сетка', 'Count': 1}, admin)
+    with urlopen(Request(server + "/api/actions/SHOW_C?Limit=2", headers={'Authorization': f"Bearer {admin}"})) as r:
+        page = json.loads(r.read())
+    assert len(page['rows']) == 2 and page['next'] is not None
+
+    _post(server, "/api/logout", {}, admin)
+    assert _status(server, "/api/actions/SHOW_C", token=admin) == 401
+
+
+def test_import_runs_outside_request_transaction(server, db_name, tmp_path, monkeypatch):
+    depths = []
+    load_chunk = ImportRepository._load_chunk
+
+    def tracked(self, sql, chunk):
+        # Транзакция импорта должна быть внешней: вложенность 1, а не точка сохранения
+        depths.append(get_pool(db_name)._local.tx_depth)
+        return load_chunk(self, sql, chunk)
+
+    monkeypatch.setattr(ImportRepository, '_load_chunk', tracked)
+    source = tmp_path / "users.csv"
+    source.write_text("User_ID,Surname,Name,Password\n100,Test,One,secret1\n", encoding='utf-8')
+
+    token = _post(server, "/api/login", {'login': '1', 'password': 'admin_pass'})['token']
+    result = _post(server, "/api/actions/IMP_FLAT", {'Table': 'User', 'Path': str(source)}, token)
+    assert result['imported'] == 1
+    assert depths == [1]
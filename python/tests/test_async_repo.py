@@ -0,0 +1,48 @@
+# tests/test_async_repo.py
+import asyncio
+
+import pytest
+
+from repositories.async_repo import AsyncBookingRepository, AsyncInventoryRepository
+
+
+def test_transaction_rolls_back_on_error(sample_db):
+    async def scenario():
+        async with AsyncInventoryRepository(sample_db) as repository:
+            with pytest.raises(RuntimeError):
+                async with repository.transaction():
+                    await repository.add_inventory({'Name': 'Сетка', 'Count': 1})
+                    raise RuntimeError("отмена")
+            async with repository.transaction():
+                await repository.add_inventory({'Name': 'Фишка', 'Count': 5})
+            return [item['Name'] for item in await repository.get_all("Inventory")]
+
+    assert asyncio.run(scenario()) == ['Мяч', 'Конус', 'Фишка']
+
+
+def test_clients_run_concurrently_and_iterate(sample_db):
+    async def book(coach_id: int) -> bool:
+        async with AsyncBookingRepository(sample_db) as repository:
+            return await repository.add_booking(
+                {'Coach_ID': coach_id, 'User_ID': coach_id, 'Time_start': "2030-01-01 10:00:00",
+                 'Time_end': "2030-01-01 11:00:00", 'Number_booking': coach_id}, [])
+
+    async def scenario():
+        results = await asyncio.gather(*(book(coach_id) for coach_id in (1, 2, 3)))
+        async with AsyncBookingRepository(sample_db) as repository:
+            numbers = [booking['Number_booking'] async for booking in repository.iter_bookings_details(chunk_size=2)]
+        return results, numbers
+
+    results, numbers = asyncio.run(scenario())
+    assert results == [True, True, True]
+    assert sorted(numbers) == [1, 2, 3]
+
+
+def test_closed_repository_rejects_calls(sample_db):
+    async def scenario():
+        repository = AsyncInventoryRepository(sample_db)
+        await repository.close()
+        await repository.get_all("Inventory")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
@@ -0,0 +1,69 @@
+# tests/test_auth.py
+import sqlite3
+
+import pytest
+
+import passwords
+from auth import AuthService
+from passwords import ensure_hashed, hash_password, is_password_hash, verify_password
+
+# Малое число итераций: тесту не нужна стойкость PBKDF2
+TEST_ITERATIONS = 1000
+
+
+@pytest.fixture
+def auth_db(sample_db, monkeypatch):
+    """Тренер 1 (логин 101) с хэшем пароля и пользователь 2 с паролем старого формата."""
+    monkeypatch.setattr(passwords, 'HASH_ITERATIONS', TEST_ITERATIONS)
+    conn = sqlite3.connect(sample_db)
+    with conn:
+        conn.execute("UPDATE Coach SET Password = ? WHERE Coach_ID = 1",
+                     (hash_password('pass101', TEST_ITERATIONS),))
+        conn.execute("UPDATE User SET Password = 'userpass2' WHERE User_ID = 2")
+    conn.close()
+    return sample_db
+
+
+def _stored_password(db_name: str, table: str, row_id: int) -> str:
+    conn = sqlite3.connect(db_name)
+    try:
+        return conn.execute(f"SELECT Password FROM {table} WHERE {table}_ID = ?", (row_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_login_roles_and_wrong_passwords(auth_db):
+    service = AuthService(auth_db)
+    session = service.login("101", "pass101")
+    assert (session.role, session.kind, session.subject_id) == ('Admin', 'Coach', 1)
+    assert service.login("101", "wrong") is None
+    assert service.login("2", "userpass2").role == 'User'
+    assert service.login("999", "pass101") is None
+
+
+def test_legacy_password_is_rehashed_on_login(auth_db):
+    assert AuthService(auth_db).login("2", "userpass2") is not None
+    stored = _stored_password(auth_db, "User", 2)
+    assert is_password_hash(stored) and verify_password("userpass2", stored)
+
+
+def test_sessions_refresh_expire_and_logout(auth_db):
+    service = AuthService(auth_db)
+    session = service.login("101", "pass101")
+    assert service.get_session(session.token) is session
+    assert service.refresh(session.token) is session
+    service.logout(session.token)
+    assert service.get_session(session.token) is None
+
+    short = AuthService(auth_db, session_ttl=0)
+    expired = short.login("101", "pass101")
+    assert expired is not None
+    assert short.get_session(expired.token) is None
+    assert short.refresh(expired.token) is None
+    assert short.active_sessions() == 0
+
+
+def test_ensure_hashed_keeps_existing_hashes():
+    stored = hash_password('secret1', TEST_ITERATIONS)
+    assert ensure_hashed(stored) == stored
+    assert verify_password('secret1', ensure_hashed('secret1'))
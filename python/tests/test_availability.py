@@ -0,0 +1,33 @@
+# tests/test_availability.py
+from availability import peak_concurrency
+from repositories.booking_repo import BookingRepository
+from repositories.inventory_repo import InventoryRepository
+
+
+def test_peak_concurrency_half_open_intervals():
+    # Окончание в момент начала следующего не считается пересечением
+    assert peak_concurrency([(1, 3), (3, 5)]) == (1, 1)
+    assert peak_concurrency([(1, 5), (2, 4), (3, 6)]) == (3, 3)
+    assert peak_concurrency([(1, 5), (2, 4)], window_start=4, window_end=10) == (1, 4)
+    assert peak_concurrency([]) == (0, None)
+
+
+def test_availability_of_items(sample_db):
+    bookings = BookingRepository(sample_db)
+    results = bookings.add_bookings([
+        ({'Coach_ID': 1, 'User_ID': 1, 'Time_start': "2030-01-01 10:00:00",
+          'Time_end': "2030-01-01 11:00:00", 'Number_booking': 1}, [1, 2]),
+        ({'Coach_ID': 2, 'User_ID': 2, 'Time_start': "2030-01-01 10:30:00",
+          'Time_end': "2030-01-01 12:00:00", 'Number_booking': 2}, [2]),
+    ])
+    assert all(result['ok'] for result in results)
+
+    inventory = InventoryRepository(sample_db)
+    availability = inventory.get_availability([1, 2], "2030-01-01 09:00", "2030-01-01 13:00")
+    assert availability[1]['Free'] == 0
+    assert (availability[2]['Peak'], availability[2]['Peak_at']) == (2, "2030-01-01 10:30:00")
+    assert inventory.get_free_count(2, "2030-01-01 11:00", "2030-01-01 12:00") == 1
+    assert inventory.get_free_count(1, "2030-01-01 11:00", "2030-01-01 12:00") == 1
+
+    shortages = inventory.find_shortages([1, 2, 99], "2030-01-01 10:15", "2030-01-01 10:45")
+    assert [item['Inventory_ID'] for item in shortages] == [1, 2, 99]
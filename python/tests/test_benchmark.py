@@ -0,0 +1,23 @@
+# tests/test_benchmark.py
+from benchmark import compare, measure, run_benchmarks
+
+
+def test_measure_reports_percentiles_and_rows():
+    stats = measure(lambda: [1, 2, 3], repeat=5)
+    assert stats['runs'] == 5 and stats['rows'] == 3
+    assert stats['min_ms'] <= stats['p50_ms'] <= stats['p95_ms'] <= stats['max_ms']
+
+
+def test_compare_ignores_small_deltas():
+    baseline = {'results': [{'scale': 1, 'case': 'a', 'p50_ms': 10.0}, {'scale': 1, 'case': 'b', 'p50_ms': 0.1}]}
+    current = {'results': [{'scale': 1, 'case': 'a', 'p50_ms': 13.0}, {'scale': 1, 'case': 'b', 'p50_ms': 0.5},
+                           {'scale': 1, 'case': 'new', 'p50_ms': 1.0}]}
+    report = compare(current, baseline)
+    assert [(r['case'], r['regression']) for r in report] == [('a', True), ('b', False)]
+
+
+def test_run_benchmarks_smoke(tmp_path):
+    report = run_benchmarks([1], repeat=1, export_repeat=1, formats=['csv'], only='page',
+                            keep_dir=str(tmp_path))
+    assert [r['case'] for r in report['results']] == ['get_bookings_details_page']
+    assert report['results'][0]['rows'] == 20
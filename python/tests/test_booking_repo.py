@@ -0,0 +1,121 @@
+# tests/test_booking_repo.py
+import threading
+
+import pytest
+
+from repositories.booking_repo import BookingRepository
+
+
+def _booking(coach_id: int, user_id: int, start: str, end: str, number: int) -> dict:
+    return {'Coach_ID': coach_id, 'User_ID': user_id, 'Time_start': f"2030-01-01 {start}:00",
+            'Time_end': f"2030-01-01 {end}:00", 'Number_booking': number}
+
+
+def test_add_bookings_respects_inventory_count(sample_db):
+    repository = BookingRepository(sample_db)
+    results = repository.add_bookings([
+        (_booking(1, 1, "10:00", "11:00", 1), [1, 2]),
+        (_booking(2, 2, "10:30", "11:30", 2), [2]),
+        (_booking(3, 3, "10:45", "11:15", 3), [1]),
+    ], policy='skip_failed')
+    assert [r['ok'] for r in results] == [True, True, False]
+    assert "Мяч" in results[2]['error']
+
+
+def test_concurrent_bookings_of_last_item(sample_db):
+    repository = BookingRepository(sample_db)
+    results = []
+    barrier = threading.Barrier(2)
+
+    def book(coach_id: int):
+        barrier.wait()
+        results.append(repository.add_bookings([(_booking(coach_id, coach_id, "10:00", "11:00", coach_id), [1])])[0])
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(r['ok'] for r in results) == [False, True]
+
+
+def test_update_booking_checks_inventory_capacity(sample_db):
+    repository = BookingRepository(sample_db)
+    first, second = repository.add_bookings([
+        (_booking(1, 1, "10:00", "11:00", 1), [1]),
+        (_booking(2, 2, "12:00", "13:00", 2), [1]),
+    ])
+    assert first['ok'] and second['ok']
+
+    # Единственный мяч уже выдан первому бронированию на 10:00–11:00
+    assert not repository.update_booking(second['Booking_ID'], _booking(2, 2, "10:30", "11:30", 2))
+    assert repository.get_booking_by_id(second['Booking_ID'])['Time_start'] == "2030-01-01 12:00:00"
+    # Собственный инвентарь бронирования не мешает сдвигу в пересекающийся интервал
+    assert repository.update_booking(first['Booking_ID'], _booking(1, 1, "10:30", "11:30", 1))
+    assert repository.update_booking(second['Booking_ID'], _booking(2, 2, "11:30", "12:30", 2))
+
+
+# Второе бронирование пересекается с первым по тренеру
+BATCH = [
+    (_booking(1, 1, "10:00", "11:00", 1), [2]),
+    (_booking(1, 2, "10:30", "11:30", 2), []),
+    (_booking(2, 3, "12:00", "13:00", 3), [2]),
+]
+
+
+@pytest.mark.parametrize("policy, saved", [
+    ('all_or_nothing', [False, False, False]),
+    ('skip_failed', [True, False, True]),
+    ('stop_on_error', [True, False, False]),
+])
+def test_add_bookings_policies(sample_db, policy, saved):
+    repository = BookingRepository(sample_db)
+    results = repository.add_bookings(BATCH, policy=policy)
+    assert [r['ok'] for r in results] == saved
+    assert all(r['error'] for r in results if not r['ok'])
+    stored = sorted(b['Number_booking'] for b in repository.get_all("Booking"))
+    assert stored == [i + 1 for i, ok in enumerate(saved) if ok]
+    links = repository._execute_query("SELECT count(*) AS n FROM Booking_inventory")[0]['n']
+    assert links == sum(len(BATCH[i][1]) for i, ok in enumerate(saved) if ok)
+
+
+def test_add_bookings_rejects_invalid_data(sample_db):
+    repository = BookingRepository(sample_db)
+    invalid = (_booking(2, 2, "12:00", "13:00", 2), [])
+    del invalid[0]['Time_end']
+    results = repository.add_bookings([(_booking(1, 1, "10:00", "11:00", 1), []), invalid])
+    assert [r['ok'] for r in results] == [False, False]
+    assert "Некорректные данные" in results[1]['error']
+    assert repository.get_all("Booking") == []
+
+    results = repository.add_bookings([(_booking(1, 1, "10:00", "11:00", 1), []), invalid], policy='skip_failed')
+    assert [r['ok'] for r in results] == [True, False]
+    with pytest.raises(ValueError):
+        repository.add_bookings([], policy='best_effort')
+
+
+def test_coach_and_user_conflicts(sample_db):
+    repository = BookingRepository(sample_db)
+    assert repository.add_booking(_booking(1, 1, "10:00", "11:00", 1), [])
+    # Тот же тренер или тот же пользователь в пересекающемся интервале
+    assert not repository.add_booking(_booking(1, 2, "10:59", "12:00", 2), [])
+    assert not repository.add_booking(_booking(2, 1, "09:00", "10:01", 3), [])
+    # Смежные интервалы [начало, конец) не пересекаются
+    assert repository.add_booking(_booking(1, 1, "11:00", "12:00", 4), [])
+    assert repository.add_booking(_booking(2, 2, "10:00", "11:00", 5), [])
+    assert sorted(b['Number_booking'] for b in repository.get_all("Booking")) == [1, 4, 5]
+
+
+def test_update_booking_ignores_itself_and_checks_others(sample_db):
+    repository = BookingRepository(sample_db)
+    first, second = repository.add_bookings([
+        (_booking(1, 1, "10:00", "11:00", 1), []),
+        (_booking(1, 2, "12:00", "13:00", 2), []),
+    ])
+    # Сдвиг внутри собственного интервала — не конфликт
+    assert repository.update_booking(first['Booking_ID'], _booking(1, 1, "10:30", "11:30", 1))
+    assert not repository.update_booking(second['Booking_ID'], _booking(1, 2, "11:00", "12:30", 2))
+
+    booking = repository.get_booking_by_id(first['Booking_ID'])
+    assert booking['Time_start'] == "2030-01-01 10:30:00"
+    assert booking['End_ts'] - booking['Start_ts'] == 3600
@@ -0,0 +1,82 @@
+# tests/test_change_repo.py
+import json
+import sqlite3
+
+from export_job import NESTED_BOOKINGS
+from repositories.booking_repo import BookingRepository
+from repositories.change_repo import ChangeRepository
+
+
+def _execute(db_name: str, *statements: str):
+    conn = sqlite3.connect(db_name)
+    with conn:
+        for sql in statements:
+            conn.execute(sql)
+    conn.close()
+
+
+def _delta(repository: ChangeRepository, since: int) -> list:
+    return [(r['Change_op'], r['Inventory_ID'], r['Name'])
+            for r in repository.iter_table_changes('Inventory', since, repository.current_seq())]
+
+
+def test_changes_collapse_to_one_record_per_key(sample_db):
+    repository = ChangeRepository(sample_db)
+    since = repository.current_seq()
+    _execute(sample_db,
+             "INSERT INTO Inventory (Inventory_ID, Name, Count) VALUES (10, 'Сетка', 1)",
+             "UPDATE Inventory SET Name = 'Сетка большая' WHERE Inventory_ID = 10",
+             "INSERT INTO Inventory (Inventory_ID, Name, Count) VALUES (11, 'Фишка', 1)",
+             "DELETE FROM Inventory WHERE Inventory_ID = 11",
+             "UPDATE Inventory SET Name = 'Мяч новый' WHERE Inventory_ID = 1",
+             "DELETE FROM Inventory WHERE Inventory_ID = 1",
+             "UPDATE Inventory SET Count = 3 WHERE Inventory_ID = 2",
+             "UPDATE Inventory SET Name = 'Конус красный' WHERE Inventory_ID = 2")
+    # Вставка и правка — одна запись I в текущем состоянии; вставка с удалением — ничего;
+    # правка с удалением — D только с ключом; две правки — одна U
+    assert sorted(_delta(repository, since)) == [
+        ('D', 1, None), ('I', 10, 'Сетка большая'), ('U', 2, 'Конус красный')]
+
+
+def test_export_starts_with_snapshot_then_deltas(sample_db, tmp_path):
+    repository = ChangeRepository(sample_db)
+    output_dir = str(tmp_path)
+
+    full = repository.export_changes_to_file('Inventory', 'json', 'bi', output_dir)
+    assert full['full'] and full['records'] == 2
+    with open(full['path'], encoding='utf-8') as f:
+        assert {(r['Change_op'], r['Name']) for r in json.load(f)} == {('I', 'Мяч'), ('I', 'Конус')}
+
+    _execute(sample_db, "UPDATE Inventory SET Count = 5 WHERE Inventory_ID = 2")
+    delta = repository.export_changes_to_file('Inventory', 'json', 'bi', output_dir)
+    assert not delta['full'] and delta['since'] == full['until']
+    with open(delta['path'], encoding='utf-8') as f:
+        assert [(r['Change_op'], r['Inventory_ID'], r['Count']) for r in json.load(f)] == [('U', 2, 5)]
+
+    empty = repository.export_changes_to_file('Inventory', 'json', 'bi', output_dir)
+    assert empty['path'] is None and empty['since'] == delta['until']
+
+    # Выгруженное единственным потребителем удаляется из журнала
+    assert repository.prune_change_log() > 0
+    assert repository.get_watermark('bi', 'Inventory') == repository.current_seq()
+
+
+def test_nested_changes_follow_related_tables(sample_db):
+    bookings = BookingRepository(sample_db)
+    first, second = bookings.add_bookings([
+        ({'Coach_ID': 1, 'User_ID': 1, 'Time_start': "2030-01-01 10:00:00",
+          'Time_end': "2030-01-01 11:00:00", 'Number_booking': 1}, [1]),
+        ({'Coach_ID': 2, 'User_ID': 2, 'Time_start': "2030-01-01 10:00:00",
+          'Time_end': "2030-01-01 11:00:00", 'Number_booking': 2}, [2]),
+    ])
+    repository = ChangeRepository(sample_db)
+    since = repository.current_seq()
+    # Имя предмета входит во вложенную запись; удаленная бронь выгружается как D
+    _execute(sample_db, "UPDATE Inventory SET Name = 'Мяч новый' WHERE Inventory_ID = 1")
+    assert bookings.delete_booking(second['Booking_ID'])
+
+    changes = list(repository.iter_nested_changes(since, repository.current_seq()))
+    assert [(c['Change_op'], c['Booking_ID']) for c in changes] == [
+        ('U', first['Booking_ID']), ('D', second['Booking_ID'])]
+    assert changes[0]['Inventory_list'] == ["Мяч новый (Статус: Забронировано)"]
+    assert repository.export_changes_to_file(NESTED_BOOKINGS, 'csv', 'bi', ".") is None
@@ -0,0 +1,83 @@
+# tests/test_cli.py
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cli
+import main as app
+from db_config import get_pool, insert_sample_data
+from repositories.import_repo import ImportRepository
+
+
+@pytest.fixture
+def repositories(db_name):
+    insert_sample_data(db_name)
+    app.initialize_repositories(db_name)
+    return db_name
+
+
+def _batch(lines, **kwargs):
+    out = io.StringIO()
+    failures = cli.run_batch('Admin', io.StringIO("\n".join(json.dumps(line) for line in lines)), out, **kwargs)
+    return failures, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_batch_runs_import_outside_shared_transaction(repositories, tmp_path, monkeypatch):
+    depths = []
+    load_chunk = ImportRepository._load_chunk
+
+    def tracked(self, sql, chunk):
+        depths.append(get_pool(repositories)._local.tx_depth)
+        return load_chunk(self, sql, chunk)
+
+    monkeypatch.setattr(ImportRepository, '_load_chunk', tracked)
+    source = tmp_path / "users.csv"
+    source.write_text("User_ID,Surname,Name,Password\n100,Test,One,pbkdf2_sha256$1$a$b\n", encoding='utf-8')
+    failures, results = _batch([
+        {'action': 'ADD_U', 'Surname': 'Batch', 'Name': 'First', 'Password': 'secret1'},
+        {'action': 'IMP_FLAT', 'Table': 'User', 'Path': str(source)},
+        {'action': 'ADD_U', 'Surname': 'Batch', 'Name': 'Second', 'Password': 'secret2'},
+    ])
+    assert failures == 0
+    assert [r['action'] for r in results] == ['ADD_U', 'IMP_FLAT', 'ADD_U']
+    assert results[1]['result']['imported'] == 1
+    # Импорт не вложен в транзакцию пачки: его пачка строк — внешняя транзакция
+    assert depths == [1]
+
+
+def test_batch_show_defaults_to_one_page(repositories, monkeypatch):
+    monkeypatch.setattr(cli, 'DEFAULT_PAGE_LIMIT', 2)
+    failures, results = _batch([{'action': 'SHOW_U'}])
+    assert failures == 0
+    page = results[0]['result']
+    assert len(page['rows']) == 2 and page['next'] is not None
+
+
+def test_batch_stop_on_error_skips_rest(repositories):
+    failures, results = _batch([
+        {'action': 'DELETE', 'Table': 'Nothing', 'ID': 1},
+        {'action': 'ADD_U', 'Surname': 'Never', 'Name': 'Added', 'Password': 'secret3'},
+    ], stop_on_error=True)
+    assert failures == 1 and len(results) == 1
+
+
+def test_run_seeds_empty_database_with_current_schema(db_name, capsys):
+    # Схема актуальна (миграции применены фикстурой), но данных нет
+    assert cli.run(["--db", db_name, "--login", "1", "--password", "admin_pass", "show_c", "--limit", "5"]) == 0
+    page = json.loads(capsys.readouterr().out)
+    assert page['rows'][0]['Coach_ID'] == 1
+
+
+def test_startup_defers_heavy_imports():
+    # Отдельный процесс: модули, загруженные другими тестами, не должны влиять на проверку
+    deferred = ['yaml', 'xml.etree.ElementTree', 'multiprocessing', 'zipfile', 'exporters',
+                'importers', 'export_job', 'repositories.change_repo', 'repositories.import_repo']
+    code = (f"import sys, main, auth; "
+            f"print([m for m in {deferred!r} if m in sys.modules], auth._dummy_hash.cache_info().currsize)")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.split() == ["[]", "0"]
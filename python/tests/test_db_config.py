@@ -0,0 +1,98 @@
+# tests/test_db_config.py
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_config import ConnectionPool, get_pool, is_busy_error
+from repositories.base_repo import BaseRepository
+
+
+def _count(pool: ConnectionPool) -> int:
+    with pool.connection() as conn:
+        return conn.execute("SELECT count(*) FROM Inventory").fetchone()[0]
+
+
+def test_connection_is_reused_per_thread(db_name):
+    pool = get_pool(db_name)
+    with pool.connection() as first, pool.connection() as second:
+        assert first is second
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.acquire()))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+
+def test_nested_transaction_rolls_back_only_savepoint(db_name):
+    pool = get_pool(db_name)
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO Inventory (Name, Count) VALUES ('Мяч', 1)")
+        with pytest.raises(sqlite3.IntegrityError):
+            with pool.transaction() as inner:
+                inner.execute("INSERT INTO Inventory (Name, Count) VALUES ('Конус', 1)")
+                inner.execute("INSERT INTO Inventory (Name, Count) VALUES ('Мяч', 1)")
+    assert _count(pool) == 1
+
+
+def test_after_commit_waits_for_outer_transaction(db_name):
+    pool = get_pool(db_name)
+    calls = []
+    with pool.transaction():
+        with pool.transaction():
+            pool.after_commit(lambda: calls.append('done'))
+        assert calls == []
+    assert calls == ['done']
+
+
+def test_pool_size_is_bounded(db_name):
+    pool = ConnectionPool(db_name, max_size=1, acquire_timeout=0.2)
+    pool.acquire()
+    errors = []
+
+    def worker():
+        try:
+            pool.acquire()
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert errors and "max_size=1" in str(errors[0])
+    pool.close_all()
+
+
+def test_terminal_profile_uses_wal(db_name):
+    with get_pool(db_name).connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+
+def test_busy_errors_are_recognised():
+    assert is_busy_error(sqlite3.OperationalError("database is locked"))
+    assert not is_busy_error(sqlite3.OperationalError("no such table: X"))
+    assert not is_busy_error(sqlite3.IntegrityError("database is locked"))
+
+
+def test_busy_operation_is_retried(db_name, monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    repository = BaseRepository(db_name)
+    attempts = []
+
+    def operation():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        return 'ok'
+
+    assert repository._with_retry(operation) == 'ok'
+    assert len(attempts) == 3
+
+    # Внутри открытой транзакции повтор невозможен: ошибка пробрасывается сразу
+    attempts.clear()
+    with pytest.raises(sqlite3.OperationalError):
+        with repository.transaction():
+            repository._with_retry(operation)
+    assert len(attempts) == 1
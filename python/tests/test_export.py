@@ -0,0 +1,58 @@
+# tests/test_export.py
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from importers import iter_records
+from repositories.booking_repo import BookingRepository
+
+TEXT_FORMATS = ['json', 'jsonl', 'csv', 'yaml', 'xml']
+
+
+def _as_text(record: dict) -> dict:
+    """CSV и XML не хранят типы: сравниваем значения как строки."""
+    return {key: '' if value is None else str(value) for key, value in record.items()}
+
+
+@pytest.mark.parametrize("file_format", TEXT_FORMATS)
+def test_flat_export_round_trip(sample_db, tmp_path, file_format):
+    repository = BookingRepository(sample_db)
+    path = repository.export_table_to_file("Coach", file_format, str(tmp_path))
+    assert path is not None
+    expected = [_as_text(row) for row in repository.get_all("Coach")]
+    assert [_as_text(record) for record in iter_records(path, file_format)] == expected
+
+
+def test_flat_export_of_empty_table(db_name, tmp_path):
+    assert BookingRepository(db_name).export_table_to_file("Booking", "json", str(tmp_path)) is None
+
+
+def _add_sample_bookings(repository: BookingRepository):
+    results = repository.add_bookings([
+        ({'Coach_ID': 1, 'User_ID': 1, 'Time_start': "2030-01-01 10:00:00",
+          'Time_end': "2030-01-01 11:00:00", 'Number_booking': 1}, [1, 2]),
+        ({'Coach_ID': 2, 'User_ID': 2, 'Time_start': "2030-01-02 10:00:00",
+          'Time_end': "2030-01-02 11:00:00", 'Number_booking': 2}, []),
+    ])
+    assert all(result['ok'] for result in results)
+
+
+@pytest.mark.parametrize("file_format", ['json', 'jsonl', 'yaml'])
+def test_nested_export_round_trip(sample_db, tmp_path, file_format):
+    repository = BookingRepository(sample_db)
+    _add_sample_bookings(repository)
+    path = repository.export_nested_booking_to_file(file_format, str(tmp_path))
+    assert path is not None
+    assert list(iter_records(path, file_format)) == repository.display_all_bookings_details()
+
+
+def test_nested_export_xml_lists(sample_db, tmp_path):
+    repository = BookingRepository(sample_db)
+    _add_sample_bookings(repository)
+    path = repository.export_nested_booking_to_file("xml", str(tmp_path))
+    bookings = ET.parse(path).getroot().findall("Booking")
+    items = [[item.text for item in booking.find("InventoryList")] for booking in bookings]
+    assert items == [booking['Inventory_list'] for booking in repository.display_all_bookings_details()]
+    assert len(items[0]) == 2 and items[1] == []
+
@@ -0,0 +1,83 @@
+# tests/test_export_job.py
+import hashlib
+import json
+import os
+import zipfile
+from datetime import datetime
+
+import pytest
+
+import db_config
+import export_job
+import query_cache
+import query_stats
+from export_job import ExportCancelled, ExportJob
+from repositories.booking_repo import BookingRepository
+
+
+@pytest.fixture
+def booked_db(sample_db):
+    results = BookingRepository(sample_db).add_bookings([
+        ({'Coach_ID': 1, 'User_ID': 1, 'Time_start': "2030-01-01 10:00:00",
+          'Time_end': "2030-01-01 11:00:00", 'Number_booking': 1}, [1, 2]),
+    ])
+    assert results[0]['ok']
+    return sample_db
+
+
+def _registered(path_part: str) -> list:
+    registries = (db_config._POOLS, query_stats._STATS, query_cache._CACHES)
+    return [name for registry in registries for name in registry if path_part in name]
+
+
+def test_archive_contents_match_manifest(booked_db, tmp_path):
+    output_dir = str(tmp_path / "out")
+    progress = []
+    job = ExportJob(booked_db, output_dir, formats=['csv', 'json'], use_processes=False, workers=2,
+                    progress=lambda done, total, task, error: progress.append((done, total, error)))
+    archive_path = job.run()
+
+    with zipfile.ZipFile(archive_path) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        for entry in manifest['files']:
+            assert hashlib.sha256(archive.read(entry['path'])).hexdigest() == entry['sha256']
+    tasks = {(entry['table'], entry['format']) for entry in manifest['files']}
+    # Вложенный экспорт в CSV не выполняется
+    assert ('Bookings_nested', 'json') in tasks and ('Bookings_nested', 'csv') not in tasks
+    assert len(tasks) == 13 and len(progress) == 13 and all(error is None for *_, error in progress)
+    assert manifest['tables']['Booking_inventory']['rows'] == 2
+
+    # Рабочий каталог и снимок удалены, реестры пулов, статистики и кэша очищены
+    assert os.listdir(output_dir) == [os.path.basename(archive_path)]
+    assert _registered(".export-") == []
+
+
+def test_archives_started_in_same_second_get_distinct_names(booked_db, tmp_path, monkeypatch):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2030, 1, 1, 12, 0, 0)
+
+    monkeypatch.setattr(export_job, 'datetime', FrozenDatetime)
+    output_dir = str(tmp_path / "out")
+    paths = [ExportJob(booked_db, output_dir, formats=['csv'], tables=['Coach'], use_processes=False).run()
+             for _ in range(2)]
+    assert [os.path.basename(path) for path in paths] == [
+        "coaching_export_20300101_120000.zip", "coaching_export_20300101_120000_2.zip"]
+
+
+def test_cancel_leaves_no_archive(booked_db, tmp_path):
+    output_dir = str(tmp_path / "out")
+    job = ExportJob(booked_db, output_dir, formats=['csv'], use_processes=False, workers=1)
+    job.progress = lambda *args: job.cancel()
+    with pytest.raises(ExportCancelled):
+        job.run()
+    assert os.listdir(output_dir) == []
+    assert _registered(".export-") == []
+
+
+def test_unknown_formats_and_tables_are_rejected(booked_db):
+    with pytest.raises(ValueError):
+        ExportJob(booked_db, formats=['pdf'])
+    with pytest.raises(ValueError):
+        ExportJob(booked_db, tables=['Secrets'])
@@ -0,0 +1,93 @@
+# tests/test_exporters.py
+import gzip
+import lzma
+
+import pytest
+
+from exporters import NpzColumnWriter, _SpillColumn, split_format
+from repositories.booking_repo import BookingRepository
+
+
+def _decode(column: _SpillColumn) -> list:
+    """Значения столбца в исходном виде (коды строк — через словарь)."""
+    words = list(column.codes)
+    result = []
+    for values, nulls in column.chunks():
+        for value, is_null in zip(values, nulls):
+            if is_null:
+                result.append(None)
+            elif column.kind == 'str':
+                result.append(words[value])
+            else:
+                result.append(value)
+    return result
+
+
+@pytest.mark.parametrize("spill_rows", [2, 65536])
+def test_spill_column_mixed_types(monkeypatch, spill_rows):
+    monkeypatch.setattr(_SpillColumn, 'SPILL_ROWS', spill_rows)
+    column = _SpillColumn()
+    for value in ['a', 'b', 5, 'a', 1.5, None, [1, 'x']]:
+        column.append(value)
+    assert column.kind == 'str'
+    assert _decode(column) == ['a', 'b', '5', 'a', '1.5', None, '[1, "x"]']
+    column.close()
+
+
+@pytest.mark.parametrize("spill_rows", [2, 65536])
+def test_spill_column_numeric_promotion(monkeypatch, spill_rows):
+    monkeypatch.setattr(_SpillColumn, 'SPILL_ROWS', spill_rows)
+    column = _SpillColumn()
+    for value in [None, 1, 2, 2.5, 3, None]:
+        column.append(value)
+    assert column.kind == 'float'
+    assert _decode(column) == [None, 1.0, 2.0, 2.5, 3.0, None]
+
+    column = _SpillColumn()
+    for value in [1, None, 2, 'x', 3]:
+        column.append(value)
+    assert column.kind == 'str'
+    assert _decode(column) == ['1', None, '2', 'x', '3']
+
+
+def test_npz_round_trip(tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    from exporters import load_npz_columns
+    monkeypatch.setattr(_SpillColumn, 'SPILL_ROWS', 3)
+    records = [{'id': i, 'name': ['a', 'b', 7][i % 3], 'score': None if i % 4 == 0 else i / 2}
+               for i in range(10)]
+    records[-1]['extra'] = 1
+    path = tmp_path / "t.npz"
+    with open(path, 'wb') as stream:
+        writer = NpzColumnWriter(stream, 'Rows', 'Row', ['id', 'name', 'score'])
+        writer.begin()
+        for record in records:
+            writer.write(record)
+        writer.end()
+
+    for arrays in (np.load(path), load_npz_columns(str(path))):
+        assert list(arrays['__columns__']) == ['id', 'name', 'score', 'extra']
+        assert list(arrays['__kinds__']) == ['int', 'str', 'float', 'int']
+        assert list(arrays['id']) == list(range(10))
+        words = arrays['name__dict']
+        assert [words[code] for code in arrays['name']] == [str(r['name']) for r in records]
+        assert np.isnan(arrays['score'][0]) and arrays['score'][1] == 0.5
+        assert list(arrays['extra__null']) == [True] * 9 + [False]
+
+
+@pytest.mark.parametrize("file_format", ['csv.gz', 'jsonl.xz', 'xml.gz'])
+def test_compressed_export_matches_plain(sample_db, tmp_path, file_format):
+    repository = BookingRepository(sample_db)
+    base, compression = split_format(file_format)
+    plain = repository.export_table_to_file("Coach", base, str(tmp_path))
+    packed = repository.export_table_to_file("Coach", file_format, str(tmp_path))
+    assert packed.endswith(file_format)
+    opener = gzip.open if compression == 'gz' else lzma.open
+    with opener(packed, 'rb') as f, open(plain, 'rb') as g:
+        assert f.read() == g.read()
+
+
+@pytest.mark.parametrize("file_format", ['csv.zip', 'npz.gz', 'pdf'])
+def test_split_format_rejects_unknown(file_format):
+    with pytest.raises(ValueError):
+        split_format(file_format)
@@ -0,0 +1,90 @@
+# tests/test_importers.py
+import csv
+import json
+
+import pytest
+
+from db_config import close_pool, create_tables
+from importers import IMPORT_FORMATS, BadRecord, iter_records
+from repositories.booking_repo import BookingRepository
+from repositories.import_repo import ImportRepository
+
+GOOD = {'User_ID': 10, 'Surname': 'Good', 'Name': 'Row', 'Password': 'secret10'}
+
+
+def _errors(path: str) -> list:
+    with open(path, encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_jsonl_bad_line_is_reported_and_reading_continues(tmp_path):
+    path = tmp_path / "users.jsonl"
+    path.write_text(json.dumps(GOOD) + '\n{"User_ID": 11, "Password": "leak\n' + json.dumps(GOOD) + '\n',
+                    encoding='utf-8')
+    records = list(iter_records(str(path)))
+    assert records[0] == GOOD and records[2] == GOOD
+    assert isinstance(records[1], BadRecord) and "leak" not in records[1].error
+
+
+def test_json_array_stops_at_broken_element(tmp_path):
+    path = tmp_path / "users.json"
+    path.write_text('[\n  ' + json.dumps(GOOD) + ',\n  {"User_ID": 11,,}\n]', encoding='utf-8')
+    records = list(iter_records(str(path)))
+    assert records[0] == GOOD
+    assert len(records) == 2 and isinstance(records[1], BadRecord)
+
+
+def test_xml_parse_error_becomes_bad_record(tmp_path):
+    path = tmp_path / "users.xml"
+    path.write_text("<UserList><User><User_ID>10</User_ID></User><User><Name>x</User></UserList>",
+                    encoding='utf-8')
+    records = list(iter_records(str(path)))
+    assert records[0] == {'User_ID': '10'}
+    assert isinstance(records[-1], BadRecord)
+
+
+def test_yaml_bad_item_is_skipped(tmp_path):
+    pytest.importorskip("yaml")
+    path = tmp_path / "users.yaml"
+    path.write_text("- User_ID: 10\n  Name: a\n- User_ID: [11\n- User_ID: 12\n  Name: c\n", encoding='utf-8')
+    records = list(iter_records(str(path)))
+    assert [r.get('User_ID') if isinstance(r, dict) else None for r in records] == [10, None, 12]
+    assert isinstance(records[1], BadRecord)
+
+
+def test_import_reports_bad_records_without_passwords(db_name, tmp_path):
+    path = tmp_path / "users.jsonl"
+    lines = [json.dumps(GOOD), '{"User_ID": 11, "Password": "plain11"',
+             json.dumps({'User_ID': 12, 'Surname': 'Short', 'Name': 'Pwd', 'Password': 'abc'}),
+             json.dumps({**GOOD, 'User_ID': 13})]
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+    summary = ImportRepository(db_name).import_file('User', str(path), errors_dir=str(tmp_path / "out"))
+    assert summary['imported'] == 2 and summary['rejected'] == 2
+    rows = _errors(summary['errors_path'])
+    assert [row['Row'] for row in rows] == ['2', '3']
+    assert "JSON" in rows[0]['Error']
+    assert json.loads(rows[1]['Data'])['Password'] == "***"
+    text = open(summary['errors_path'], encoding='utf-8').read()
+    assert "plain11" not in text and '"abc"' not in text
+
+
+@pytest.mark.parametrize("file_format", IMPORT_FORMATS)
+@pytest.mark.parametrize("table_name", ['Coach', 'Inventory'])
+def test_export_import_round_trip(sample_db, tmp_path, file_format, table_name):
+    if file_format == 'yaml':
+        pytest.importorskip("yaml")
+    source = BookingRepository(sample_db)
+    source._execute_non_query("UPDATE Inventory SET Comment = 'Новый' WHERE Inventory_ID = 1")
+    path = source.export_table_to_file(table_name, file_format, str(tmp_path))
+
+    target_db = str(tmp_path / "target.db")
+    create_tables(target_db)
+    try:
+        summary = ImportRepository(target_db).import_file(table_name, path, errors_dir=str(tmp_path))
+        # Хэши паролей из выгрузки загружаются как есть, без PBKDF2
+        expected = source.get_all(table_name)
+        assert (summary['imported'], summary['rejected'], summary['hashed']) == (len(expected), 0, 0)
+        assert ImportRepository(target_db).get_all(table_name) == expected
+    finally:
+        close_pool(target_db)
@@ -0,0 +1,79 @@
+# tests/test_migrations.py
+import os
+import shutil
+import sqlite3
+
+from db_config import close_pool
+from migrations import SCHEMA_VERSION, migrate, rebuild_usage_stats
+from passwords import is_password_hash
+from repositories.booking_repo import BookingRepository
+
+ITEM_STATS = "SELECT Day, Inventory_ID, Bookings FROM Stats_item_daily WHERE Bookings != 0 ORDER BY 1, 2"
+
+
+def _item_stats_match_rebuild(db_name: str):
+    conn = sqlite3.connect(db_name)
+    try:
+        kept = conn.execute(ITEM_STATS).fetchall()
+        rebuild_usage_stats(conn.cursor())
+        assert kept == conn.execute(ITEM_STATS).fetchall()
+        conn.rollback()
+        return kept
+    finally:
+        conn.close()
+
+
+def test_schema_is_current(db_name):
+    assert migrate(db_name) == 0
+    conn = sqlite3.connect(db_name)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
+
+
+def test_fresh_database_gets_all_migrations(tmp_path):
+    path = str(tmp_path / "fresh.db")
+    try:
+        assert migrate(path) == SCHEMA_VERSION
+        assert migrate(path) == 0
+    finally:
+        close_pool(path)
+
+
+def test_baseline_database_is_upgraded(tmp_path):
+    # coaching.db в репозитории — исходная схема без версии: пароли открыты, время — текст
+    path = str(tmp_path / "baseline.db")
+    shutil.copy(os.path.join(os.path.dirname(__file__), "..", "..", "coaching.db"), path)
+    try:
+        assert migrate(path) == SCHEMA_VERSION
+    finally:
+        close_pool(path)
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("SELECT count(*) FROM Booking WHERE Start_ts IS NULL").fetchone()[0] == 0
+        passwords = [row[0] for row in conn.execute("SELECT Password FROM Coach UNION ALL SELECT Password FROM User")]
+        assert passwords and all(is_password_hash(password) for password in passwords)
+    finally:
+        conn.close()
+
+
+def test_item_stats_follow_moved_links(sample_db):
+    repository = BookingRepository(sample_db)
+    first, second, third = repository.add_bookings([
+        ({'Coach_ID': 1, 'User_ID': 1, 'Time_start': "2030-01-01 10:00:00", 'Time_end': "2030-01-01 11:00:00",
+          'Number_booking': 1}, [1]),
+        ({'Coach_ID': 2, 'User_ID': 2, 'Time_start': "2030-01-02 10:00:00", 'Time_end': "2030-01-02 11:00:00",
+          'Number_booking': 2}, [2]),
+        ({'Coach_ID': 3, 'User_ID': 3, 'Time_start': "2030-01-03 10:00:00", 'Time_end': "2030-01-03 11:00:00",
+          'Number_booking': 3}, []),
+    ])
+    assert _item_stats_match_rebuild(sample_db) == [('2030-01-01', 1, 1), ('2030-01-02', 2, 1)]
+
+    conn = sqlite3.connect(sample_db)
+    with conn:
+        # Перенос на другой предмет и в бронирование другого дня
+        conn.execute("UPDATE Booking_inventory SET Inventory_ID = 2 WHERE Booking_ID = ?", (first['Booking_ID'],))
+        conn.execute("UPDATE Booking_inventory SET Booking_ID = ? WHERE Booking_ID = ?",
+                     (third['Booking_ID'], first['Booking_ID']))
+    conn.close()
+    assert _item_stats_match_rebuild(sample_db) == [('2030-01-02', 2, 1), ('2030-01-03', 2, 1)]
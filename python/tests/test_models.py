@@ -0,0 +1,48 @@
+# tests/test_models.py
+import sqlite3
+
+import pytest
+
+from models import Coach, Inventory, model_row_factory
+from repositories.inventory_repo import InventoryRepository
+
+
+def _fetch(sql: str, model):
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE TABLE Inventory (Inventory_ID INTEGER, Name TEXT, Count INTEGER, Comment TEXT)")
+        conn.execute("INSERT INTO Inventory VALUES (1, 'Мяч', 3, NULL)")
+        cursor = conn.cursor()
+        cursor.row_factory = model_row_factory(model)
+        return cursor.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_row_factory_maps_columns_by_name():
+    assert _fetch("SELECT * FROM Inventory", Inventory) == [Inventory(1, 'Мяч', 3, None)]
+    # Другой порядок и неполная проекция: отсутствующие поля равны None
+    item, = _fetch("SELECT Count, Inventory_ID FROM Inventory", Inventory)
+    assert (item.inventory_id, item.name, item.count) == (1, None, 3)
+    with pytest.raises(ValueError):
+        _fetch("SELECT Name AS Surname FROM Inventory", Inventory)
+
+
+def test_model_behaves_like_row():
+    coach = Coach(1, 101, 'Иванов', 'Иван')
+    assert not hasattr(coach, '__dict__')
+    assert coach['Internal_number'] == 101 and 'Surname' in coach
+    assert coach.get('Unknown', 'x') == 'x'
+    assert coach.to_dict() == {'Coach_ID': 1, 'Internal_number': 101, 'Surname': 'Иванов',
+                               'Name': 'Иван', 'Experience': 0, 'Password': None}
+    with pytest.raises(KeyError):
+        coach['Unknown']
+
+
+def test_repository_models_match_dicts(sample_db):
+    repository = InventoryRepository(sample_db)
+    models = repository.get_all("Inventory", as_model=True)
+    assert [model.to_dict() for model in models] == repository.get_all("Inventory")
+    assert repository.get_inventory_by_id(2, as_model=True).name == 'Конус'
+    rows, _ = repository.get_page("Inventory", "Inventory_ID", columns=['Name'], as_model=True)
+    assert [(row.inventory_id, row.name, row.count) for row in rows] == [(1, 'Мяч', None), (2, 'Конус', None)]
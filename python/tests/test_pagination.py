@@ -0,0 +1,70 @@
+# tests/test_pagination.py
+import sqlite3
+
+import pytest
+
+from repositories.booking_repo import BookingRepository
+from repositories.user_repo import UserRepository
+
+
+@pytest.fixture
+def users_db(db_name):
+    """Десять пользователей с повторяющимися фамилиями."""
+    conn = sqlite3.connect(db_name)
+    with conn:
+        conn.executemany("INSERT INTO User (User_ID, Surname, Name, Password) VALUES (?, ?, 'Имя', 'x')",
+                         [(i, ['Б', 'А', 'В'][i % 3]) for i in range(1, 11)])
+    conn.close()
+    return db_name
+
+
+def _all_pages(repository, **kwargs) -> list:
+    rows, after = repository.get_page("User", "User_ID", limit=3, **kwargs)
+    pages = [rows]
+    while after is not None:
+        rows, after = repository.get_page("User", "User_ID", limit=3, after=after, **kwargs)
+        pages.append(rows)
+    assert all(len(page) == 3 for page in pages[:-1])
+    return [row for page in pages for row in page]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_pages_with_duplicate_sort_keys(users_db, descending):
+    rows = _all_pages(UserRepository(users_db), columns=['Surname'], order_by='Surname', descending=descending)
+    keys = [(row['Surname'], row['User_ID']) for row in rows]
+    assert keys == sorted(keys, reverse=descending)
+    assert sorted(row['User_ID'] for row in rows) == list(range(1, 11))
+    # Проекция: только запрошенные столбцы и ключ курсора
+    assert set(rows[0]) == {'Surname', 'User_ID'}
+
+
+def test_keyset_pages_with_filter(users_db):
+    rows = _all_pages(UserRepository(users_db), filters={'Surname': 'А', 'User_ID': ('>', 2)})
+    assert [row['User_ID'] for row in rows] == [4, 7, 10]
+
+
+def test_page_rejects_unknown_columns(users_db):
+    repository = UserRepository(users_db)
+    with pytest.raises(ValueError):
+        repository.get_page("User", "User_ID", columns=['Password; DROP TABLE User'])
+    with pytest.raises(ValueError):
+        repository.get_page("User", "User_ID", filters={'Surname': ('LIKE; --', 'А')})
+
+
+def test_booking_details_pages(sample_db):
+    repository = BookingRepository(sample_db)
+    results = repository.add_bookings([
+        ({'Coach_ID': coach_id, 'User_ID': coach_id, 'Time_start': f"2030-01-0{day} 10:00:00",
+          'Time_end': f"2030-01-0{day} 11:00:00", 'Number_booking': day}, [])
+        for day in range(1, 8) for coach_id in (1, 2)
+    ])
+    assert all(result['ok'] for result in results)
+
+    seen, after = [], None
+    while True:
+        page, after = repository.get_bookings_details_page(after=after, limit=4, coach_id=2)
+        seen.extend(booking['Booking_ID'] for booking in page)
+        if after is None:
+            break
+    expected = [result['Booking_ID'] for result in results[1::2]]
+    assert seen == expected
@@ -0,0 +1,60 @@
+# tests/test_query_cache.py
+import sqlite3
+import threading
+
+from query_cache import MISS, QueryCache
+from repositories.inventory_repo import InventoryRepository
+
+
+def test_invalidate_follows_write_effects():
+    cache = QueryCache()
+    cache.put('links', ['Booking_inventory'], 1)
+    cache.put('stats', ['Stats_item_daily'], 2)
+    cache.put('coaches', ['Coach'], 3)
+    # Удаление бронирования каскадно меняет связи и статистику
+    cache.invalidate(['Booking'])
+    assert cache.get('links') is MISS and cache.get('stats') is MISS
+    assert cache.get('coaches') == 3
+
+
+def test_stale_put_and_size_limit():
+    cache = QueryCache(max_entries=2)
+    generation = cache.generation
+    cache.invalidate(['Coach'])
+    cache.put('old', ['Coach'], 'прочитано до записи', generation)
+    assert cache.get('old') is MISS
+
+    for key in ('a', 'b', 'c'):
+        cache.put(key, ['User'], key)
+    assert cache.get('a') is MISS and cache.get('c') == 'c'
+    assert cache.stats()['entries'] == 2
+
+
+def _run_in_thread(function):
+    thread = threading.Thread(target=function)
+    thread.start()
+    thread.join()
+
+
+def test_local_write_from_another_thread_keeps_unrelated_entries(sample_db):
+    repository = InventoryRepository(sample_db)
+    statuses = repository.get_all_statuses()
+    items = repository.get_all("Inventory")
+
+    _run_in_thread(lambda: repository.add_inventory({'Name': 'Сетка', 'Count': 1}))
+
+    hits = repository.cache_stats()['hits']
+    assert repository.get_all_statuses() == statuses
+    assert repository.cache_stats()['hits'] == hits + 1
+    assert len(repository.get_all("Inventory")) == len(items) + 1
+
+
+def test_external_write_clears_cache(sample_db):
+    repository = InventoryRepository(sample_db)
+    assert len(repository.get_all("Inventory")) == 2
+
+    conn = sqlite3.connect(sample_db)
+    with conn:
+        conn.execute("INSERT INTO Inventory (Name, Count) VALUES ('Сетка', 1)")
+    conn.close()
+    assert len(repository.get_all("Inventory")) == 3
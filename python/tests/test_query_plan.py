@@ -0,0 +1,17 @@
+# tests/test_query_plan.py
+from db_config import get_pool
+from migrations import drop_indexes
+from query_plan import check_query_plans
+
+
+def test_hot_queries_use_indexes(db_name):
+    report = check_query_plans(db_name)
+    assert [entry['name'] for entry in report if not entry['ok']] == []
+
+
+def test_missing_indexes_are_reported(db_name):
+    with get_pool(db_name).transaction() as conn:
+        drop_indexes(conn.cursor())
+    failed = {entry['name'] for entry in check_query_plans(db_name) if not entry['ok']}
+    assert "Бронирования тренера" in failed
+    assert "Бронирования за период" in failed
@@ -0,0 +1,45 @@
+# tests/test_query_stats.py
+import json
+import sqlite3
+
+from query_stats import QueryStats, normalize_sql, redact_params
+from repositories.inventory_repo import InventoryRepository
+
+
+def test_normalize_and_redact():
+    assert normalize_sql("SELECT *  FROM User\n WHERE Name = 'Иван' AND User_ID IN (?, ?, ?)") == \
+        "SELECT * FROM User WHERE Name = ? AND User_ID IN (?, ...)"
+    assert normalize_sql("SELECT 1.5, x'ff', NULL") == "SELECT ?, ?, ?"
+    assert redact_params(('secret', 5, None)) == ['<str:6>', '<int>', '<null>']
+
+
+def test_cursor_counts_rows_and_logs_slow_queries(tmp_path):
+    log = tmp_path / "slow.log"
+    stats = QueryStats(slow_ms=1e-9, slow_log=str(log))
+    conn = sqlite3.connect(":memory:")
+    try:
+        cursor = stats.cursor(conn)
+        cursor.execute("CREATE TABLE T (Value TEXT)")
+        cursor.executemany("INSERT INTO T VALUES (?)", [('a',), ('b',), ('c',)])
+        for value in ('a', 'b'):
+            cursor.execute("SELECT * FROM T WHERE Value != ?", (value,)).fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+    entries = {entry['sql']: entry for entry in stats.snapshot()}
+    select = entries["SELECT * FROM T WHERE Value != ?"]
+    assert (select['calls'], select['rows']) == (2, 4)
+    assert entries["INSERT INTO T VALUES (?)"]['rows'] == 3
+
+    lines = [json.loads(line) for line in log.read_text(encoding='utf-8').splitlines()]
+    assert len(lines) == 4
+    assert lines[-1]['params'] == ['<str:1>'] and "'b'" not in log.read_text(encoding='utf-8')
+
+
+def test_repository_queries_are_recorded(sample_db):
+    repository = InventoryRepository(sample_db)
+    repository.get_inventory_by_id(1)
+    repository.get_inventory_by_id(2)
+    entry, = [e for e in repository.query_stats() if e['sql'] == "SELECT * FROM Inventory WHERE Inventory_ID = ?"]
+    assert (entry['calls'], entry['rows']) == (2, 2)
@@ -0,0 +1,73 @@
+# tests/test_seed.py
+import sqlite3
+
+import pytest
+
+import seed
+from migrations import INDEXES, STATS_TRIGGERS
+from passwords import hash_password, verify_password
+
+FAST_ITERATIONS = 1000
+
+
+@pytest.fixture(autouse=True)
+def fast_hashes(monkeypatch):
+    """Настоящие хэши, но с малым числом итераций: генератору в тестах не нужна стойкость PBKDF2."""
+    monkeypatch.setattr(seed, 'hash_password', lambda password: hash_password(password, FAST_ITERATIONS))
+    monkeypatch.setattr(seed, 'hash_passwords',
+                        lambda passwords: [hash_password(p, FAST_ITERATIONS) for p in passwords])
+
+
+def _rows(db_name: str, sql: str) -> list:
+    conn = sqlite3.connect(db_name)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def _schema_objects(db_name: str) -> set:
+    return {name for name, in _rows(db_name, "SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")}
+
+
+def test_generator_is_deterministic_and_conflict_free(tmp_path):
+    paths = [str(tmp_path / f"{i}.db") for i in range(2)]
+    counts = [seed.seed_database(path, coaches=3, users=20, items=5, bookings=300, seed=7) for path in paths]
+    assert counts[0] == counts[1] and counts[0]['Booking'] == 300
+    assert counts[0]['Coach'] == len(seed.DEMO_COACHES) + 3
+    query = "SELECT Coach_ID, User_ID, Start_ts, End_ts FROM Booking ORDER BY Booking_ID"
+    assert _rows(paths[0], query) == _rows(paths[1], query)
+
+    # Ни тренер, ни клиент не заняты двумя бронированиями одновременно
+    for column in ('Coach_ID', 'User_ID'):
+        overlaps = _rows(paths[0], f"""
+            SELECT count(*) FROM Booking A JOIN Booking B ON A.{column} = B.{column}
+            AND A.Booking_ID < B.Booking_ID AND A.Start_ts < B.End_ts AND B.Start_ts < A.End_ts""")
+        assert overlaps == [(0,)]
+    assert seed.seed_database(paths[0]) is None
+
+
+def test_demo_preset_contents(db_name):
+    counts = seed.seed_database(db_name, demo_bookings=True, **seed.PRESETS['demo'])
+    assert counts == {'Coach': 3, 'User': 3, 'Inventory': 3, 'Status': 4, 'Booking': 2, 'Booking_inventory': 2}
+    admin, = _rows(db_name, "SELECT Password FROM Coach WHERE Internal_number = 1")
+    assert verify_password('admin_pass', admin[0])
+    assert _rows(db_name, "SELECT Number_booking FROM Booking ORDER BY 1") == [(1001,), (1002,)]
+
+
+@pytest.mark.parametrize("bulk_rows", [seed.BULK_ROWS, 1])
+def test_failed_seed_leaves_empty_database(db_name, monkeypatch, bulk_rows):
+    monkeypatch.setattr(seed, 'BULK_ROWS', bulk_rows)
+
+    def fail(stage: str, rows: int):
+        if stage == 'User':
+            raise RuntimeError("сбой загрузки")
+
+    with pytest.raises(RuntimeError):
+        seed.seed_database(db_name, coaches=2, users=5, items=3, bookings=10, progress=fail)
+    for table in seed.SEEDED_TABLES:
+        assert _rows(db_name, f"SELECT count(*) FROM {table}") == [(0,)]
+    # Массовая загрузка восстанавливает индексы и триггеры и после ошибки
+    assert set(INDEXES) | set(STATS_TRIGGERS) <= _schema_objects(db_name)
+
+    assert seed.seed_database(db_name, coaches=2, users=5, items=3, bookings=10)['Booking'] == 10
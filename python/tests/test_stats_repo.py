@@ -0,0 +1,33 @@
+# tests/test_stats_repo.py
+from repositories.booking_repo import BookingRepository
+from repositories.stats_repo import StatsRepository
+
+
+def _booking(coach_id: int, user_id: int, day: int, number: int) -> dict:
+    return {'Coach_ID': coach_id, 'User_ID': user_id, 'Time_start': f"2030-01-0{day} 10:00:00",
+            'Time_end': f"2030-01-0{day} 11:00:00", 'Number_booking': number}
+
+
+def test_daily_stats_follow_booking_changes(sample_db):
+    bookings = BookingRepository(sample_db)
+    first, second, third = bookings.add_bookings([
+        (_booking(1, 1, 1, 1), [1, 2]),
+        (_booking(1, 2, 2, 2), [2]),
+        (_booking(2, 3, 3, 3), []),
+    ])
+    stats = StatsRepository(sample_db)
+    assert [(r['Coach_ID'], r['Bookings']) for r in stats.get_coach_load(7, "2030-01-07")] == [(1, 2), (2, 1)]
+    assert [(r['Inventory_ID'], r['Bookings']) for r in stats.get_item_usage(7, "2030-01-07")] == [(2, 2), (1, 1)]
+
+    # Перенос бронирования на другого тренера и за пределы окна
+    assert bookings.update_booking(second['Booking_ID'], {**_booking(3, 2, 9, 2)})
+    assert bookings.delete_booking(third['Booking_ID'])
+    assert bookings.update_inventory_status(first['Booking_ID'], 1, 2)
+
+    report = stats.get_usage_report(7, "2030-01-07")
+    assert [(r['Coach_ID'], r['Bookings']) for r in report['Coaches']] == [(1, 1)]
+    assert sorted((r['Inventory_ID'], r['Bookings']) for r in report['Items']) == [(1, 1), (2, 1)]
+    # Смены статусов учитываются днем, когда они произошли
+    transitions = {(r['From_status_ID'], r['To_status_ID']): r['Transitions'] for r in stats.get_status_transitions(1)}
+    assert transitions[(1, 2)] == 1 and transitions[(0, 1)] == 3
+    assert [(r['Coach_ID'], r['Bookings']) for r in stats.get_coach_load(1, "2030-01-09")] == [(3, 1)]
@@ -1,27 +1,51 @@
+import io
 import os
-import xml.etree.ElementTree as ET
-from typing import Optional 
+import sys
+import calendar
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 
 # 1. УТИЛИТЫ ДЛЯ ВВОДА (Input Validation) ы
 
 
+# Ограничения длины полей, общие для консольного ввода и массового импорта
+FIELD_LIMITS: Dict[str, Tuple[int, int]] = {
+    'Surname': (1, 30),
+    'Name': (1, 30),
+    'Password': (6, 30),
+    'Inventory.Name': (1, 50),
+    'Inventory.Comment': (0, 100),
+}
+
+
+def check_length(value: str, min_len: int = 1, max_len: int = 50) -> Optional[str]:
+    """Проверяет длину строки и возвращает текст ошибки или None."""
+    current_len = len(value)
+    if current_len == 0 and min_len > 0:
+        return "Ввод не может быть пустым."
+    if current_len < min_len:
+        return f"Ввод слишком короткий. Минимальная длина: {min_len} символов."
+    if current_len > max_len:
+        return f"Ввод слишком длинный ({current_len}). Максимальная длина: {max_len} символов."
+    return None
+
+
 def get_validated_input(prompt: str, min_len: int = 1, max_len: int = 50) -> str:
     """
     Запрашивает ввод у пользователя и проверяет его длину.
     """
     while True:
         user_input = input(prompt).strip()
-        current_len = len(user_input)
-
-        if current_len == 0 and min_len > 0:
-            print("❌ Ввод не может быть пустым. Повторите попытку.")
-        elif current_len < min_len:
-            print(f"❌ Ввод слишком короткий. Минимальная длина: {min_len} символов.")
-        elif current_len > max_len:
-            print(f"❌ Ввод слишком длинный ({current_len}). Максимальная длина: {max_len} символов.")
-        else:
+        error = check_length(user_input, min_len, max_len)
+        if error is None:
             return user_input
+        if not user_input:
+            print(f"❌ {error} Повторите попытку.")
+        else:
+            print(f"❌ {error}")
 
 
 def get_int_input(prompt: str) -> Optional[int]:
@@ -36,6 +60,29 @@ def get_int_input(prompt: str) -> Optional[int]:
             print("❌ Некорректный ввод. Пожалуйста, введите целое число.")
 
 
+# Допустимые форматы даты и времени (первый — канонический, в нем время хранится в БД)
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d")
+
+
+def parse_datetime(value: str) -> Optional[int]:
+    """
+    Разбирает дату-время и возвращает метку времени в секундах или None.
+    Время без часового пояса считается как есть (как strftime('%s') в SQLite).
+    """
+    value = value.strip()
+    for fmt in DATETIME_FORMATS:
+        try:
+            return calendar.timegm(datetime.strptime(value, fmt).timetuple())
+        except ValueError:
+            continue
+    return None
+
+
+def format_timestamp(timestamp: int) -> str:
+    """Переводит метку времени обратно в строку канонического формата."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(DATETIME_FORMATS[0])
+
+
 # 2. УТИЛИТЫ ДЛЯ ЭКСПОРТА
 
 def ensure_output_directory(path: str = "out"):
@@ -50,6 +97,7 @@ def indent(elem, level=0):
     """
     Добавляет отступы (пробелы) к XML-элементам для "красивого" вывода (pretty-print).
     """
+    import xml.etree.ElementTree as ET
     if hasattr(ET, 'indent'):
         ET.indent(elem)
         return
@@ -65,4 +113,70 @@ def indent(elem, level=0):
             elem.tail = i
     else:
         if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
\ No newline at end of file
+            elem.tail = i
+
+
+# 3. УТИЛИТЫ ДЛЯ ПОСТРАНИЧНОГО ВЫВОДА
+
+def paginate(fetch_page: Callable[[Any], Tuple[List[Dict[str, Any]], Any]],
+             render: Callable[[Dict[str, Any]], None]) -> int:
+    """
+    Выводит записи постранично: fetch_page(курсор) возвращает (записи, следующий курсор).
+    Между страницами ждет Enter (q — прекратить). Возвращает число выведенных записей.
+    """
+    shown = 0
+    cursor = None
+    while True:
+        rows, cursor = fetch_page(cursor)
+        for row in rows:
+            render(row)
+        shown += len(rows)
+        if cursor is None:
+            return shown
+        if input("-- Enter — следующая страница, q — выход: ").strip().lower() == 'q':
+            return shown
+
+
+# 4. ПЕРЕХВАТ ВЫВОДА
+
+class _ThreadOutput:
+    """
+    Замена sys.stdout, которая направляет вывод каждого потока в свой буфер.
+    redirect_stdout подменяет поток глобально и при параллельных вызовах
+    (HTTP-сервер, задания экспорта) перемешивал бы сообщения и восстанавливал не тот stdout.
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, 'target', None) or self._default
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._default, name)
+
+
+_output_lock = threading.Lock()
+
+
+@contextmanager
+def capture_output() -> Iterator[io.StringIO]:
+    """Перехватывает print текущего потока, не затрагивая другие потоки."""
+    with _output_lock:
+        if not isinstance(sys.stdout, _ThreadOutput):
+            sys.stdout = _ThreadOutput(sys.stdout)
+        output = sys.stdout
+    messages = io.StringIO()
+    previous = getattr(output._local, 'target', None)
+    output._local.target = messages
+    try:
+        yield messages
+    finally:
+        output._local.target = previous